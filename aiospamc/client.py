@@ -3,31 +3,63 @@
 '''Contains the Client class that is used to interact with SPAMD.'''
 
 import asyncio
+from contextlib import contextmanager
 from functools import wraps
 import logging
-
-from aiospamc.exceptions import (BadResponse, ResponseException,
-                                 UsageException, DataErrorException, NoInputException, NoUserException,
-                                 NoHostException, UnavailableException, InternalSoftwareException, OSErrorException,
-                                 OSFileException, CantCreateException, IOErrorException, TemporaryFailureException,
-                                 ProtocolException, NoPermissionException, ConfigException, TimeoutException)
-from aiospamc.headers import Compress, MessageClass, Remove, Set, User
-from aiospamc.parser import parse, ParseError
-from aiospamc.requests import Request
+import time
+import zlib
+
+from aiospamc.common import FileBody
+from aiospamc.compression import body_size, CompressionExecutor, CompressionPolicy, Compressor
+from aiospamc.connections import Timeouts
+from aiospamc.exceptions import (AIOSpamcConnectionException, AIOSpamcConnectionTimeout, BadResponse, ClientClosed,
+                                 ResponseException, UsageException, DataErrorException, NoInputException,
+                                 NoUserException, NoHostException, UnavailableException, InternalSoftwareException,
+                                 OSErrorException, OSFileException, CantCreateException, IOErrorException,
+                                 TemporaryFailureException, ProtocolException, NoPermissionException, ConfigException,
+                                 TimeoutException)
+from aiospamc.headers import MessageClass, Remove, Set, User
+from aiospamc.hedging import HedgePolicy
+from aiospamc.latency import AdaptiveTimeouts
+from aiospamc.parser import ParseError, ResponseParser
+from aiospamc.requests import PreparedRequest, Request
+from aiospamc.retry import RetryPolicy
 from aiospamc.responses import Status
 
 
+@contextmanager
+def _open_file_body(file):
+    '''Opens a path, file descriptor or file object as a
+    :class:`aiospamc.common.FileBody`.  A file opened from a path is closed
+    when the context exits.'''
+
+    if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+        with open(file, 'rb') as file_object:
+            yield FileBody(file_object)
+    else:
+        yield FileBody(file)
+
+
 def _add_compress_header(func):
-    '''If the class instance's :attribute:`compress` boolean is `True` then the
-    :class:`aiospamc.headers.Compress` header is added to the
-    :class:`aiospamc.requests.Request` object.'''
+    '''If the class instance's :attribute:`compress` is set, or is a
+    :class:`aiospamc.compression.CompressionPolicy` that decides to compress,
+    then the body of the :class:`aiospamc.requests.Request` object is
+    compressed with the instance's :attribute:`compressor` and the
+    :class:`aiospamc.headers.Compress` header is added.  A
+    :class:`aiospamc.requests.PreparedRequest` was compressed when it was
+    prepared and is passed through as-is.'''
 
     @wraps(func)
-    async def wrapper(cls, request):
-        if cls.compress and cls.body:
+    async def wrapper(cls, request, *args, **kwargs):
+        if isinstance(request, PreparedRequest):
+            return await func(cls, request, *args, **kwargs)
+        compress = cls.compress
+        if isinstance(compress, CompressionPolicy) and request.body:
+            compress = compress.should_compress(request.body, cls.connection)
+        if compress and request.body:
+            await request.compress(cls.compressor, cls.compression_executor)
             cls.logger.debug('Added Compress header to request (%s)', id(request))
-            request.add_header(Compress())
-        return await func(cls, request)
+        return await func(cls, request, *args, **kwargs)
 
     return wrapper
 
@@ -35,16 +67,63 @@ def _add_compress_header(func):
 def _add_user_header(func):
     '''If the class instance's :attribute:`user` boolean is `True` then the
     :class:`aiospamc.headers.User` header is added to the
-    :class:`aiospamc.requests.Request` object.'''
+    :class:`aiospamc.requests.Request` object, unless it already has one.
+    For a :class:`aiospamc.requests.PreparedRequest` the header is spliced
+    into a copy of it without touching the body.'''
 
     @wraps(func)
-    async def wrapper(cls, request):
-        if cls.user:
+    async def wrapper(cls, request, *args, **kwargs):
+        if cls.user and not _has_user_header(request):
             cls.logger.debug('Added user header for \'%s\' to request (%s)',
                              cls.user,
                              id(request))
-            request.add_header(User(cls.user))
-        return await func(cls, request)
+            if isinstance(request, PreparedRequest):
+                request = request.with_headers(User(cls.user))
+            else:
+                request.add_header(User(cls.user))
+        return await func(cls, request, *args, **kwargs)
+
+    return wrapper
+
+
+def _has_user_header(request):
+    try:
+        if isinstance(request, PreparedRequest):
+            request.encoded_header('User')
+        else:
+            request.get_header('User')
+    except KeyError:
+        return False
+
+    return True
+
+
+def _track_in_flight(func):
+    '''Refuses new requests once the class instance is draining or closed,
+    and counts the requests in flight so :meth:`Client.drain` can wait for
+    them to finish.  Requests that are cancelled are counted apart from
+    those that fail.'''
+
+    @wraps(func)
+    async def wrapper(cls, request, *args, **kwargs):
+        if cls.closing:
+            raise ClientClosed('Client is {}, request ({}) refused'.format('closed' if cls.closed else 'draining',
+                                                                         id(request)))
+        cls.in_flight += 1
+        cls._idle.clear()
+        try:
+            return await func(cls, request, *args, **kwargs)
+        except asyncio.CancelledError:
+            cls.cancelled += 1
+            cls.logger.debug('Request (%s) cancelled', id(request))
+            raise
+        except Exception:
+            cls.errors += 1
+            raise
+        finally:
+            cls.in_flight -= 1
+            if not cls.in_flight:
+                cls._idle.set()
 
     return wrapper
 
@@ -57,9 +136,38 @@ class Client:
     connection : :class:`aiospamc.connections.ConnectionManager`
         Manager instance to open connections.
     user : :obj:`str`
-        Name of the user that SPAMD will run the checks under.
-    compress : :obj:`bool`
-        If true, the request body will be compressed.
+        Name of the user that SPAMD will run the checks under, for requests
+        that don't have a User header of their own.
+    compress : :obj:`bool`, :class:`aiospamc.compression.Compressor` or :class:`aiospamc.compression.CompressionPolicy`
+        If set, the request body will be compressed.  A policy decides for
+        each request.
+    compressor : :class:`aiospamc.compression.Compressor`
+        Compression settings used for request bodies.
+    compression_executor : :class:`aiospamc.compression.CompressionExecutor`
+        Thread pool that compresses and decompresses large bodies off the
+        event loop.
+    timeouts : :class:`aiospamc.connections.Timeouts`
+        Timeouts for connecting, writing, reading and the whole request.
+    adaptive_timeouts : :class:`aiospamc.latency.AdaptiveTimeouts`
+        Tracks response latencies and derives response timeouts from them,
+        or `None` to always use the read timeout of the connection.
+    retry : :class:`aiospamc.retry.RetryPolicy`
+        Decides which failed requests are sent again, or `None` to never
+        retry.
+    hedge : :class:`aiospamc.hedging.HedgePolicy`
+        Decides which slow requests are sent a second time, or `None` to
+        never hedge.
+    in_flight : :obj:`int`
+        Number of requests being sent.
+    errors : :obj:`int`
+        Number of requests that raised an exception.
+    cancelled : :obj:`int`
+        Number of requests cancelled while being sent.  Their connections
+        are aborted.  Not counted in :attr:`errors`.
+    closing : :obj:`bool`
+        Whether the client has stopped accepting new requests.
+    closed : :obj:`bool`
+        Whether the client has been closed.
     loop : :class:`asyncio.AbstractEventLoop`
         The asyncio event loop.
     logger : :class:`logging.Logger`
@@ -73,7 +181,13 @@ class Client:
                  user=None,
                  compress=False,
                  ssl=False,
-                 loop=None):
+                 loop=None,
+                 compression_executor=None,
+                 connection_manager=None,
+                 timeouts=None,
+                 adaptive_timeouts=False,
+                 retry=False,
+                 hedge=False):
         '''Client constructor.
 
         Parameters
@@ -85,13 +199,53 @@ class Client:
         port : :obj:`int`, optional
             Port number for the SPAMD service, defaults to 783.
         user : :obj:`str`, optional
-            Name of the user that SPAMD will run the checks under.
-        compress : :obj:`bool`, optional
-            If true, the request body will be compressed.
-        ssl : :obj:`bool`, optional
-            If true, will enable SSL/TLS for the connection.
+            Name of the user that SPAMD will run the checks under, for
+            requests that don't have a User header of their own.
+        compress : :obj:`bool` or object, optional
+            If true, the request body will be compressed with zlib's default
+            settings.  Pass a :class:`aiospamc.compression.Compressor` to
+            choose the compression level and window size, or a
+            :class:`aiospamc.compression.CompressionPolicy` to only compress
+            when it's expected to make the request faster.
+        ssl : :obj:`bool` or :class:`ssl.SSLContext`, optional
+            If true, will enable SSL/TLS for the connection.  Pass a context
+            from :func:`aiospamc.connections.tls.create_ssl_context` to set
+            the certificate authorities to trust or a client certificate.
+            The context is shared by every connection so TLS sessions are
+            resumed.
         loop : :class:`asyncio.AbstractEventLoop`
             The asyncio event loop.
+        compression_executor : :class:`aiospamc.compression.CompressionExecutor`, optional
+            Thread pool that compresses and decompresses large bodies.
+            Defaults to one thread per CPU for bodies of 64 KiB or more.
+        connection_manager : :class:`aiospamc.connections.ConnectionManager`, optional
+            Manager to open connections with instead of one built from the
+            host, port and socket path, such as a
+            :class:`aiospamc.connections.pooled_connection.PooledConnectionManager`
+            to spread requests over several SPAMD services.
+        timeouts : :class:`aiospamc.connections.Timeouts`, optional
+            Timeouts for connecting, writing, reading and the whole request.
+            The connect, write and read timeouts are given to the connection
+            manager the client builds.  A manager passed in keeps its own.
+        adaptive_timeouts : :obj:`bool` or :class:`aiospamc.latency.AdaptiveTimeouts`, optional
+            If true, the time to wait for each response is derived from the
+            latencies of earlier requests of the same verb and size once
+            enough have been seen, in place of the read timeout.  Pass a
+            :class:`aiospamc.latency.AdaptiveTimeouts` to choose the quantile,
+            factor and limits.
+        retry : :obj:`bool` or :class:`aiospamc.retry.RetryPolicy`, optional
+            If true, requests that fail with a temporary failure response or
+            can't connect are sent again, up to three times in all.  Pass a
+            :class:`aiospamc.retry.RetryPolicy` to choose the attempts,
+            backoff, budget and which failures are retried.
+        hedge : :obj:`bool` or :class:`aiospamc.hedging.HedgePolicy`, optional
+            If true, a request that only reads and is slower than 95% of
+            earlier ones is sent again over a new connection, to another
+            backend if there is one, and the first response is used.  At
+            most 5% of requests are hedged.  Pass a
+            :class:`aiospamc.hedging.HedgePolicy` to choose the quantile, rate
+            and verbs.  Requests with an ``on_headers`` callback aren't
+            hedged.
 
         Raises
         ------
@@ -100,12 +254,33 @@ class Client:
             domain socket connection.
         '''
 
-        if host and port:
+        self.timeouts = timeouts or Timeouts()
+        if isinstance(adaptive_timeouts, AdaptiveTimeouts):
+            self.adaptive_timeouts = adaptive_timeouts
+        elif adaptive_timeouts:
+            self.adaptive_timeouts = AdaptiveTimeouts()
+        else:
+            self.adaptive_timeouts = None
+        if isinstance(retry, RetryPolicy):
+            self.retry = retry
+        elif retry:
+            self.retry = RetryPolicy()
+        else:
+            self.retry = None
+        if isinstance(hedge, HedgePolicy):
+            self.hedge = hedge
+        elif hedge:
+            self.hedge = HedgePolicy()
+        else:
+            self.hedge = None
+        if connection_manager:
+            self.connection = connection_manager
+        elif host and port:
             from aiospamc.connections.tcp_connection import TcpConnectionManager
-            self.connection = TcpConnectionManager(host, port)
+            self.connection = TcpConnectionManager(host, port, ssl, timeouts=self.timeouts)
         elif socket_path:
             from aiospamc.connections.unix_connection import UnixConnectionManager
-            self.connection = UnixConnectionManager(socket_path)
+            self.connection = UnixConnectionManager(socket_path, timeouts=self.timeouts)
         else:
             raise ValueError('Either "host" and "port" or "socket_path" must be specified.')
 
@@ -114,10 +289,25 @@ class Client:
         self._socket_path = socket_path
         self.user = user
         self.compress = compress
+        if isinstance(compress, Compressor):
+            self.compressor = compress
+        elif isinstance(compress, CompressionPolicy):
+            self.compressor = compress.compressor
+        else:
+            self.compressor = Compressor()
         self._ssl = ssl
         self.loop = loop or asyncio.get_event_loop()
-
-        self.parser = parse
+        self.compression_executor = compression_executor or CompressionExecutor(loop=self.loop)
+        self._own_executor = compression_executor is None
+        self.in_flight = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.closing = False
+        self.closed = False
+        self._idle = asyncio.Event(loop=self.loop)
+        self._idle.set()
+
+        self.parser = ResponseParser
 
         self.logger = logging.getLogger(__name__)
         self.logger.debug('Created instance of %r', self)
@@ -135,7 +325,71 @@ class Client:
                                  repr(self._port),
                                  repr(self.user),
                                  repr(self.compress),
-                                 repr(self._ssl))
+                                 repr(bool(self._ssl)))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def drain(self, timeout=None):
+        '''Stops accepting new requests and waits for the ones in flight to
+        finish.
+
+        Parameters
+        ----------
+        timeout : :obj:`float`, optional
+            Most seconds to wait, or `None` to wait until every request has
+            finished.  Requests still in flight after the timeout carry on.
+
+        Returns
+        -------
+        :obj:`bool`
+            Whether every request finished in time.
+        '''
+
+        self.closing = True
+        if self.in_flight:
+            self.logger.info('Draining %d requests in flight', self.in_flight)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout, loop=self.loop)
+        except asyncio.TimeoutError:
+            self.logger.warning('%d requests still in flight after %s seconds', self.in_flight, timeout)
+            return False
+
+        return True
+
+    async def aclose(self, timeout=None):
+        '''Drains the client, then stops the background tasks of the
+        connection manager, closes its idle connections and shuts down the
+        compression executor if the client created it.  Used when leaving an
+        ``async with`` block.
+
+        Parameters
+        ----------
+        timeout : :obj:`float`, optional
+            Most seconds to wait for the requests in flight, or `None` to
+            wait until every request has finished.  Requests still in flight
+            after the timeout may fail.
+
+        Returns
+        -------
+        :obj:`bool`
+            Whether every request finished before the client was closed.
+        '''
+
+        if self.closed:
+            return not self.in_flight
+
+        drained = await self.drain(timeout)
+        self.connection.close()
+        if self._own_executor:
+            self.compression_executor.shutdown(wait=False)
+        self.closed = True
+        self.logger.debug('Closed %r', self)
+
+        return drained
 
     @staticmethod
     def _raise_response_exception(response):
@@ -176,29 +430,203 @@ class Client:
         else:
             raise ResponseException(response)
 
+    @_add_compress_header
+    async def prepare(self, request):
+        '''Compresses and serializes a request once so it can be sent any
+        number of times with :meth:`send`.
+
+        The :class:`aiospamc.headers.User` header isn't included, it's added
+        each time the prepared request is sent.
+
+        Parameters
+        ----------
+        request : :class:`aiospamc.requests.Request`
+            Request object to prepare.
+
+        Returns
+        -------
+        :class:`aiospamc.requests.PreparedRequest`
+        '''
+
+        return request.prepare()
+
+    def _new_connection(self, request, avoid=(), size=None):
+        '''Creates a connection for the request.  A manager that routes
+        requests is given the backends to avoid and the user and size of the
+        request.'''
+
+        if not getattr(self.connection, 'routed', False):
+            return self.connection.new_connection()
+
+        try:
+            if isinstance(request, PreparedRequest):
+                key = request.encoded_header('User')
+            else:
+                key = bytes(request.get_header('User'))
+        except KeyError:
+            key = None
+        if size is None:
+            size = sum(map(body_size, request.buffers()))
+
+        return self.connection.new_connection(avoid, key, size)
+
+    async def _exchange(self, request, on_headers, new_connection=None):
+        '''Sends the request over a new connection and parses the response.'''
+
+        parser = self.parser(on_headers=on_headers)
+        buffers = request.buffers()
+        size = sum(map(body_size, buffers))
+        try:
+            new_connection = new_connection or self._new_connection(request, size=size)
+            async with new_connection as connection:
+                start = time.monotonic()
+                await connection.send(buffers)
+                sent = time.monotonic()
+                self.logger.debug('Request (%s) successfully sent', id(request))
+                if self.adaptive_timeouts is not None:
+                    try:
+                        await connection.receive_response(parser, self.adaptive_timeouts.timeout(request.verb, size))
+                    except AIOSpamcConnectionTimeout:
+                        # Record the time waited, otherwise only responses
+                        # faster than the timeout are seen and it never grows.
+                        self.adaptive_timeouts.record(request.verb, size, time.monotonic() - sent)
+                        raise
+                    self.adaptive_timeouts.record(request.verb, size, time.monotonic() - sent)
+                else:
+                    await connection.receive_response(parser)
+                if isinstance(self.compress, CompressionPolicy) and connection.first_byte_at is not None:
+                    self.compress.record_transfer(getattr(new_connection, 'backend', None) or self.connection,
+                                                  size,
+                                                  connection.first_byte_at - start)
+            if parser.compressed:
+                body = await self.compression_executor.decompress(parser.body)
+            else:
+                body = None
+            response = parser.result(body)
+        except (ParseError, zlib.error):
+            raise BadResponse
+
+        return response
+
+    async def _timed_exchange(self, request, new_connection):
+        '''Sends the request, recording how long it took for the hedge
+        policy.'''
+
+        start = time.monotonic()
+        response = await self._exchange(request, None, new_connection)
+        self.hedge.record(request.verb, time.monotonic() - start)
+
+        return response
+
+    async def _hedged_exchange(self, request):
+        '''Sends the request and, if it's slow to answer, sends it again over
+        another connection.  The first response wins and the other attempt is
+        cancelled, which closes its connection.'''
+
+        self.hedge.record_request()
+        size = sum(map(body_size, request.buffers()))
+        first = self._new_connection(request, size=size)
+        tasks = [asyncio.ensure_future(self._timed_exchange(request, first), loop=self.loop)]
+        try:
+            delay = self.hedge.delay(request.verb)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay, loop=self.loop)
+                if not done and self.hedge.acquire():
+                    self.logger.info('Hedging request (%s) after %.3f seconds', id(request), delay)
+                    backend = getattr(first, 'backend', None)
+                    second = self._new_connection(request, () if backend is None else (backend,), size)
+                    tasks.append(asyncio.ensure_future(self._timed_exchange(request, second), loop=self.loop))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED, loop=self.loop)
+                for task in tasks:
+                    if task not in done:
+                        continue
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedge.wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancelled attempts so their connections are closed
+            # before returning.
+            await asyncio.gather(*tasks, return_exceptions=True, loop=self.loop)
+
+    async def _attempts(self, request, on_headers):
+        '''Sends the request until it succeeds or the retry policy gives up.'''
+
+        if self.retry is not None:
+            self.retry.record_request()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                if self.hedge is not None and on_headers is None and self.hedge.applies(request):
+                    response = await self._hedged_exchange(request)
+                else:
+                    response = await self._exchange(request, on_headers)
+                self._raise_response_exception(response)
+                return response
+            except (ResponseException, AIOSpamcConnectionException) as error:
+                if self.retry is None or not self.retry.should_retry(request, error, attempt):
+                    if isinstance(error, ResponseException):
+                        self.logger.exception('Exception for request (%s)when composing response: %s',
+                                              id(request),
+                                              error)
+                    raise
+                delay = self.retry.delay(attempt)
+                self.logger.warning('Retrying request (%s) in %.3f seconds after: %r', id(request), delay, error)
+            await asyncio.sleep(delay, loop=self.loop)
+
+    @_track_in_flight
     @_add_compress_header
     @_add_user_header
-    async def send(self, request):
+    async def send(self, request, on_headers=None):
         '''Sends a request to the SPAMD service.
 
-        If the SPAMD service gives a temporary failure response, then
+        If the SPAMD service gives a temporary failure response, or can't be
+        connected to, then the request is sent again as allowed by the
+        client's :attr:`retry` policy.  The exception is only raised once the
+        policy gives up.
+
+        If the task sending the request is cancelled, its connection is reset
+        straight away so SPAMD stops working on it as soon as it next reads
+        or writes.
 
         Parameters
         ----------
-        request : :class:`aiospamc.requests.Request`
-            Request object to send.
+        request : :class:`aiospamc.requests.Request` or :class:`aiospamc.requests.PreparedRequest`
+            Request object to send.  Prepared requests are sent without being
+            compressed or serialized again.
+        on_headers : callable, optional
+            Called with the :class:`aiospamc.parser.ResponseParser` as soon as
+            the status line and headers of the response have been received,
+            before the body has finished arriving.
 
         Returns
         -------
         :class:`aiospamc.responses.Response`
+            The body of the response is :obj:`bytes`, use
+            :meth:`aiospamc.responses.Response.text` to decode it.
 
         Raises
         ------
         :class:`aiospamc.exceptions.BadResponse`
             If the response from SPAMD is ill-formed this exception will be
             raised.
+        :class:`aiospamc.exceptions.ClientClosed`
+            Raised if the client is draining or closed.
         :class:`aiospamc.exceptions.AIOSpamcConnectionFailed`
             Raised if an error occurred when trying to connect.
+        :class:`aiospamc.exceptions.AIOSpamcConnectionTimeout`
+            Raised if connecting, sending, receiving or the whole request,
+            including any retries, took longer than the client's timeouts.
         :class:`aiospamc.exceptions.UsageException`
             Error in command line usage.
         :class:`aiospamc.exceptions.DataErrorException`
@@ -234,22 +662,18 @@ class Client:
         '''
 
         self.logger.debug('Sending request (%s)', id(request))
-        async with self.connection.new_connection() as connection:
-            await connection.send(bytes(request))
-            self.logger.debug('Request (%s) successfully sent', id(request))
-            data = await connection.receive()
-
-        try:
+        attempts = self._attempts(request, on_headers)
+        if self.timeouts.total is None:
+            response = await attempts
+        else:
             try:
-                response = self.parser(data)
-            except ParseError:
-                raise BadResponse
-            self._raise_response_exception(response)
-        except ResponseException as error:
-            self.logger.exception('Exception for request (%s)when composing response: %s',
-                                  id(request),
-                                  error)
-            raise
+                response = await asyncio.wait_for(attempts, self.timeouts.total, loop=self.loop)
+            except asyncio.TimeoutError:
+                raised = AIOSpamcConnectionTimeout('Request ({}) timed out after {} seconds'.format(
+                        id(request),
+                        self.timeouts.total))
+                self.logger.warning('%s', raised)
+                raise raised
 
         self.logger.debug('Received response (%s) for request (%s)',
             id(response),
@@ -267,8 +691,10 @@ class Client:
 
         Parameters
         ----------
-        message : :obj:`str`
-            A string containing the contents of the message to be scanned.
+        message : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`, :obj:`str` or :class:`aiospamc.common.FileBody`
+            The contents of the message to be scanned.  Strings are encoded
+            as UTF-8, bytes-like objects are sent as-is and file bodies are
+            streamed from the file.
 
             SPAMD will perform a scan on the included message.  SPAMD expects an
             RFC 822 or RFC 2822 formatted email.
@@ -326,13 +752,43 @@ class Client:
 
         return response
 
+    async def check_file(self, file):
+        '''Request the SPAMD service to check a message read from a file with a
+        CHECK request.
+
+        The file is streamed to SPAMD rather than read into memory.
+
+        Parameters
+        ----------
+        file : path-like object, :obj:`int` or file object
+            Path, file descriptor or binary file object of the message to be
+            scanned.  A file opened from a path is closed afterwards.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+            Same as :meth:`check`.
+
+        Raises
+        ------
+        :class:`OSError`
+            Raised if the file can't be opened or read.
+
+            Otherwise raises the same exceptions as :meth:`check`.
+        '''
+
+        with _open_file_body(file) as body:
+            return await self.check(body)
+
     async def headers(self, message):
         '''Request the SPAMD service to check a message with a HEADERS request.
 
         Parameters
         ----------
-        message : :obj:`str`
-            A string containing the contents of the message to be scanned.
+        message : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`, :obj:`str` or :class:`aiospamc.common.FileBody`
+            The contents of the message to be scanned.  Strings are encoded
+            as UTF-8, bytes-like objects are sent as-is and file bodies are
+            streamed from the file.
 
             SPAMD will perform a scan on the included message.  SPAMD expects an
             RFC 822 or RFC 2822 formatted email.
@@ -392,6 +848,34 @@ class Client:
 
         return response
 
+    async def headers_file(self, file):
+        '''Request the SPAMD service to check a message read from a file with a
+        HEADERS request.
+
+        The file is streamed to SPAMD rather than read into memory.
+
+        Parameters
+        ----------
+        file : path-like object, :obj:`int` or file object
+            Path, file descriptor or binary file object of the message to be
+            scanned.  A file opened from a path is closed afterwards.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+            Same as :meth:`headers`.
+
+        Raises
+        ------
+        :class:`OSError`
+            Raised if the file can't be opened or read.
+
+            Otherwise raises the same exceptions as :meth:`headers`.
+        '''
+
+        with _open_file_body(file) as body:
+            return await self.headers(body)
+
     async def ping(self):
         '''Sends a ping request to the SPAMD service and will receive a
         response if the serivce is alive.
@@ -453,8 +937,10 @@ class Client:
 
         Parameters
         ----------
-        message : :obj:`str`
-            A string containing the contents of the message to be scanned.
+        message : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`, :obj:`str` or :class:`aiospamc.common.FileBody`
+            The contents of the message to be scanned.  Strings are encoded
+            as UTF-8, bytes-like objects are sent as-is and file bodies are
+            streamed from the file.
 
             SPAMD will perform a scan on the included message.  SPAMD expects an
             RFC 822 or RFC 2822 formatted email.
@@ -514,13 +1000,43 @@ class Client:
 
         return response
 
+    async def process_file(self, file):
+        '''Request the SPAMD service to check a message read from a file with a
+        PROCESS request.
+
+        The file is streamed to SPAMD rather than read into memory.
+
+        Parameters
+        ----------
+        file : path-like object, :obj:`int` or file object
+            Path, file descriptor or binary file object of the message to be
+            scanned.  A file opened from a path is closed afterwards.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+            Same as :meth:`process`.
+
+        Raises
+        ------
+        :class:`OSError`
+            Raised if the file can't be opened or read.
+
+            Otherwise raises the same exceptions as :meth:`process`.
+        '''
+
+        with _open_file_body(file) as body:
+            return await self.process(body)
+
     async def report(self, message):
         '''Request the SPAMD service to check a message with a REPORT request.
 
         Parameters
         ----------
-        message : :obj:`str`
-            A string containing the contents of the message to be scanned.
+        message : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`, :obj:`str` or :class:`aiospamc.common.FileBody`
+            The contents of the message to be scanned.  Strings are encoded
+            as UTF-8, bytes-like objects are sent as-is and file bodies are
+            streamed from the file.
 
             SPAMD will perform a scan on the included message.  SPAMD expects an
             RFC 822 or RFC 2822 formatted email.
@@ -580,14 +1096,44 @@ class Client:
 
         return response
 
+    async def report_file(self, file):
+        '''Request the SPAMD service to check a message read from a file with a
+        REPORT request.
+
+        The file is streamed to SPAMD rather than read into memory.
+
+        Parameters
+        ----------
+        file : path-like object, :obj:`int` or file object
+            Path, file descriptor or binary file object of the message to be
+            scanned.  A file opened from a path is closed afterwards.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+            Same as :meth:`report`.
+
+        Raises
+        ------
+        :class:`OSError`
+            Raised if the file can't be opened or read.
+
+            Otherwise raises the same exceptions as :meth:`report`.
+        '''
+
+        with _open_file_body(file) as body:
+            return await self.report(body)
+
     async def report_if_spam(self, message):
         '''Request the SPAMD service to check a message with a REPORT_IFSPAM
         request.
 
         Parameters
         ----------
-        message : :obj:`str`
-            A string containing the contents of the message to be scanned.
+        message : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`, :obj:`str` or :class:`aiospamc.common.FileBody`
+            The contents of the message to be scanned.  Strings are encoded
+            as UTF-8, bytes-like objects are sent as-is and file bodies are
+            streamed from the file.
 
             SPAMD will perform a scan on the included message.  SPAMD expects an
             RFC 822 or RFC 2822 formatted email.
@@ -648,6 +1194,34 @@ class Client:
 
         return response
 
+    async def report_if_spam_file(self, file):
+        '''Request the SPAMD service to check a message read from a file with a
+        REPORT_IFSPAM request.
+
+        The file is streamed to SPAMD rather than read into memory.
+
+        Parameters
+        ----------
+        file : path-like object, :obj:`int` or file object
+            Path, file descriptor or binary file object of the message to be
+            scanned.  A file opened from a path is closed afterwards.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+            Same as :meth:`report_if_spam`.
+
+        Raises
+        ------
+        :class:`OSError`
+            Raised if the file can't be opened or read.
+
+            Otherwise raises the same exceptions as :meth:`report_if_spam`.
+        '''
+
+        with _open_file_body(file) as body:
+            return await self.report_if_spam(body)
+
     async def symbols(self, message):
         '''Request the SPAMD service to check a message with a SYMBOLS request.
 
@@ -656,8 +1230,10 @@ class Client:
 
         Parameters
         ----------
-        message : :obj:`str`
-            A string containing the contents of the message to be scanned.
+        message : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`, :obj:`str` or :class:`aiospamc.common.FileBody`
+            The contents of the message to be scanned.  Strings are encoded
+            as UTF-8, bytes-like objects are sent as-is and file bodies are
+            streamed from the file.
 
             SPAMD will perform a scan on the included message.  SPAMD expects an
             RFC 822 or RFC 2822 formatted email.
@@ -717,6 +1293,34 @@ class Client:
 
         return response
 
+    async def symbols_file(self, file):
+        '''Request the SPAMD service to check a message read from a file with a
+        SYMBOLS request.
+
+        The file is streamed to SPAMD rather than read into memory.
+
+        Parameters
+        ----------
+        file : path-like object, :obj:`int` or file object
+            Path, file descriptor or binary file object of the message to be
+            scanned.  A file opened from a path is closed afterwards.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+            Same as :meth:`symbols`.
+
+        Raises
+        ------
+        :class:`OSError`
+            Raised if the file can't be opened or read.
+
+            Otherwise raises the same exceptions as :meth:`symbols`.
+        '''
+
+        with _open_file_body(file) as body:
+            return await self.symbols(body)
+
     async def tell(self,
                    message_class,
                    message,
@@ -729,8 +1333,10 @@ class Client:
         ----------
         message_class : :class:`aiospamc.options.MessageClassOption`
             An enumeration to classify the message as 'spam' or 'ham.'
-        message : :obj:`str`
-            A string containing the contents of the message to be scanned.
+        message : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview`, :obj:`str` or :class:`aiospamc.common.FileBody`
+            The contents of the message to be scanned.  Strings are encoded
+            as UTF-8, bytes-like objects are sent as-is and file bodies are
+            streamed from the file.
 
             SPAMD will perform a scan on the included message.  SPAMD expects an
             RFC 822 or RFC 2822 formatted email.
@@ -800,3 +1406,41 @@ class Client:
         response = await self.send(request)
 
         return response
+
+    async def tell_file(self,
+                        message_class,
+                        file,
+                        remove_action=None,
+                        set_action=None,
+                       ):
+        '''Instruct the SPAMD service to to mark a message read from a file.
+
+        The file is streamed to SPAMD rather than read into memory.
+
+        Parameters
+        ----------
+        message_class : :class:`aiospamc.options.MessageClassOption`
+            An enumeration to classify the message as 'spam' or 'ham.'
+        file : path-like object, :obj:`int` or file object
+            Path, file descriptor or binary file object of the message.  A
+            file opened from a path is closed afterwards.
+        remove_action : :class:`aiospamc.options.ActionOption`
+            Remove message class for message in database.
+        set_action : :class:`aiospamc.options.ActionOption`
+            Set message class for message in database.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+            Same as :meth:`tell`.
+
+        Raises
+        ------
+        :class:`OSError`
+            Raised if the file can't be opened or read.
+
+            Otherwise raises the same exceptions as :meth:`tell`.
+        '''
+
+        with _open_file_body(file) as body:
+            return await self.tell(message_class, body, remove_action, set_action)
@@ -2,9 +2,81 @@
 
 '''Common classes for the project.'''
 
+import os
 import zlib
 
-from aiospamc.headers import ContentLength
+from aiospamc.compression import Compressor
+from aiospamc.headers import Compress, ContentLength
+
+
+class FileBody:
+    '''A body that is read from a file when it's sent instead of being held
+    in memory.
+
+    Attributes
+    ----------
+    file : file object
+        Binary file object the body is read from.
+    offset : :obj:`int`
+        Position in the file the body starts at.
+    length : :obj:`int`
+        Length of the body in bytes.
+    chunk_size : :obj:`int`
+        Number of bytes to read from the file at a time.
+    '''
+
+    chunk_size = 2 ** 16
+
+    def __init__(self, file, offset=0, count=None):
+        '''FileBody constructor.
+
+        Parameters
+        ----------
+        file : file object or :obj:`int`
+            Binary file object opened for reading, or a file descriptor.  The
+            file isn't closed by the body.
+        offset : :obj:`int`, optional
+            Position in the file the body starts at.
+        count : :obj:`int`, optional
+            Length of the body in bytes, defaults to the rest of the file.
+        '''
+
+        if isinstance(file, int):
+            file = open(file, 'rb', closefd=False)
+        self.file = file
+        self.offset = offset
+        if count is None:
+            count = os.fstat(file.fileno()).st_size - offset
+        self.length = count
+
+    def __repr__(self):
+        return '{}(file={}, offset={}, length={})'.format(self.__class__.__name__,
+                                                          repr(self.file),
+                                                          self.offset,
+                                                          self.length)
+
+    def __len__(self):
+        return self.length
+
+    def __bytes__(self):
+        return b''.join(self.chunks())
+
+    def chunks(self):
+        '''Reads the body from the file a chunk at a time.
+
+        Yields
+        ------
+        :obj:`bytes`
+        '''
+
+        self.file.seek(self.offset)
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.file.read(min(remaining, self.chunk_size))
+            if not chunk:
+                raise EOFError('File ended {} bytes before the end of the body'.format(remaining))
+            remaining -= len(chunk)
+            yield chunk
 
 
 class RequestResponseBase:
@@ -14,9 +86,9 @@ class RequestResponseBase:
         '''
         Parameters
         ----------
-        body : :obj:`str`, optional
-            String representation of the body.  An instance of the
-            aiospamc.headers.ContentLength will be automatically added.
+        body : bytes-like object, :obj:`str` or :class:`aiospamc.common.FileBody`, optional
+            Contents of the body.  Strings are encoded as UTF-8.  An instance
+            of the aiospamc.headers.ContentLength will be automatically added.
         headers : tuple of :class:`aiospamc.headers.Header`, optional
             Collection of headers to be added.  If it contains an instance of
             aiospamc.headers.Compress then the body is automatically
@@ -27,46 +99,48 @@ class RequestResponseBase:
             self._headers = {item.field_name(): item for item in headers}
         else:
             self._headers = {}
-        self._body = ''
+        self._body = b''
         self._compressed_body = None
         if body:
-            if isinstance(body, str):
-                self.body = body
-            elif isinstance(body, bytes):
-                self.body = self._decode_body(body, self._headers.values())
+            self.body = body
 
     @staticmethod
     def _decode_body(body, headers):
-        '''Parses a body of a response.
+        '''Parses a body as received from the connection.
 
         Parameters
         ----------
-        body : bytes
+        body : bytes-like object
             Bytes representation of body.
         headers : :obj:`tuple` or :obj:`list` of :class:`aiospamc.headers.Header`
             Collection of headers.
 
         Returns
         -------
-        str
-            Body in a string object.
+        bytes-like object
+            The body, decompressed if there's a Compress header, or `None` if
+            the body is empty.
         '''
 
         if not body:
             return None
         elif any(header.field_name() == 'Compress' for header in headers):
-            return zlib.decompress(body).decode()
+            return zlib.decompress(body)
         else:
-            return body.decode()
+            return body
 
     @property
     def body(self):
         '''Contains the contents of the body.
 
-        The getter will return a bytes object.
+        The getter will return the bytes-like object that was set, or a bytes
+        object if a string was set.
 
-        The setter expects a string.  If the :class:`aiospamc.headers.Compress`
-        header is present then the value of body will be compressed.
+        The setter expects a bytes-like object, a string or a
+        :class:`aiospamc.common.FileBody`.  Strings are encoded as UTF-8.
+        Bytes-like objects are stored without being copied.  If the
+        :class:`aiospamc.headers.Compress` header is present then the value of
+        body will be compressed.
 
         The deleter will automatically remove the
         :class:`aiospamc.headers.ContentLength` header.
@@ -76,19 +150,77 @@ class RequestResponseBase:
 
     @body.setter
     def body(self, value):
+        if isinstance(value, str):
+            value = value.encode()
         self._body = value
+        self._compressed_body = None
         if 'Compress' in self._headers:
             self._compress_body()
-        self._set_content_length(value)
+        else:
+            self._set_content_length(value)
 
     @body.deleter
     def body(self):
-        self._body = ''
+        self._body = b''
         self._compressed_body = None
         self.delete_header('Content-length')
 
+    def text(self, encoding='utf-8', errors='strict'):
+        '''Decodes the body to a string.
+
+        Parameters
+        ----------
+        encoding : :obj:`str`, optional
+            Encoding of the body, defaults to UTF-8.
+        errors : :obj:`str`, optional
+            How to handle decoding errors, as in :meth:`bytes.decode`.
+
+        Returns
+        -------
+        :obj:`str`
+        '''
+
+        return str(self._body, encoding, errors)
+
+    async def compress(self, compressor=None, executor=None):
+        '''Compresses the body and adds a :class:`aiospamc.headers.Compress`
+        header.
+
+        The body is only compressed once.  It isn't compressed again until a
+        new body is set.
+
+        Parameters
+        ----------
+        compressor : :class:`aiospamc.compression.Compressor`, optional
+            Compression settings to use, defaults to zlib's defaults.
+        executor : :class:`aiospamc.compression.CompressionExecutor`, optional
+            If given, large bodies are compressed in its thread pool.
+            Otherwise the body is compressed a chunk at a time on the event
+            loop.
+        '''
+
+        if self.body and self._compressed_body is None:
+            compressor = compressor or Compressor()
+            if executor:
+                self._compressed_body = await executor.compress(self.body, compressor)
+            else:
+                self._compressed_body = await compressor.compress_chunks(
+                    compressor.chunks(self.body))
+            self._set_content_length(self._compressed_body)
+        self._headers['Compress'] = Compress()
+
+    def _set_received_body(self, body, decoded_body):
+        '''Sets the body as it was received from the connection along with
+        its decoded form, so a compressed body isn't compressed again.  The
+        decoded body is kept as :obj:`bytes` whether or not it was
+        compressed.'''
+
+        self._body = bytes(decoded_body) if decoded_body else b''
+        self._compressed_body = body if 'Compress' in self._headers and body else None
+
     def _compress_body(self):
-        self._compressed_body = zlib.compress(self.body.encode())
+        if self._compressed_body is None:
+            self._compressed_body = Compressor().compress(self.body)
         self._set_content_length(self._compressed_body)
 
     def _decompress_body(self):
@@ -96,7 +228,11 @@ class RequestResponseBase:
         self._set_content_length(self.body)
 
     def _set_content_length(self, body_):
-        self.add_header(ContentLength(len(body_)))
+        if isinstance(body_, FileBody):
+            length = len(body_)
+        else:
+            length = memoryview(body_).nbytes
+        self.add_header(ContentLength(length))
 
     def add_header(self, header):
         '''Adds a header to the request.  A header with the same name will be
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+
+'''Compression of request bodies.'''
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import zlib
+
+
+def body_size(body):
+    '''Gets the size of a body in bytes.
+
+    Parameters
+    ----------
+    body : bytes-like object or :class:`aiospamc.common.FileBody`
+        The body to measure.
+
+    Returns
+    -------
+    :obj:`int`
+    '''
+
+    if hasattr(body, 'chunks'):
+        return len(body)
+
+    return memoryview(body).nbytes
+
+
+class Compressor:
+    '''Compresses bodies with zlib a chunk at a time.
+
+    SPAMD expects the zlib format, so the window size is limited to the zlib
+    range of 9 to 15 bits.
+
+    Attributes
+    ----------
+    level : :obj:`int`
+        Compression level from 0 to 9, or -1 for zlib's default.
+    wbits : :obj:`int`
+        Base two logarithm of the window size.
+    chunk_size : :obj:`int`
+        Number of bytes to compress at a time.
+    '''
+
+    def __init__(self, level=zlib.Z_DEFAULT_COMPRESSION, wbits=zlib.MAX_WBITS, chunk_size=2 ** 16):
+        '''Compressor constructor.
+
+        Parameters
+        ----------
+        level : :obj:`int`, optional
+            Compression level from 0 to 9, or -1 for zlib's default.
+        wbits : :obj:`int`, optional
+            Base two logarithm of the window size, from 9 to 15.
+        chunk_size : :obj:`int`, optional
+            Number of bytes to compress at a time.
+
+        Raises
+        ------
+        ValueError
+            Raised if the level or window size is out of range.
+        '''
+
+        if not -1 <= level <= 9:
+            raise ValueError('Compression level must be between -1 and 9')
+        if not 9 <= wbits <= 15:
+            raise ValueError('Window size must be between 9 and 15 bits')
+
+        self.level = level
+        self.wbits = wbits
+        self.chunk_size = chunk_size
+
+    def __repr__(self):
+        return '{}(level={}, wbits={})'.format(self.__class__.__name__,
+                                               self.level,
+                                               self.wbits)
+
+    def compressobj(self):
+        '''Creates a zlib compression object with the configured settings.
+
+        Returns
+        -------
+        zlib compression object
+        '''
+
+        return zlib.compressobj(self.level, zlib.DEFLATED, self.wbits)
+
+    def chunks(self, body):
+        '''Splits a body into chunks.
+
+        Parameters
+        ----------
+        body : bytes-like object or :class:`aiospamc.common.FileBody`
+            The body to split.  File bodies are read a chunk at a time.
+
+        Returns
+        -------
+        iterable of bytes-like objects
+        '''
+
+        if hasattr(body, 'chunks'):
+            return body.chunks()
+
+        view = memoryview(body).cast('B')
+        return (view[start:start + self.chunk_size]
+                for start in range(0, len(view), self.chunk_size))
+
+    def compress(self, body):
+        '''Compresses a whole body.
+
+        Parameters
+        ----------
+        body : bytes-like object or :class:`aiospamc.common.FileBody`
+            The body to compress.
+
+        Returns
+        -------
+        :obj:`bytearray`
+        '''
+
+        compressor = self.compressobj()
+        compressed = bytearray()
+        for chunk in self.chunks(body):
+            compressed += compressor.compress(chunk)
+        compressed += compressor.flush()
+
+        return compressed
+
+    async def compress_chunks(self, chunks):
+        '''Compresses chunks as they're produced, yielding to the event loop
+        between chunks so other requests keep making progress.
+
+        Parameters
+        ----------
+        chunks : iterable or asynchronous iterable of bytes-like objects
+            The chunks to compress.
+
+        Returns
+        -------
+        :obj:`bytearray`
+        '''
+
+        compressor = self.compressobj()
+        compressed = bytearray()
+        if hasattr(chunks, '__aiter__'):
+            async for chunk in chunks:
+                compressed += compressor.compress(chunk)
+        else:
+            for chunk in chunks:
+                compressed += compressor.compress(chunk)
+                await asyncio.sleep(0)
+        compressed += compressor.flush()
+
+        return compressed
+
+
+class CompressionExecutor:
+    '''Runs compression and decompression of large bodies in a thread pool
+    so they don't block the event loop.  zlib releases the GIL while it works,
+    so the threads run in parallel with the loop.
+
+    Bodies smaller than the threshold are handled on the loop since handing
+    them off costs more than compressing them.
+
+    Attributes
+    ----------
+    threshold : :obj:`int`
+        Bodies of this many bytes or more are handled in the thread pool.
+    max_workers : :obj:`int`
+        Number of threads in the pool.
+    inline : :obj:`int`
+        Number of bodies handled on the event loop.
+    offloaded : :obj:`int`
+        Number of bodies handled in the thread pool.
+    pending : :obj:`int`
+        Number of bodies waiting for or being handled by the thread pool.
+    queue_time_total : :obj:`float`
+        Total seconds offloaded bodies waited for a thread.
+    queue_time_max : :obj:`float`
+        Longest time in seconds an offloaded body waited for a thread.
+    '''
+
+    def __init__(self, threshold=2 ** 16, max_workers=None, loop=None):
+        '''CompressionExecutor constructor.
+
+        Parameters
+        ----------
+        threshold : :obj:`int`, optional
+            Bodies of this many bytes or more are handled in the thread pool.
+        max_workers : :obj:`int`, optional
+            Number of threads in the pool, defaults to the number of CPUs.
+        loop : :class:`asyncio.AbstractEventLoop`, optional
+            The asyncio event loop.
+        '''
+
+        self.threshold = threshold
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.loop = loop
+        self.inline = 0
+        self.offloaded = 0
+        self.pending = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def __repr__(self):
+        return '{}(threshold={}, max_workers={})'.format(self.__class__.__name__,
+                                                         self.threshold,
+                                                         self.max_workers)
+
+    @property
+    def mean_queue_time(self):
+        '''Average time in seconds an offloaded body waited for a thread.'''
+
+        if not self.offloaded:
+            return 0.0
+
+        return self.queue_time_total / self.offloaded
+
+    async def compress(self, body, compressor=None):
+        '''Compresses a body.
+
+        Parameters
+        ----------
+        body : bytes-like object or :class:`aiospamc.common.FileBody`
+            The body to compress.
+        compressor : :class:`aiospamc.compression.Compressor`, optional
+            Compression settings to use, defaults to zlib's defaults.
+
+        Returns
+        -------
+        :obj:`bytearray`
+        '''
+
+        compressor = compressor or Compressor()
+
+        return await self._run(compressor.compress, body)
+
+    async def decompress(self, body):
+        '''Decompresses a body.
+
+        Parameters
+        ----------
+        body : bytes-like object
+            The zlib compressed body.
+
+        Returns
+        -------
+        :obj:`bytes`
+
+        Raises
+        ------
+        :class:`zlib.error`
+            Raised if the body isn't valid zlib data.
+        '''
+
+        return await self._run(zlib.decompress, body)
+
+    def shutdown(self, wait=True):
+        '''Shuts down the thread pool.
+
+        Parameters
+        ----------
+        wait : :obj:`bool`, optional
+            If true, waits for the running jobs to finish.
+        '''
+
+        self._executor.shutdown(wait=wait)
+
+    async def _run(self, func, body):
+        if body_size(body) < self.threshold:
+            self.inline += 1
+            return func(body)
+
+        loop = self.loop or asyncio.get_event_loop()
+        self.pending += 1
+        try:
+            queue_time, result = await loop.run_in_executor(self._executor,
+                                                            self._timed,
+                                                            func,
+                                                            body,
+                                                            time.monotonic())
+        finally:
+            self.pending -= 1
+        self.offloaded += 1
+        self.queue_time_total += queue_time
+        self.queue_time_max = max(self.queue_time_max, queue_time)
+
+        return result
+
+    @staticmethod
+    def _timed(func, body, submitted):
+        return time.monotonic() - submitted, func(body)
+
+
+class CompressionPolicy:
+    '''Decides for each request whether compressing its body lowers the time
+    it takes to send it.
+
+    Compressing a body of ``S`` bytes costs ``S / compress_throughput``
+    seconds and saves ``S * (1 - ratio) / link_throughput`` seconds on the
+    wire, so it pays off when the link is slower than
+    ``compress_throughput * (1 - ratio)``.  Both sides scale with the size
+    of the body, so the decision only depends on the rates.  Decompression on
+    SPAMD is several times faster than compression and isn't counted.
+
+    Bodies sent over local connections, such as Unix domain sockets, and
+    bodies smaller than :attr:`min_size` are never compressed.
+
+    The link throughput is measured for each backend from the time between
+    starting to send a request and the first byte of its response.  That
+    time includes SPAMD scanning the message, so the usual response time of
+    requests too small to measure the link, mostly scanning, is subtracted
+    from it.  A pool's links are taken to be as fast as the median of its
+    measured backends, since the backend isn't chosen until after the
+    decision.  Until a link has been measured the configured
+    :attr:`link_throughput` is used, and if that's `None` the body isn't
+    compressed.  The compression ratio and throughput are measured by
+    compressing a sample from the start of a body every
+    :attr:`sample_interval` decisions.
+
+    Attributes
+    ----------
+    compressor : :class:`aiospamc.compression.Compressor`
+        Compression settings used when the body is compressed.
+    min_size : :obj:`int`
+        Bodies smaller than this many bytes are never compressed.
+    link_throughput : :obj:`float`
+        Assumed bytes per second of links that haven't been measured yet.
+    ratio : :obj:`float`
+        Smoothed ratio of compressed to original size.
+    compress_throughput : :obj:`float`
+        Smoothed bytes per second that are compressed, or `None` if nothing
+        has been sampled yet.
+    link_throughputs : :obj:`dict`
+        Smoothed bytes per second measured for each backend, keyed by the
+        :class:`aiospamc.connections.pooled_connection.Backend` of a pool or
+        by the connection manager of a single service.
+    response_times : :obj:`dict`
+        Smoothed seconds until the first byte of the response to a request
+        smaller than :attr:`min_transfer_size`, for each backend.
+    sample_size : :obj:`int`
+        Number of bytes compressed to sample a body.
+    sample_interval : :obj:`int`
+        Number of decisions between samples.
+    min_transfer_size : :obj:`int`
+        Requests smaller than this many bytes are too short to measure the
+        link, and only measure how long SPAMD takes to answer.
+    smoothing : :obj:`float`
+        Weight given to each new measurement.
+    '''
+
+    def __init__(self,
+                 compressor=None,
+                 min_size=2 ** 12,
+                 link_throughput=None,
+                 ratio=0.5,
+                 sample_size=2 ** 14,
+                 sample_interval=100,
+                 min_transfer_size=2 ** 16,
+                 smoothing=0.2):
+        '''CompressionPolicy constructor.
+
+        Parameters
+        ----------
+        compressor : :class:`aiospamc.compression.Compressor`, optional
+            Compression settings used when the body is compressed.
+        min_size : :obj:`int`, optional
+            Bodies smaller than this many bytes are never compressed.
+        link_throughput : :obj:`float`, optional
+            Assumed bytes per second of links that haven't been measured.
+        ratio : :obj:`float`, optional
+            Assumed ratio of compressed to original size until a body is
+            sampled.
+        sample_size : :obj:`int`, optional
+            Number of bytes compressed to sample a body.
+        sample_interval : :obj:`int`, optional
+            Number of decisions between samples.
+        min_transfer_size : :obj:`int`, optional
+            Requests smaller than this many bytes only measure how long SPAMD
+            takes to answer.
+        smoothing : :obj:`float`, optional
+            Weight given to each new measurement, between 0 and 1.
+        '''
+
+        self.compressor = compressor or Compressor()
+        self.min_size = min_size
+        self.link_throughput = link_throughput
+        self.ratio = ratio
+        self.compress_throughput = None
+        self.link_throughputs = {}
+        self.response_times = {}
+        self.sample_size = sample_size
+        self.sample_interval = sample_interval
+        self.min_transfer_size = min_transfer_size
+        self.smoothing = smoothing
+        self._decisions = 0
+
+    def __repr__(self):
+        return '{}(compressor={}, min_size={}, link_throughput={})'.format(
+                self.__class__.__name__,
+                repr(self.compressor),
+                self.min_size,
+                self.link_throughput
+        )
+
+    def should_compress(self, body, manager):
+        '''Decides whether to compress a body.
+
+        Parameters
+        ----------
+        body : bytes-like object or :class:`aiospamc.common.FileBody`
+            The body of the request.
+        manager : :class:`aiospamc.connections.ConnectionManager`
+            The manager the request will be sent with.
+
+        Returns
+        -------
+        :obj:`bool`
+        '''
+
+        if getattr(manager, 'local', False) or body_size(body) < self.min_size:
+            return False
+
+        link_throughput = self._link_throughput(manager)
+        if link_throughput is None:
+            return False
+
+        if self.compress_throughput is None or self._decisions % self.sample_interval == 0:
+            self.sample(body)
+        self._decisions += 1
+
+        return link_throughput < self.compress_throughput * (1 - self.ratio)
+
+    def sample(self, body):
+        '''Compresses the start of a body to measure the compression ratio
+        and throughput.
+
+        Parameters
+        ----------
+        body : bytes-like object or :class:`aiospamc.common.FileBody`
+            The body to sample.
+        '''
+
+        chunks = self.compressor.chunks(body)
+        sample = bytes(next(iter(chunks), b'')[:self.sample_size])
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        if not sample:
+            return
+
+        start = time.perf_counter()
+        compressor = self.compressor.compressobj()
+        compressed_size = len(compressor.compress(sample)) + len(compressor.flush())
+        elapsed = max(time.perf_counter() - start, 1e-9)
+
+        ratio = compressed_size / len(sample)
+        throughput = len(sample) / elapsed
+        if self.compress_throughput is None:
+            self.ratio = ratio
+            self.compress_throughput = throughput
+        else:
+            self.ratio = self._smooth(self.ratio, ratio)
+            self.compress_throughput = self._smooth(self.compress_throughput, throughput)
+
+    def _link_throughput(self, manager):
+        links = getattr(manager, 'backends', None) or [manager]
+        measured = sorted(self.link_throughputs[link] for link in links if link in self.link_throughputs)
+        if not measured:
+            return self.link_throughput
+
+        return measured[len(measured) // 2]
+
+    def record_transfer(self, link, size, seconds):
+        '''Records how long a backend took to start answering a request to
+        measure the link.
+
+        A request smaller than :attr:`min_transfer_size` updates the usual
+        response time of the backend.  A larger one measures the link, once
+        the usual response time is known, from the time left after taking it
+        away.
+
+        Parameters
+        ----------
+        link : object
+            The :class:`aiospamc.connections.pooled_connection.Backend` the
+            request was sent to, or the
+            :class:`aiospamc.connections.ConnectionManager` if it isn't a pool.
+        size : :obj:`int`
+            Number of bytes sent.
+        seconds : :obj:`float`
+            Time from starting to send the request until the first byte of
+            the response.
+        '''
+
+        if seconds <= 0:
+            return
+
+        if size < self.min_transfer_size:
+            if link in self.response_times:
+                seconds = self._smooth(self.response_times[link], seconds)
+            self.response_times[link] = seconds
+            return
+
+        response_time = self.response_times.get(link)
+        if response_time is None or seconds <= response_time:
+            return
+
+        throughput = size / (seconds - response_time)
+        if link in self.link_throughputs:
+            throughput = self._smooth(self.link_throughputs[link], throughput)
+        self.link_throughputs[link] = throughput
+
+    def _smooth(self, average, value):
+        return (1 - self.smoothing) * average + self.smoothing * value
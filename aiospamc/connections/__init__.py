@@ -4,6 +4,66 @@
 
 import asyncio
 import logging
+import socket
+import struct
+import time
+
+from aiospamc.common import FileBody
+from aiospamc.exceptions import AIOSpamcConnectionTimeout
+
+
+class Timeouts:
+    '''Timeouts in seconds for each part of a request.  A timeout of `None`
+    waits forever.
+
+    Attributes
+    ----------
+    connect : float
+        Time to open a connection.
+    write : float
+        Time for each write of the request to be accepted by the connection.
+    read : float
+        Time to wait for each read of the response.
+    total : float
+        Time for the whole request, from connecting until the response has
+        been received.
+    '''
+
+    def __init__(self, connect=None, write=None, read=None, total=None):
+        '''Timeouts constructor.
+
+        Parameters
+        ----------
+        connect : float, optional
+            Time to open a connection.
+        write : float, optional
+            Time for each write of the request.
+        read : float, optional
+            Time to wait for each read of the response.
+        total : float, optional
+            Time for the whole request.
+
+        Raises
+        ------
+        ValueError
+            Raised if a timeout isn't positive.
+        '''
+
+        for timeout in (connect, write, read, total):
+            if timeout is not None and timeout <= 0:
+                raise ValueError('Timeouts must be positive')
+
+        self.connect = connect
+        self.write = write
+        self.read = read
+        self.total = total
+
+    def __repr__(self):
+        return '{}(connect={}, write={}, read={}, total={})'.format(self.__class__.__name__,
+                                                                    self.connect,
+                                                                    self.write,
+                                                                    self.read,
+                                                                    self.total)
 
 
 class Connection:
@@ -13,33 +73,52 @@ class Connection:
     ----------
     connected : bool
         Status on if the connection is established.
+    first_byte_at : float
+        Time, from :func:`time.monotonic`, the first byte of the response
+        arrived, or `None` if none has yet.
     loop : asyncio.AbstratEventLoop
         The asyncio event loop.
     logger : logging.Logger
         Logging instance.  Logs to 'aiospamc.connections'
+    read_size : int
+        Maximum number of bytes to read from the connection at a time.
+    timeouts : aiospamc.connections.Timeouts
+        Timeouts for connecting, writing and reading.
     '''
 
-    def __init__(self, loop=None):
+    read_size = 2 ** 16
+
+    def __init__(self, loop=None, timeouts=None):
         '''Connection constructor.
 
         Parameters
         ----------
         loop : asyncio.AbstractEventLoop
             The asyncio event loop.
+        timeouts : aiospamc.connections.Timeouts, optional
+            Timeouts for connecting, writing and reading.
         '''
 
         self.connected = False
+        self.first_byte_at = None
         self.loop = loop or asyncio.get_event_loop()
+        self.timeouts = timeouts or Timeouts()
         self.logger = logging.getLogger(__name__)
 
     async def __aenter__(self):
         self.logger.debug('Connecting to %s', self.connection_string)
-        self.reader, self.writer = await self.open()
+        self.reader, self.writer = await self._wait(self.open(), self.timeouts.connect, 'Connecting')
         self.connected = True
         self.logger.debug('Connected to %s', self.connection_string)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.logger.debug('Aborting connection to %s after %s', self.connection_string, exc_type.__name__)
+            self.abort()
+            del self.reader, self.writer
+            return
+
         self.logger.debug('Closing connection to %s', self.connection_string)
         self.close()
         self.logger.debug('Closed connection to %s', self.connection_string)
@@ -74,6 +153,52 @@ class Connection:
 
         raise NotImplementedError
 
+    def abort(self):
+        '''Closes the connection straight away, discarding anything that
+        hasn't been sent yet.
+
+        Used when a request is cancelled, times out or fails part way.  A TCP
+        connection is reset rather than shut down, so SPAMD's next read or
+        write on it fails at once and the child handling it is freed instead
+        of scanning a message nobody will read the result of.
+        '''
+
+        writer = getattr(self, 'writer', None)
+        if writer is not None:
+            sock = writer.get_extra_info('socket')
+            if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                except OSError:
+                    pass
+            writer.transport.abort()
+        self.connected = False
+
+    async def _drain(self):
+        await self._wait(self.writer.drain(), self.timeouts.write, 'Sending to')
+
+    async def _wait(self, awaitable, timeout, operation):
+        '''Waits for an operation, aborting the connection if it takes longer
+        than the timeout.
+
+        Raises
+        ------
+        aiospamc.exceptions.AIOSpamcConnectionTimeout
+        '''
+
+        if timeout is None:
+            return await awaitable
+
+        try:
+            return await asyncio.wait_for(awaitable, timeout, loop=self.loop)
+        except asyncio.TimeoutError:
+            self.abort()
+            raised = AIOSpamcConnectionTimeout('{} {} timed out after {} seconds'.format(operation,
+                                                                                      self.connection_string,
+                                                                                      timeout))
+            self.logger.warning('%s', raised)
+            raise raised
+
     def close(self):
         '''Closes the connection.'''
 
@@ -86,12 +211,52 @@ class Connection:
 
         Parameters
         ----------
-        data : bytes
-            Data to send.
+        data : bytes or list of bytes-like objects
+            Data to send.  Each buffer of a list is written as it is rather
+            than joined with the others, so a large body isn't copied along
+            with the headers.  The list may also contain
+            :class:`aiospamc.common.FileBody` objects, which are sent with
+            :meth:`send_file`.
+        '''
+
+        if not isinstance(data, list):
+            data = [data]
+
+        for item in data:
+            if isinstance(item, FileBody):
+                await self.send_file(item)
+            else:
+                self.writer.write(item)
+        await self._drain()
+
+    async def send_file(self, body):
+        '''Sends a body from a file.
+
+        If the event loop supports it the file is sent with
+        :meth:`asyncio.AbstractEventLoop.sendfile` so it's never read into
+        Python.  Over TLS, or where sendfile isn't available, the file is read
+        and written a chunk at a time instead.
+
+        Parameters
+        ----------
+        body : aiospamc.common.FileBody
+            The body to send.
         '''
 
-        self.writer.write(data)
-        await self.writer.drain()
+        await self._drain()
+        if not len(body):
+            return
+
+        if hasattr(self.loop, 'sendfile') and not self.writer.get_extra_info('sslcontext'):
+            self.logger.debug('Sending %d bytes with sendfile to %s', len(body), self.connection_string)
+            await self._wait(self.loop.sendfile(self.writer.transport, body.file, body.offset, len(body)),
+                             self.timeouts.write,
+                             'Sending to')
+        else:
+            self.logger.debug('Sending %d bytes in chunks to %s', len(body), self.connection_string)
+            for chunk in body.chunks():
+                self.writer.write(chunk)
+                await self._drain()
 
     async def receive(self):
         '''Receives data from the connection.
@@ -102,7 +267,56 @@ class Connection:
             Data received.
         '''
 
-        return await self.reader.read()
+        return await self._wait(self.reader.read(), self.timeouts.read, 'Receiving from')
+
+    async def receive_response(self, parser, timeout=None):
+        '''Receives a response from the connection, feeding it to the parser as
+        it arrives.  Once the parser has reached the body, reads are sized so
+        they never go past the Content-length.  Stops reading once the parser
+        has a complete response or the connection is closed.
+
+        Data after the end of a response with a Content-length is never read,
+        so it isn't detected.  Reading on until SPAMD closes the connection
+        would add that wait to every request.
+
+        Parameters
+        ----------
+        parser : aiospamc.parser.ResponseParser
+            Parser to give the data to.
+        timeout : float, optional
+            Time to wait for the whole response, in place of the read timeout
+            in :attr:`timeouts` for each read.
+
+        Returns
+        -------
+        aiospamc.parser.ResponseParser
+            The parser given.
+
+        Raises
+        ------
+        aiospamc.parser.ParseError
+            Raised if the data isn't a valid response.
+        '''
+
+        if timeout is None:
+            return await self._receive(parser, self.timeouts.read)
+
+        return await self._wait(self._receive(parser, None), timeout, 'Receiving from')
+
+    async def _receive(self, parser, read_timeout):
+        while not parser.complete:
+            needed = parser.bytes_needed
+            data = await self._wait(self.reader.read(min(needed, self.read_size) if needed else self.read_size),
+                                    read_timeout,
+                                    'Receiving from')
+            if not data:
+                parser.feed_eof()
+                break
+            if self.first_byte_at is None:
+                self.first_byte_at = time.monotonic()
+            parser.feed(data)
+
+        return parser
 
 
 class ConnectionManager:
@@ -112,10 +326,22 @@ class ConnectionManager:
     ----------
     loop : asyncio.AbstratEventLoop
         The asyncio event loop.
+    local : bool
+        Whether connections stay on this host, in which case compressing
+        request bodies never pays off.
+    routed : bool
+        Whether :meth:`new_connection` takes the backends to avoid, the key
+        and the size of the request, to choose where to send it.
+    timeouts : aiospamc.connections.Timeouts
+        Timeouts given to each connection.
     '''
 
-    def __init__(self, loop=None):
+    local = False
+    routed = False
+
+    def __init__(self, loop=None, timeouts=None):
         self.loop = loop or asyncio.get_event_loop()
+        self.timeouts = timeouts or Timeouts()
 
     def new_connection(self):
         '''Creates a connection object.
@@ -127,3 +353,9 @@ class ConnectionManager:
         '''
 
         raise NotImplementedError
+
+    def close(self):
+        '''Stops any background tasks and closes idle connections.
+        Connections in use aren't affected.'''
+
+        pass
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+'''Pool of the addresses of a SPAMD hostname that follows changes to its DNS
+records.'''
+
+import asyncio
+
+from aiospamc.connections.pooled_connection import PooledConnectionManager
+from aiospamc.connections.tcp_connection import TcpConnectionManager
+from aiospamc.exceptions import AIOSpamcConnectionFailed
+
+
+class AddressPoolConnectionManager(PooledConnectionManager):
+    '''Pool with a backend for each address of a hostname, which is resolved
+    again every :attr:`interval` seconds.
+
+    Until the hostname has been resolved the pool has a single backend that
+    connects to the hostname itself.  Each time it's resolved the pool is
+    updated with
+    :meth:`aiospamc.connections.pooled_connection.PooledConnectionManager.update`:
+    new addresses are added, removed ones finish the requests they have in
+    flight, and the ones that stay keep their load, health and latency.  If
+    resolving fails the current backends are kept.
+
+    Attributes
+    ----------
+    manager : aiospamc.connections.tcp_connection.TcpConnectionManager
+        Manager for the hostname, whose resolver and settings each address
+        uses.
+    interval : float
+        Seconds between lookups of the hostname.
+    refreshes : int
+        Number of times the backends were updated from a lookup.
+    refresh_failures : int
+        Number of times the hostname couldn't be resolved.
+    '''
+
+    def __init__(self, manager, interval=None, loop=None, **kwargs):
+        '''Constructor for AddressPoolConnectionManager.
+
+        Parameters
+        ----------
+        manager : aiospamc.connections.tcp_connection.TcpConnectionManager
+            Manager for the hostname.
+        interval : float, optional
+            Seconds between lookups of the hostname, or 0 to only resolve it
+            when :meth:`refresh` is called.  Defaults to the time the
+            manager's resolver caches addresses for.
+        loop : asyncio.AbstractEventLoop, optional
+            The asyncio event loop.  Defaults to the manager's.
+        **kwargs
+            Passed to
+            :class:`aiospamc.connections.pooled_connection.PooledConnectionManager`.
+        '''
+
+        self.manager = manager
+        self.interval = manager.resolver.ttl if interval is None else interval
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._watch = None
+        host = TcpConnectionManager(manager.host,
+                                    manager.port,
+                                    manager.ssl,
+                                    manager.loop,
+                                    manager.timeouts,
+                                    manager.resolver,
+                                    manager.server_hostname,
+                                    manager.happy_eyeballs_delay)
+        super().__init__([host], loop=loop or manager.loop, **kwargs)
+        self.timeouts = manager.timeouts
+
+    def __repr__(self):
+        return '{}(manager={}, backends={})'.format(self.__class__.__name__,
+                                                    repr(self.manager),
+                                                    repr(self.backends))
+
+    async def refresh(self):
+        '''Resolves the hostname and updates the backends with its addresses.
+
+        Returns
+        -------
+        bool
+            Whether the backends were updated.
+        '''
+
+        try:
+            self.update(await self.manager.address_managers(refresh=True))
+        except (AIOSpamcConnectionFailed, ValueError) as error:
+            self.refresh_failures += 1
+            self.logger.warning('Could not resolve %s: %s', self.manager.host, error)
+            return False
+
+        self.refreshes += 1
+        self.logger.debug('Resolved %s to %d addresses', self.manager.host, len(self.backends))
+
+        return True
+
+    def new_connection(self, avoid=(), key=None, size=None):
+        '''Creates a connection to the backend chosen by the strategy.  Starts
+        resolving the hostname in the background if it isn't already.
+
+        Parameters
+        ----------
+        avoid : collection of aiospamc.connections.pooled_connection.Backend, optional
+            Backends to only connect to if no others can be.
+        key : str or bytes, optional
+            Key of the request for strategies that route by key.
+        size : int, optional
+            Size of the request in bytes.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.PooledConnection
+        '''
+
+        self.start_watching()
+
+        return super().new_connection(avoid, key, size)
+
+    def start_watching(self):
+        '''Starts resolving the hostname in the background, if enabled and not
+        already running.  The first lookup is made straight away.'''
+
+        if not self.interval or self._watch is not None:
+            return
+
+        self._watch = asyncio.ensure_future(self._watch_forever(), loop=self.loop)
+
+    def stop_watching(self):
+        '''Stops resolving the hostname.'''
+
+        if self._watch is not None:
+            self._watch.cancel()
+            self._watch = None
+
+    def close(self):
+        '''Stops resolving the hostname and the health checks and closes each
+        backend's manager and the hostname's manager.'''
+
+        self.stop_watching()
+        super().close()
+        self.manager.close()
+
+    async def _watch_forever(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval, loop=self.loop)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+'''Pool of SPAMD backends listed in a file that's reloaded when it changes.'''
+
+import asyncio
+import configparser
+import json
+import os
+
+from aiospamc.connections.pooled_connection import PooledConnectionManager
+from aiospamc.connections.tcp_connection import TcpConnectionManager
+from aiospamc.connections.tls import create_ssl_context
+from aiospamc.connections.unix_connection import UnixConnectionManager
+
+
+def read_backend_file(path):
+    '''Reads the backends listed in a file.
+
+    Files ending in ``.json`` hold a list of objects, or an object with the
+    list under ``"backends"``.  Other files are INI files with a section for
+    each backend.  Each backend has either a ``host`` and optional ``port``,
+    783 by default, or a ``socket`` path, and optionally a ``weight`` and
+    ``ssl``.  For example::
+
+        [spamd1]
+        host = spamd1.example.net
+        weight = 2
+
+        [local]
+        socket = /var/run/spamassassin/spamd.sock
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+
+    Returns
+    -------
+    list of dict
+        Each backend's ``host``, ``port``, ``socket``, ``weight`` and ``ssl``,
+        with `None` for the ones not given.
+
+    Raises
+    ------
+    OSError
+        Raised if the file can't be read.
+    ValueError
+        Raised if the file isn't valid.
+    '''
+
+    with open(path) as file:
+        text = file.read()
+
+    if path.endswith('.json'):
+        entries = json.loads(text)
+        if isinstance(entries, dict):
+            entries = entries.get('backends')
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise ValueError('Expected a list of backends in {}'.format(path))
+    else:
+        parser = configparser.ConfigParser()
+        try:
+            parser.read_string(text, path)
+        except configparser.Error as error:
+            raise ValueError(str(error))
+        entries = [dict(parser.items(section)) for section in parser.sections()]
+
+    return [_parse_entry(entry) for entry in entries]
+
+
+def _parse_entry(entry):
+    if bool(entry.get('host')) == bool(entry.get('socket')):
+        raise ValueError('Backend needs either a host or a socket: {}'.format(entry))
+
+    ssl = entry.get('ssl')
+    if isinstance(ssl, str):
+        ssl = ssl.strip().lower() in ('1', 'yes', 'true', 'on')
+
+    try:
+        return {
+            'host': entry.get('host'),
+            'port': int(entry.get('port', 783)),
+            'socket': entry.get('socket'),
+            'weight': float(entry.get('weight', 1)),
+            'ssl': ssl,
+        }
+    except (TypeError, ValueError):
+        raise ValueError('Invalid port or weight: {}'.format(entry))
+
+
+class BackendFileConnectionManager(PooledConnectionManager):
+    '''Pool of the backends listed in a file, which is checked for changes
+    every :attr:`interval` seconds.
+
+    When the file changes the pool is updated with
+    :meth:`aiospamc.connections.pooled_connection.PooledConnectionManager.update`:
+    new backends are added, removed ones finish the requests they have in
+    flight, and the ones that stay keep their load, health, latency and
+    cached addresses.  If the file can't be read or isn't valid the current
+    backends are kept.  See :func:`read_backend_file` for the format.
+
+    Attributes
+    ----------
+    path : str
+        Path of the file.
+    interval : float
+        Seconds between checks of the file.
+    ssl : bool or ssl.SSLContext
+        Whether backends use TLS unless the file says otherwise.
+    timeouts : aiospamc.connections.Timeouts
+        Timeouts given to each backend.
+    reloads : int
+        Number of times the backends were updated from the file.
+    reload_failures : int
+        Number of times the file couldn't be loaded.
+    '''
+
+    def __init__(self, path, interval=5.0, ssl=False, timeouts=None, loop=None, **kwargs):
+        '''Constructor for BackendFileConnectionManager.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file listing the backends.
+        interval : float, optional
+            Seconds between checks of the file, or `None` to only reload it
+            when :meth:`reload` is called.
+        ssl : bool or ssl.SSLContext, optional
+            Whether backends use TLS unless the file says otherwise.  All of
+            them share one SSL context.
+        timeouts : aiospamc.connections.Timeouts, optional
+            Timeouts given to each backend.
+        loop : asyncio.AbstractEventLoop, optional
+            The asyncio event loop.
+        **kwargs
+            Passed to
+            :class:`aiospamc.connections.pooled_connection.PooledConnectionManager`.
+
+        Raises
+        ------
+        OSError
+            Raised if the file can't be read.
+        ValueError
+            Raised if the file isn't valid or lists no backends.
+        '''
+
+        self.path = path
+        self.interval = interval
+        self.ssl = ssl
+        self._ssl_context = ssl if ssl and ssl is not True else None
+        self.reloads = 0
+        self.reload_failures = 0
+        self._version = self._stat()
+        self._watch = None
+        loop = loop or asyncio.get_event_loop()
+        super().__init__(self._load(loop, timeouts), loop=loop, **kwargs)
+        self.timeouts = timeouts or self.timeouts
+
+    def __repr__(self):
+        return '{}(path={}, backends={})'.format(self.__class__.__name__,
+                                                 repr(self.path),
+                                                 repr(self.backends))
+
+    def _stat(self):
+        stat = os.stat(self.path)
+
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _load(self, loop, timeouts):
+        backends = []
+        for entry in read_backend_file(self.path):
+            if entry['socket']:
+                manager = UnixConnectionManager(entry['socket'], loop=loop, timeouts=timeouts)
+            else:
+                manager = TcpConnectionManager(entry['host'],
+                                               entry['port'],
+                                               ssl=self._ssl(entry['ssl']),
+                                               loop=loop,
+                                               timeouts=timeouts)
+            backends.append((manager, entry['weight']))
+
+        return backends
+
+    def _ssl(self, enabled):
+        if enabled is None:
+            enabled = bool(self.ssl)
+        if not enabled:
+            return False
+        if self._ssl_context is None:
+            self._ssl_context = create_ssl_context()
+
+        return self._ssl_context
+
+    def reload(self, force=False):
+        '''Updates the backends from the file if it has changed.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Whether to load the file even if it hasn't changed.  A file that
+            couldn't be loaded is only tried again once it changes.
+
+        Returns
+        -------
+        bool
+            Whether the backends were updated.
+        '''
+
+        try:
+            version = self._stat()
+            if version == self._version and not force:
+                return False
+            self._version = version
+            self.update(self._load(self.loop, self.timeouts))
+        except (OSError, ValueError) as error:
+            self.reload_failures += 1
+            self.logger.warning('Could not load backends from %s: %s', self.path, error)
+            return False
+
+        self.reloads += 1
+        self.logger.info('Loaded %d backends from %s', len(self.backends), self.path)
+
+        return True
+
+    def new_connection(self, avoid=(), key=None, size=None):
+        '''Creates a connection to the backend chosen by the strategy.  Starts
+        watching the file if it isn't already.
+
+        Parameters
+        ----------
+        avoid : collection of aiospamc.connections.pooled_connection.Backend, optional
+            Backends to only connect to if no others can be.
+        key : str or bytes, optional
+            Key of the request for strategies that route by key.
+        size : int, optional
+            Size of the request in bytes.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.PooledConnection
+        '''
+
+        self.start_watching()
+
+        return super().new_connection(avoid, key, size)
+
+    def start_watching(self):
+        '''Starts checking the file for changes in the background, if enabled
+        and not already running.'''
+
+        if self.interval is None or self._watch is not None:
+            return
+
+        self._watch = asyncio.ensure_future(self._watch_forever(), loop=self.loop)
+
+    def stop_watching(self):
+        '''Stops checking the file for changes.'''
+
+        if self._watch is not None:
+            self._watch.cancel()
+            self._watch = None
+
+    def close(self):
+        '''Stops watching the file and the health checks and closes each
+        backend's manager.'''
+
+        self.stop_watching()
+        super().close()
+
+    async def _watch_forever(self):
+        while True:
+            await asyncio.sleep(self.interval, loop=self.loop)
+            self.reload()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+'''Limits the number of requests in flight to a backend.'''
+
+import asyncio
+from collections import deque
+import time
+
+from aiospamc.exceptions import AIOSpamcConnectionQueueFull
+
+
+class ConcurrencyLimiter:
+    '''Limits the number of requests in flight.  Requests over the limit wait
+    in a first-in, first-out queue on the client instead of in the server's
+    listen backlog, where they can't be seen or cancelled.
+
+    The queue can be bounded in length and in how long a request waits, so
+    requests are shed when the backend is saturated.
+
+    Attributes
+    ----------
+    limit : int
+        Maximum number of requests in flight.
+    max_queue : int
+        Maximum number of requests waiting, or `None` for no limit.
+    max_wait : float
+        Maximum seconds a request waits, or `None` for no limit.
+    in_flight : int
+        Number of requests in flight.
+    admitted : int
+        Number of requests that have been let through.
+    queued : int
+        Number of requests that had to wait and were let through.
+    rejected : int
+        Number of requests shed because the queue was full or they waited too
+        long.
+    wait_time_total : float
+        Total seconds requests waited in the queue.
+    wait_time_max : float
+        Longest time in seconds a request waited in the queue.
+    '''
+
+    def __init__(self, limit, max_queue=None, max_wait=None, loop=None):
+        '''ConcurrencyLimiter constructor.
+
+        Parameters
+        ----------
+        limit : int
+            Maximum number of requests in flight.
+        max_queue : int, optional
+            Maximum number of requests waiting.
+        max_wait : float, optional
+            Maximum seconds a request waits.
+        loop : asyncio.AbstractEventLoop, optional
+            The asyncio event loop.
+
+        Raises
+        ------
+        ValueError
+            Raised if the limit is less than one.
+        '''
+
+        if limit < 1:
+            raise ValueError('Limit must be at least one')
+
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.loop = loop
+        self.in_flight = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._waiters = deque()
+
+    def __repr__(self):
+        return '{}(limit={}, max_queue={}, max_wait={})'.format(self.__class__.__name__,
+                                                                self.limit,
+                                                                self.max_queue,
+                                                                self.max_wait)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    @property
+    def available(self):
+        '''Whether a request would be let through without waiting.
+
+        Returns
+        -------
+        bool
+        '''
+
+        return self.in_flight < self.limit and not self._waiters
+
+    @property
+    def queue_depth(self):
+        '''Number of requests waiting.
+
+        Returns
+        -------
+        int
+        '''
+
+        return len(self._waiters)
+
+    @property
+    def mean_wait_time(self):
+        '''Average seconds a request that had to wait spent in the queue.
+
+        Returns
+        -------
+        float
+        '''
+
+        if not self.queued:
+            return 0.0
+
+        return self.wait_time_total / self.queued
+
+    async def acquire(self):
+        '''Waits until the request can be let through.
+
+        Raises
+        ------
+        aiospamc.exceptions.AIOSpamcConnectionQueueFull
+            Raised if the queue is full or the request waited longer than
+            :attr:`max_wait`.
+        '''
+
+        if self.available:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AIOSpamcConnectionQueueFull('{} requests already waiting'.format(len(self._waiters)))
+
+        loop = self.loop or asyncio.get_event_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            if self.max_wait is None:
+                await waiter
+            else:
+                await asyncio.wait_for(asyncio.shield(waiter, loop=loop), self.max_wait, loop=loop)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._discard(waiter)
+                self.rejected += 1
+                raise AIOSpamcConnectionQueueFull('Waited longer than {} seconds'.format(self.max_wait))
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+        waited = time.monotonic() - start
+        self.queued += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+
+    def release(self):
+        '''Lets the next waiting request through, or frees the slot if none
+        are waiting.'''
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.admitted += 1
+                return
+
+        self.in_flight -= 1
+
+    def _discard(self, waiter):
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
@@ -0,0 +1,1137 @@
+#!/usr/bin/env python3
+
+'''Connection manager that spreads requests over several SPAMD backends.'''
+
+import asyncio
+import bisect
+import collections
+import enum
+import hashlib
+import itertools
+import logging
+import math
+import random
+import time
+
+from aiospamc.connections import ConnectionManager
+from aiospamc.connections.limiter import ConcurrencyLimiter
+from aiospamc.exceptions import AIOSpamcConnectionFailed, AIOSpamcConnectionTimeout
+from aiospamc.parser import ResponseParser
+from aiospamc.requests import Request
+from aiospamc.responses import Status
+
+
+class BackendState(enum.IntEnum):
+    '''Health of a backend.'''
+
+    healthy = 1
+    ejected = 2
+    half_open = 3
+
+
+class Backend:
+    '''A connection manager in a pool along with its load.
+
+    Attributes
+    ----------
+    manager : aiospamc.connections.ConnectionManager
+        Creates connections to the backend.
+    weight : float
+        Share of the requests the backend should get relative to the others.
+    outstanding : int
+        Number of requests currently using the backend.
+    requests : int
+        Number of requests that have used the backend.
+    latency : float
+        Smoothed time in seconds of a request, or `None` if none has
+        finished yet.
+    smoothing : float
+        Weight given to each new latency measurement.
+    state : aiospamc.connections.pooled_connection.BackendState
+        Whether the backend is healthy, ejected or allowed a trial request.
+    failures : int
+        Number of requests to the backend that failed.
+    consecutive_failures : int
+        Number of requests that failed since the last one that succeeded.
+    outcomes : collections.deque
+        Whether each of the most recent requests failed, oldest first.
+    ejections : int
+        Number of times in a row the backend has been ejected.
+    ejected_until : float
+        Time, from :func:`time.monotonic`, the current ejection ends.
+    last_success : float
+        Time, from :func:`time.monotonic`, a request last succeeded, or `None`
+        if none has.
+    limiter : aiospamc.connections.limiter.ConcurrencyLimiter
+        Limits the requests in flight to the backend, or `None` for no limit.
+    '''
+
+    def __init__(self, manager, weight=1, smoothing=0.3, limiter=None, window=20):
+        '''Backend constructor.
+
+        Parameters
+        ----------
+        manager : aiospamc.connections.ConnectionManager
+            Creates connections to the backend.
+        weight : float, optional
+            Share of the requests the backend should get.
+        smoothing : float, optional
+            Weight given to each new latency measurement, between 0 and 1.
+        limiter : aiospamc.connections.limiter.ConcurrencyLimiter, optional
+            Limits the requests in flight to the backend.
+        window : int, optional
+            Number of the most recent requests the error rate is taken over.
+
+        Raises
+        ------
+        ValueError
+            Raised if the weight isn't positive.
+        '''
+
+        if weight <= 0:
+            raise ValueError('Backend weight must be positive')
+
+        self.manager = manager
+        self.weight = weight
+        self.smoothing = smoothing
+        self.outstanding = 0
+        self.requests = 0
+        self.latency = None
+        self.state = BackendState.healthy
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.outcomes = collections.deque(maxlen=window)
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.last_success = None
+        self.limiter = limiter
+        self._trial = False
+
+    def __repr__(self):
+        return '{}(manager={}, weight={})'.format(self.__class__.__name__,
+                                                  repr(self.manager),
+                                                  self.weight)
+
+    @property
+    def error_rate(self):
+        '''Fraction of the most recent requests that failed.
+
+        Returns
+        -------
+        float
+        '''
+
+        if not self.outcomes:
+            return 0.0
+
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def available(self, now):
+        '''Whether the backend can take a request.  An ejected backend whose
+        ejection has ended becomes half-open and takes a single trial request.
+
+        Parameters
+        ----------
+        now : float
+            The current time from :func:`time.monotonic`.
+
+        Returns
+        -------
+        bool
+        '''
+
+        if self.state is BackendState.ejected and now >= self.ejected_until:
+            self.state = BackendState.half_open
+            self._trial = False
+
+        if self.state is BackendState.half_open:
+            return not self._trial
+
+        return self.state is BackendState.healthy
+
+    def begin(self):
+        '''Marks the start of a request.'''
+
+        self.outstanding += 1
+        self.requests += 1
+        if self.state is BackendState.half_open:
+            self._trial = True
+
+    def end(self):
+        '''Marks the end of a request.'''
+
+        self.outstanding -= 1
+        self._trial = False
+
+    def eject(self, now, duration):
+        '''Stops the backend taking requests for a while.
+
+        Parameters
+        ----------
+        now : float
+            The current time from :func:`time.monotonic`.
+        duration : float
+            Seconds until the backend is given a trial request.
+        '''
+
+        self.state = BackendState.ejected
+        self.ejected_until = now + duration
+        self.ejections += 1
+
+    def record_success(self, seconds):
+        '''Records a request that succeeded.  A trial request that succeeds
+        makes the backend healthy again.
+
+        Parameters
+        ----------
+        seconds : float
+            Time the request took.
+        '''
+
+        self.consecutive_failures = 0
+        self.last_success = time.monotonic()
+        if self.state is BackendState.half_open:
+            self.state = BackendState.healthy
+            self.ejections = 0
+            self.latency = None
+            self.outcomes.clear()
+        self.record_latency(seconds)
+        self.outcomes.append(False)
+
+    def record_failure(self):
+        '''Records a request that failed.'''
+
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.outcomes.append(True)
+
+    def record_latency(self, seconds):
+        '''Adds the time a request took to the smoothed latency.
+
+        Parameters
+        ----------
+        seconds : float
+            Time the request took.
+        '''
+
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency = (1 - self.smoothing) * self.latency + self.smoothing * seconds
+
+
+class RoundRobin:
+    '''Takes turns between backends in proportion to their weights.
+
+    Uses smooth weighted round-robin, so a heavy backend's turns are spread
+    out rather than given in a burst.
+    '''
+
+    def __init__(self):
+        self._current = {}
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+    def select(self, backends):
+        '''Selects the backend for the next request.
+
+        Parameters
+        ----------
+        backends : list of aiospamc.connections.pooled_connection.Backend
+            Backends to choose from.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.Backend
+        '''
+
+        total = 0
+        selected = None
+        for backend in backends:
+            self._current[backend] = self._current.get(backend, 0) + backend.weight
+            total += backend.weight
+            if selected is None or self._current[backend] > self._current[selected]:
+                selected = backend
+        self._current[selected] -= total
+
+        return selected
+
+
+class LeastOutstanding:
+    '''Selects the backend with the fewest requests in flight relative to its
+    weight.'''
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+    def select(self, backends):
+        '''Selects the backend for the next request.
+
+        Parameters
+        ----------
+        backends : list of aiospamc.connections.pooled_connection.Backend
+            Backends to choose from.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.Backend
+        '''
+
+        return min(backends, key=lambda backend: (backend.outstanding + 1) / backend.weight)
+
+
+class PowerOfTwoChoices:
+    '''Picks two backends at random in proportion to their weights and
+    selects the one with the lower cost.
+
+    The cost of a backend is its smoothed latency multiplied by the number of
+    requests it would have in flight, divided by its weight.  Backends that
+    haven't finished a request yet cost nothing so they're tried early.
+
+    Attributes
+    ----------
+    random : random.Random
+        Source of randomness.
+    '''
+
+    def __init__(self, random_=None):
+        '''PowerOfTwoChoices constructor.
+
+        Parameters
+        ----------
+        random_ : random.Random, optional
+            Source of randomness.
+        '''
+
+        self.random = random_ or random.Random()
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+    def select(self, backends):
+        '''Selects the backend for the next request.
+
+        Parameters
+        ----------
+        backends : list of aiospamc.connections.pooled_connection.Backend
+            Backends to choose from.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.Backend
+        '''
+
+        if len(backends) == 1:
+            return backends[0]
+
+        first = self._choose(backends)
+        second = self._choose([backend for backend in backends if backend is not first])
+
+        return min((first, second), key=self.cost)
+
+    @staticmethod
+    def cost(backend):
+        '''Estimates the cost of sending a request to a backend.
+
+        Parameters
+        ----------
+        backend : aiospamc.connections.pooled_connection.Backend
+            The backend to estimate.
+
+        Returns
+        -------
+        float
+        '''
+
+        if backend.latency is None:
+            return 0.0
+
+        return backend.latency * (backend.outstanding + 1) / backend.weight
+
+    def _choose(self, backends):
+        cumulative = list(itertools.accumulate(backend.weight for backend in backends))
+        index = bisect.bisect_right(cumulative, self.random.uniform(0, cumulative[-1]))
+
+        return backends[min(index, len(backends) - 1)]
+
+
+def _hash(data):
+    if isinstance(data, str):
+        data = data.encode()
+
+    return int.from_bytes(hashlib.md5(data).digest()[:8], 'big')
+
+
+class ConsistentHash:
+    '''Sends requests with the same key, such as the same user, to the same
+    backend, so state SPAMD keeps per user stays warm.
+
+    Each backend owns points on a hash ring in proportion to its weight, and a
+    key goes to the owner of the next point after the key's hash.  Adding or
+    removing a backend only moves the keys of the points it owns.  Loads are
+    bounded: a backend that already has more than :attr:`load_factor` times
+    its share of the requests in flight is passed over for the next one
+    along the ring.  Requests without a key are given to the
+    :attr:`fallback` strategy.
+
+    Attributes
+    ----------
+    keyed : bool
+        Tells the pool to give the request key to :meth:`select`.
+    replicas : int
+        Points on the ring for a backend of weight 1.
+    load_factor : float
+        Most requests in flight a backend can have, as a multiple of its
+        share.
+    fallback : object
+        Strategy for requests without a key.
+    spilled : int
+        Number of requests not given to the backend their key belongs to.
+    '''
+
+    keyed = True
+
+    def __init__(self, replicas=64, load_factor=1.25, fallback=None):
+        '''ConsistentHash constructor.
+
+        Parameters
+        ----------
+        replicas : int, optional
+            Points on the ring for a backend of weight 1.
+        load_factor : float, optional
+            Most requests in flight a backend can have, as a multiple of its
+            share.
+        fallback : object, optional
+            Strategy for requests without a key.  Defaults to
+            :class:`LeastOutstanding`.
+
+        Raises
+        ------
+        ValueError
+            Raised if the load factor is less than one.
+        '''
+
+        if load_factor < 1:
+            raise ValueError('Load factor must be at least one')
+
+        self.replicas = replicas
+        self.load_factor = load_factor
+        self.fallback = fallback or LeastOutstanding()
+        self.spilled = 0
+        self._rings = {}
+
+    def __repr__(self):
+        return '{}(replicas={}, load_factor={})'.format(self.__class__.__name__, self.replicas, self.load_factor)
+
+    def select(self, backends, key=None):
+        '''Selects the backend for the next request.
+
+        Parameters
+        ----------
+        backends : list of aiospamc.connections.pooled_connection.Backend
+            Backends to choose from.
+        key : str or bytes, optional
+            Key of the request.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.Backend
+        '''
+
+        if key is None:
+            return self.fallback.select(backends)
+
+        points, owners = self._ring(backends)
+        in_flight = sum(backend.outstanding for backend in backends) + 1
+        total_weight = sum(backend.weight for backend in backends)
+        start = bisect.bisect(points, _hash(key))
+        first = owners[start % len(owners)]
+        for offset in range(len(owners)):
+            backend = owners[(start + offset) % len(owners)]
+            if backend.outstanding < math.ceil(self.load_factor * in_flight * backend.weight / total_weight):
+                if backend is not first:
+                    self.spilled += 1
+                return backend
+
+        return first
+
+    def _ring(self, backends):
+        # Weights are part of the key since update() changes them in place.
+        ids = tuple((id(backend), backend.weight) for backend in backends)
+        ring = self._rings.get(ids)
+        if ring is None:
+            if len(self._rings) >= 32:
+                self._rings.clear()
+            points = sorted((_hash('{!r}-{}'.format(backend.manager, replica)), index)
+                            for index, backend in enumerate(backends)
+                            for replica in range(max(1, round(self.replicas * backend.weight))))
+            ring = [point for point, _ in points], [backends[index] for _, index in points]
+            self._rings[ids] = ring
+
+        return ring
+
+
+STRATEGIES = {
+    'round_robin': RoundRobin,
+    'least_outstanding': LeastOutstanding,
+    'power_of_two': PowerOfTwoChoices,
+    'consistent_hash': ConsistentHash,
+}
+
+
+class PooledConnectionManager(ConnectionManager):
+    '''Spreads requests over several backends, which can be any mix of TCP
+    and Unix domain socket connection managers.
+
+    Backends that fail are ejected so traffic moves to the others:
+
+    * A backend is ejected after ``max_failures`` consecutive failed
+      requests or health checks.
+    * Once the ejection ends a single trial request is let through.  If it
+      succeeds the backend is healthy again, otherwise it's ejected for twice
+      as long, up to ``max_ejection_time``.
+    * Backends whose error rate over their last ``error_window`` requests is
+      above ``max_error_rate``, once they have at least
+      ``min_error_requests`` of them, or whose latency is more than
+      ``outlier_factor`` times the median of the others, are ejected as
+      outliers.  No more than ``max_ejection_fraction`` of the
+      backends are ejected as outliers at once.
+    * Health checks send a PING to each backend every
+      ``health_check_interval`` seconds, on a schedule of its own so a slow
+      backend doesn't hold up the checks of the others.  Each PING has its
+      own ``health_check_timeout``, separate from the timeouts of requests.
+      An ejected backend that answers is given its trial request straight
+      away.  A PING that fails only counts
+      against a backend with no requests in flight and none that succeeded
+      since the previous check, since a busy SPAMD can be slow to answer a PING
+      while still serving requests.  Backends with no spare capacity under
+      ``max_in_flight`` aren't checked.
+    * If a connection can't be opened, or opening it times out, another
+      backend is tried, up to ``connect_attempts`` backends, since nothing
+      has been sent yet.
+
+    Setting ``max_in_flight`` gives each backend without its own limiter a
+    :class:`aiospamc.connections.limiter.ConcurrencyLimiter`, so requests over
+    SPAMD's ``--max-children`` wait in a queue on the client.  Backends with
+    spare capacity are preferred over ones with a queue.
+
+    When every backend is ejected requests are spread over all of them
+    rather than failing outright.
+
+    The backends can be changed with :meth:`update` without losing the state
+    of the ones that stay.
+
+    Attributes
+    ----------
+    backends : list of aiospamc.connections.pooled_connection.Backend
+        The backends requests are spread over.
+    strategy : object
+        Selects the backend for each request with its ``select`` method.
+    max_failures : int
+        Consecutive failures that eject a backend.
+    ejection_time : float
+        Seconds a backend is first ejected for.
+    max_ejection_time : float
+        Longest time in seconds a backend is ejected for.
+    max_error_rate : float
+        Error rate above which a backend is an outlier.
+    outlier_factor : float
+        How many times the median latency makes a backend an outlier.
+    max_ejection_fraction : float
+        Largest fraction of the backends ejected as outliers.
+    min_requests : int
+        Requests a backend needs before it can be a latency outlier.
+    error_window : int
+        Number of the most recent requests a backend's error rate is taken
+        over.
+    min_error_requests : int
+        Requests in the window a backend needs before it can be an error rate
+        outlier.
+    health_check_interval : float
+        Seconds between health checks, or `None` to disable them.
+    health_check_timeout : float
+        Seconds a health check waits for a response, separate from the
+        timeouts of requests.
+    connect_attempts : int
+        Number of backends to try to connect to.
+    max_in_flight : int
+        Requests in flight to each backend, or `None` for no limit.
+    max_queue : int
+        Requests waiting for each backend, when ``max_in_flight`` is set.
+    max_wait : float
+        Seconds a request waits for a backend, when ``max_in_flight`` is set.
+    logger : logging.Logger
+        Logging instance, logs to 'aiospamc.connections.pooled_connection'.
+    '''
+
+    routed = True
+
+    def __init__(self,
+                 backends,
+                 strategy='round_robin',
+                 loop=None,
+                 max_failures=3,
+                 ejection_time=1.0,
+                 max_ejection_time=30.0,
+                 max_error_rate=0.5,
+                 outlier_factor=3.0,
+                 max_ejection_fraction=0.5,
+                 min_requests=5,
+                 error_window=20,
+                 min_error_requests=10,
+                 health_check_interval=5.0,
+                 health_check_timeout=2.0,
+                 connect_attempts=3,
+                 max_in_flight=None,
+                 max_queue=None,
+                 max_wait=None):
+        '''Constructor for PooledConnectionManager.
+
+        Parameters
+        ----------
+        backends : list
+            Each item is a connection manager, a ``(manager, weight)`` tuple or
+            a :class:`Backend`.
+        strategy : str or object, optional
+            One of 'round_robin', 'least_outstanding', 'power_of_two' or
+            'consistent_hash', or an object with a ``select(backends)`` method
+            that returns one of the backends.  If the object's ``keyed``
+            attribute is true it's called as ``select(backends, key)`` with
+            the key of the request.
+        loop : asyncio.AbstractEventLoop
+            The asyncio event loop.
+        max_failures : int, optional
+            Consecutive failures that eject a backend.
+        ejection_time : float, optional
+            Seconds a backend is first ejected for.
+        max_ejection_time : float, optional
+            Longest time in seconds a backend is ejected for.
+        max_error_rate : float, optional
+            Error rate above which a backend is an outlier.
+        outlier_factor : float, optional
+            How many times the median latency makes a backend an outlier.
+        max_ejection_fraction : float, optional
+            Largest fraction of the backends ejected as outliers.
+        min_requests : int, optional
+            Requests a backend needs before it can be a latency outlier.
+        error_window : int, optional
+            Number of the most recent requests a backend's error rate is taken
+            over.  Only applies to backends created by the pool.
+        min_error_requests : int, optional
+            Requests in the window a backend needs before it can be an error
+            rate outlier.  Should be high enough that ``max_error_rate`` can't
+            be passed with fewer than ``max_failures`` failures.
+        health_check_interval : float, optional
+            Seconds between health checks, or `None` to disable them.
+        health_check_timeout : float, optional
+            Seconds a health check waits for a response, from opening the
+            connection to reading the PONG.  A PING that times out on a
+            backend with requests in flight isn't counted as a failure, so
+            this can be much shorter than the time SPAMD takes to scan a
+            message.
+        connect_attempts : int, optional
+            Number of backends to try to connect to.
+        max_in_flight : int, optional
+            Requests in flight to each backend.
+        max_queue : int, optional
+            Requests waiting for each backend, when ``max_in_flight`` is set.
+        max_wait : float, optional
+            Seconds a request waits for a backend, when ``max_in_flight`` is
+            set.
+
+        Raises
+        ------
+        ValueError
+            Raised if there are no backends or the strategy is unknown.
+        '''
+
+        self.error_window = error_window
+        self.backends = [self._backend(item) for item in backends]
+        if not self.backends:
+            raise ValueError('At least one backend is required')
+
+        if isinstance(strategy, str):
+            try:
+                strategy = STRATEGIES[strategy]()
+            except KeyError:
+                raise ValueError('Unknown strategy: {}'.format(strategy))
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.max_error_rate = max_error_rate
+        self.outlier_factor = outlier_factor
+        self.max_ejection_fraction = max_ejection_fraction
+        self.min_requests = min_requests
+        self.min_error_requests = min_error_requests
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.connect_attempts = connect_attempts
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.logger = logging.getLogger(__name__)
+        self._health_checks = None
+        self._created_at = time.monotonic()
+        self._checked_at = {}
+        self._removed = []
+        super().__init__(loop)
+
+        for backend in self.backends:
+            self._limit(backend)
+
+    def __repr__(self):
+        return '{}(backends={}, strategy={})'.format(self.__class__.__name__,
+                                                     repr(self.backends),
+                                                     repr(self.strategy))
+
+    def _backend(self, item):
+        if isinstance(item, Backend):
+            return item
+        elif isinstance(item, tuple):
+            return Backend(*item, window=self.error_window)
+        else:
+            return Backend(item, window=self.error_window)
+
+    def _limit(self, backend):
+        if self.max_in_flight and backend.limiter is None:
+            backend.limiter = ConcurrencyLimiter(self.max_in_flight, self.max_queue, self.max_wait, self.loop)
+
+    @property
+    def local(self):
+        '''Whether all backends are on this host.
+
+        Returns
+        -------
+        bool
+        '''
+
+        return all(getattr(backend.manager, 'local', False) for backend in self.backends)
+
+    @property
+    def draining(self):
+        '''Backends removed by :meth:`update` that still have requests in
+        flight.
+
+        Returns
+        -------
+        list of aiospamc.connections.pooled_connection.Backend
+        '''
+
+        return list(self._removed)
+
+    def update(self, backends):
+        '''Replaces the backends requests are spread over.
+
+        Backends whose manager has the same representation as a current one's
+        are kept as they are, along with their load, health and latency, and
+        only take the new weight.  Removed backends get no new requests, but
+        the requests already in flight to them finish normally.  A removed
+        backend's manager is closed once it has no requests in flight.
+
+        Parameters
+        ----------
+        backends : list
+            Each item is a connection manager, a ``(manager, weight)`` tuple or
+            a :class:`Backend`.
+
+        Raises
+        ------
+        ValueError
+            Raised if there are no backends, in which case the current ones
+            are kept.
+        '''
+
+        new = [self._backend(item) for item in backends]
+        if not new:
+            raise ValueError('At least one backend is required')
+
+        current = {repr(backend.manager): backend for backend in self.backends}
+        updated = []
+        for backend in new:
+            kept = current.pop(repr(backend.manager), None)
+            if kept is None:
+                self._limit(backend)
+                self.logger.info('Added backend %r', backend)
+                updated.append(backend)
+            else:
+                kept.weight = backend.weight
+                updated.append(kept)
+
+        for backend in current.values():
+            self.logger.info('Removed backend %r with %d requests in flight', backend, backend.outstanding)
+            self._checked_at.pop(backend, None)
+            if self._health_checks is not None:
+                self._health_checks.pop(backend).cancel()
+            if backend.outstanding:
+                self._removed.append(backend)
+            else:
+                backend.manager.close()
+
+        self.backends = updated
+        if self._health_checks is not None:
+            for backend in updated:
+                if backend not in self._health_checks:
+                    self._start_check(backend)
+
+    def select(self, exclude=(), key=None):
+        '''Selects the backend for the next request from the ones that are
+        available.  If none are, selects from all of them.  Backends with spare
+        capacity are preferred.
+
+        Parameters
+        ----------
+        exclude : collection of aiospamc.connections.pooled_connection.Backend, optional
+            Backends not to select.
+        key : str or bytes, optional
+            Key of the request, given to strategies that route by key.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.Backend
+            The selected backend, or `None` if every backend is excluded.
+        '''
+
+        now = time.monotonic()
+        candidates = [backend for backend in self.backends
+                      if backend not in exclude and backend.available(now)]
+        if not candidates:
+            candidates = [backend for backend in self.backends if backend not in exclude]
+        if not candidates:
+            return None
+
+        with_capacity = [backend for backend in candidates
+                         if backend.limiter is None or backend.limiter.available]
+
+        if key is not None and getattr(self.strategy, 'keyed', False):
+            return self.strategy.select(with_capacity or candidates, key)
+
+        return self.strategy.select(with_capacity or candidates)
+
+    def new_connection(self, avoid=(), key=None, size=None):
+        '''Creates a connection to the backend chosen by the strategy.  Starts
+        the health checks if they aren't running yet.
+
+        Parameters
+        ----------
+        avoid : collection of aiospamc.connections.pooled_connection.Backend, optional
+            Backends to only connect to if no others can be, such as the one
+            a hedged request is already waiting on.
+        key : str or bytes, optional
+            Key of the request, such as its user, for strategies that route
+            by key.
+        size : int, optional
+            Size of the request in bytes.  Not used by the pool.
+
+        Returns
+        -------
+        aiospamc.connections.pooled_connection.PooledConnection
+            Context manager that opens the connection and tracks the load and
+            health of the backend while it's in use.
+        '''
+
+        self.start_health_checks()
+
+        return PooledConnection(self, avoid, key)
+
+    def record_success(self, backend, seconds):
+        '''Records a request to a backend that succeeded.
+
+        Parameters
+        ----------
+        backend : aiospamc.connections.pooled_connection.Backend
+            The backend the request was sent to.
+        seconds : float
+            Time the request took.
+        '''
+
+        if backend.state is BackendState.half_open:
+            self.logger.info('Backend %r recovered', backend)
+        backend.record_success(seconds)
+        self.detect_outliers()
+
+    def record_failure(self, backend):
+        '''Records a request to a backend that failed, ejecting the backend if
+        it has failed too many times in a row or was on trial.
+
+        Parameters
+        ----------
+        backend : aiospamc.connections.pooled_connection.Backend
+            The backend the request was sent to.
+        '''
+
+        backend.record_failure()
+        if backend.state is BackendState.half_open:
+            self.eject(backend)
+        elif backend.state is BackendState.healthy:
+            if backend.consecutive_failures >= self.max_failures:
+                self.eject(backend)
+            else:
+                self.detect_outliers()
+
+    def eject(self, backend):
+        '''Ejects a backend.  Each ejection in a row lasts twice as long as
+        the one before.
+
+        Parameters
+        ----------
+        backend : aiospamc.connections.pooled_connection.Backend
+            The backend to eject.
+        '''
+
+        duration = min(self.ejection_time * 2 ** backend.ejections, self.max_ejection_time)
+        backend.eject(time.monotonic(), duration)
+        self.logger.warning('Ejected backend %r for %.2f seconds', backend, duration)
+
+    def detect_outliers(self):
+        '''Ejects healthy backends whose error rate or latency stands out from
+        the others.'''
+
+        healthy = [backend for backend in self.backends if backend.state is BackendState.healthy]
+        allowed = int(len(self.backends) * self.max_ejection_fraction) - (len(self.backends) - len(healthy))
+        if allowed <= 0:
+            return
+
+        measured = [backend for backend in healthy
+                    if backend.requests >= self.min_requests and backend.latency is not None]
+        latencies = sorted(backend.latency for backend in measured)
+        median = latencies[len(latencies) // 2] if len(latencies) >= 3 else None
+
+        for backend in healthy:
+            if allowed <= 0:
+                break
+            slow = median is not None and backend in measured and backend.latency > self.outlier_factor * median
+            failing = len(backend.outcomes) >= self.min_error_requests and backend.error_rate > self.max_error_rate
+            if failing or slow:
+                self.logger.warning('Backend %r is an outlier with error rate %.2f and latency %s',
+                                    backend,
+                                    backend.error_rate,
+                                    backend.latency)
+                self.eject(backend)
+                allowed -= 1
+
+    async def probe(self, backend):
+        '''Sends a PING request to a backend.
+
+        Parameters
+        ----------
+        backend : aiospamc.connections.pooled_connection.Backend
+            The backend to check.
+
+        Returns
+        -------
+        bool
+            Whether the backend answered with a successful response in time,
+            or `None` if it wasn't checked because it has no spare capacity.
+        '''
+
+        if backend.limiter is not None:
+            if not backend.limiter.available:
+                return None
+            await backend.limiter.acquire()
+
+        async def ping():
+            parser = ResponseParser()
+            async with backend.manager.new_connection() as connection:
+                await connection.send(Request('PING').buffers())
+                await connection.receive_response(parser)
+
+            return parser.result().status_code is Status.EX_OK
+
+        try:
+            return await asyncio.wait_for(ping(), self.health_check_timeout, loop=self.loop)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return False
+        finally:
+            if backend.limiter is not None:
+                backend.limiter.release()
+
+    async def check_backend(self, backend):
+        '''Checks a backend once.  A healthy backend that fails the check
+        counts a failure, unless it has requests in flight or one succeeded
+        since its previous check.  An ejected backend that passes is given a
+        trial request straight away.
+
+        Parameters
+        ----------
+        backend : aiospamc.connections.pooled_connection.Backend
+            The backend to check.
+
+        Returns
+        -------
+        bool
+            The result of :meth:`probe`.
+        '''
+
+        since = self._checked_at.get(backend, self._created_at)
+        self._checked_at[backend] = time.monotonic()
+        healthy = await self.probe(backend)
+        if backend not in self.backends:
+            return healthy
+
+        if backend.state is BackendState.ejected:
+            if healthy:
+                backend.ejected_until = min(backend.ejected_until, time.monotonic())
+        elif healthy is False and not self._busy(backend, since):
+            self.record_failure(backend)
+        self.detect_outliers()
+
+        return healthy
+
+    async def check_health(self):
+        '''Checks every backend once with :meth:`check_backend`.'''
+
+        await asyncio.gather(*(self.check_backend(backend) for backend in list(self.backends)),
+                             loop=self.loop)
+
+    @staticmethod
+    def _busy(backend, since):
+        return backend.outstanding > 0 or (backend.last_success is not None and backend.last_success >= since)
+
+    def start_health_checks(self):
+        '''Starts checking each backend in the background, if enabled and not
+        already running.  Backends added by :meth:`update` are checked too.'''
+
+        if self.health_check_interval is None or self._health_checks is not None:
+            return
+
+        self._health_checks = {}
+        for backend in self.backends:
+            self._start_check(backend)
+
+    def stop_health_checks(self):
+        '''Stops checking the backends.'''
+
+        if self._health_checks is not None:
+            for task in self._health_checks.values():
+                task.cancel()
+            self._health_checks = None
+
+    def _start_check(self, backend):
+        self._health_checks[backend] = asyncio.ensure_future(self._check_backend_forever(backend), loop=self.loop)
+
+    def release(self, backend):
+        '''Marks the end of a request to a backend and frees its place under
+        ``max_in_flight``.  Closes the manager of a removed backend once its
+        last request has finished.
+
+        Parameters
+        ----------
+        backend : aiospamc.connections.pooled_connection.Backend
+            The backend the request was sent to.
+        '''
+
+        backend.end()
+        if backend.limiter:
+            backend.limiter.release()
+        if not backend.outstanding and backend in self._removed:
+            self._removed.remove(backend)
+            self.logger.info('Closing removed backend %r', backend)
+            backend.manager.close()
+
+    def close(self):
+        '''Stops the health checks and closes each backend's manager,
+        including removed backends that still have requests in flight.'''
+
+        self.stop_health_checks()
+        for backend in self.backends + self._removed:
+            backend.manager.close()
+        self._removed = []
+
+    async def _check_backend_forever(self, backend):
+        # Start each backend at a random point in the interval so the PINGs
+        # are spread out instead of all being sent at once.
+        await asyncio.sleep(random.uniform(0, self.health_check_interval), loop=self.loop)
+        while True:
+            await self.check_backend(backend)
+            await asyncio.sleep(self.health_check_interval, loop=self.loop)
+
+
+class PooledConnection:
+    '''Opens a connection to a backend of a pool and tracks the backend's
+    load and health while it's in use.
+
+    If the connection can't be opened another backend is tried.
+
+    Attributes
+    ----------
+    manager : aiospamc.connections.pooled_connection.PooledConnectionManager
+        The pool the connection is from.
+    avoid : tuple of aiospamc.connections.pooled_connection.Backend
+        Backends to only connect to if no others can be.
+    key : str or bytes
+        Key of the request for strategies that route by key.
+    backend : aiospamc.connections.pooled_connection.Backend
+        The backend the connection is to, once it's open.
+    connection : aiospamc.connections.Connection
+        The connection to the backend, once it's open.
+    '''
+
+    def __init__(self, manager, avoid=(), key=None):
+        '''Constructor for PooledConnection.
+
+        Parameters
+        ----------
+        manager : aiospamc.connections.pooled_connection.PooledConnectionManager
+            The pool the connection is from.
+        avoid : collection of aiospamc.connections.pooled_connection.Backend, optional
+            Backends to only connect to if no others can be.
+        key : str or bytes, optional
+            Key of the request for strategies that route by key.
+        '''
+
+        self.manager = manager
+        self.avoid = tuple(avoid)
+        self.key = key
+        self.backend = None
+        self.connection = None
+        self._start = None
+
+    def __repr__(self):
+        return '{}(backend={}, connection={})'.format(self.__class__.__name__,
+                                                      repr(self.backend),
+                                                      repr(self.connection))
+
+    async def __aenter__(self):
+        tried = []
+        error = None
+        while len(tried) < self.manager.connect_attempts:
+            backend = self.manager.select(tried + list(self.avoid), self.key)
+            if backend is None and self.avoid:
+                backend = self.manager.select(tried, self.key)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            if backend.limiter:
+                await backend.limiter.acquire()
+            connection = backend.manager.new_connection()
+            backend.begin()
+            self._start = time.monotonic()
+            try:
+                opened = await connection.__aenter__()
+            except (AIOSpamcConnectionFailed, AIOSpamcConnectionTimeout) as raised:
+                self.manager.release(backend)
+                self.manager.record_failure(backend)
+                error = raised
+                continue
+            except BaseException:
+                self.manager.release(backend)
+                raise
+
+            self.backend, self.connection = backend, connection
+            return opened
+
+        raise error or AIOSpamcConnectionFailed('No backend available')
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.manager.release(self.backend)
+        if exc_type is None:
+            self.manager.record_success(self.backend, time.monotonic() - self._start)
+        elif not issubclass(exc_type, asyncio.CancelledError):
+            self.manager.record_failure(self.backend)
+
+        return await self.connection.__aexit__(exc_type, exc_val, exc_tb)
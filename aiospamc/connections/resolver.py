@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+'''Hostname resolution with caching, and connecting to the first address that
+answers.'''
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+
+
+def interleave(infos):
+    '''Orders resolved addresses so the address families alternate, starting
+    with the family of the first address, as recommended by RFC 8305.
+
+    Parameters
+    ----------
+    infos : list of tuple
+        Results of :func:`socket.getaddrinfo`.
+
+    Returns
+    -------
+    list of str
+        The addresses without duplicates.
+    '''
+
+    families = {}
+    for family, _, _, _, sockaddr in infos:
+        addresses = families.setdefault(family, [])
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+
+    ordered = []
+    queues = list(families.values())
+    while any(queues):
+        for queue in queues:
+            if queue:
+                ordered.append(queue.pop(0))
+
+    return ordered
+
+
+async def connect_first(addresses, connect, delay=0.25, loop=None):
+    '''Connects to whichever address answers first, trying each in turn
+    without waiting for the previous ones to fail ("happy eyeballs").
+
+    The next address is tried once the previous attempt has failed or
+    :obj:`delay` seconds have passed.  Once one connects the attempts still
+    in progress are cancelled.
+
+    Parameters
+    ----------
+    addresses : list of str
+        Addresses in the order to try them.
+    connect : callable
+        Coroutine function that connects to an address and returns a reader
+        and writer.
+    delay : float, optional
+        Seconds to wait for an attempt before starting the next.
+    loop : asyncio.AbstractEventLoop, optional
+        The asyncio event loop.
+
+    Returns
+    -------
+    asyncio.StreamReader
+    asyncio.StreamWriter
+
+    Raises
+    ------
+    OSError
+        The error of the last attempt, if none connected.
+    '''
+
+    remaining = list(addresses)
+    pending = set()
+    error = OSError('No addresses to connect to')
+    try:
+        while remaining or pending:
+            if remaining:
+                pending.add(asyncio.ensure_future(connect(remaining.pop(0)), loop=loop))
+            done, pending = await asyncio.wait(pending,
+                                               timeout=delay if remaining else None,
+                                               return_when=asyncio.FIRST_COMPLETED,
+                                               loop=loop)
+            connected = None
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif connected is None:
+                    connected = task.result()
+                else:
+                    task.result()[1].close()
+            if connected is not None:
+                return connected
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise error
+
+
+class Resolver:
+    '''Resolves hostnames, caching the addresses for a while.
+
+    Once the addresses of a hostname are older than :attr:`ttl` they're still
+    used, but are resolved again in the background.  If resolving fails the
+    old addresses keep being used and resolving is retried after
+    :attr:`retry_delay`.  IP addresses are used as they are.
+
+    Attributes
+    ----------
+    ttl : float
+        Seconds before addresses are resolved again.
+    retry_delay : float
+        Seconds before resolving again after it failed.
+    cache : dict
+        Addresses and the time they expire for each hostname and port.
+    lookups : int
+        Number of times a hostname was resolved.
+    hits : int
+        Number of times cached addresses were used.
+    failures : int
+        Number of times resolving failed.
+    loop : asyncio.AbstractEventLoop
+        The asyncio event loop.
+    logger : logging.Logger
+        Logging instance.
+    '''
+
+    def __init__(self, ttl=60.0, retry_delay=5.0, loop=None):
+        '''Constructor for Resolver.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Seconds before addresses are resolved again.
+        retry_delay : float, optional
+            Seconds before resolving again after it failed.
+        loop : asyncio.AbstractEventLoop, optional
+            The asyncio event loop.
+        '''
+
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self.cache = {}
+        self.lookups = 0
+        self.hits = 0
+        self.failures = 0
+        self.loop = loop or asyncio.get_event_loop()
+        self.logger = logging.getLogger(__name__)
+        self._lookups = {}
+
+    def __repr__(self):
+        return '{}(ttl={})'.format(self.__class__.__name__, self.ttl)
+
+    async def resolve(self, host, port):
+        '''Gets the addresses of a host.
+
+        Parameters
+        ----------
+        host : str
+            Hostname or IP address.
+        port : int
+            Port number.
+
+        Returns
+        -------
+        list of str
+            The addresses, ordered to try in turn.
+
+        Raises
+        ------
+        OSError
+            Raised if the hostname couldn't be resolved and there are no
+            cached addresses.
+        '''
+
+        try:
+            ipaddress.ip_address(host)
+        except ValueError:
+            pass
+        else:
+            return [host]
+
+        key = (host, port)
+        cached = self.cache.get(key)
+        if cached is None:
+            return await asyncio.shield(self._lookup(key), loop=self.loop)
+
+        addresses, expires = cached
+        self.hits += 1
+        if time.monotonic() >= expires:
+            self._lookup(key)
+
+        return addresses
+
+    async def refresh(self, host, port):
+        '''Resolves a host now rather than when its cached addresses expire.
+
+        Parameters
+        ----------
+        host : str
+            Hostname or IP address.
+        port : int
+            Port number.
+
+        Returns
+        -------
+        list of str
+            The addresses, ordered to try in turn.  If resolving fails the
+            cached addresses are returned.
+
+        Raises
+        ------
+        OSError
+            Raised if the hostname couldn't be resolved and there are no
+            cached addresses.
+        '''
+
+        try:
+            ipaddress.ip_address(host)
+        except ValueError:
+            pass
+        else:
+            return [host]
+
+        return await asyncio.shield(self._lookup((host, port)), loop=self.loop)
+
+    def close(self):
+        '''Cancels the lookups in progress.'''
+
+        for lookup in self._lookups.values():
+            lookup.cancel()
+        self._lookups.clear()
+
+    def _lookup(self, key):
+        if key not in self._lookups:
+            self._lookups[key] = asyncio.ensure_future(self._resolve(*key), loop=self.loop)
+
+        return self._lookups[key]
+
+    async def _resolve(self, host, port):
+        try:
+            self.lookups += 1
+            infos = await self.loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addresses = interleave(infos)
+            self.cache[(host, port)] = (addresses, time.monotonic() + self.ttl)
+            return addresses
+        except OSError as error:
+            self.failures += 1
+            self.logger.warning('Could not resolve %s: %s', host, error)
+            cached = self.cache.get((host, port))
+            if cached is None:
+                raise
+            self.cache[(host, port)] = (cached[0], time.monotonic() + self.retry_delay)
+            return cached[0]
+        finally:
+            self._lookups.pop((host, port), None)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+'''Connection manager that sends large requests to their own backends.'''
+
+from aiospamc.connections import ConnectionManager
+from aiospamc.connections.limiter import ConcurrencyLimiter
+
+
+class SizeRoutingConnectionManager(ConnectionManager):
+    '''Sends requests at least :attr:`threshold` bytes in size to a separate
+    group of backends, so small messages never wait behind large ones.
+
+    The heavy group can have its own limit on requests in flight, shared by
+    all of its backends, with a queue for the requests waiting on it.
+
+    Attributes
+    ----------
+    manager : aiospamc.connections.ConnectionManager
+        Creates connections for requests smaller than the threshold.
+    heavy_manager : aiospamc.connections.ConnectionManager
+        Creates connections for requests at least the threshold in size.
+    threshold : int
+        Size in bytes from which a request is heavy.
+    limiter : aiospamc.connections.limiter.ConcurrencyLimiter
+        Limits the heavy requests in flight, or `None` for no limit.
+    requests : int
+        Number of requests routed to :attr:`manager`.
+    heavy_requests : int
+        Number of requests routed to :attr:`heavy_manager`.
+    '''
+
+    routed = True
+
+    def __init__(self,
+                 manager,
+                 heavy_manager,
+                 threshold=2 ** 20,
+                 max_in_flight=None,
+                 max_queue=None,
+                 max_wait=None,
+                 loop=None):
+        '''Constructor for SizeRoutingConnectionManager.
+
+        Parameters
+        ----------
+        manager : aiospamc.connections.ConnectionManager
+            Creates connections for requests smaller than the threshold.
+        heavy_manager : aiospamc.connections.ConnectionManager
+            Creates connections for requests at least the threshold in size.
+        threshold : int, optional
+            Size in bytes from which a request is heavy.  Defaults to 1 MiB.
+        max_in_flight : int, optional
+            Most heavy requests in flight at once, or `None` for no limit.
+        max_queue : int, optional
+            Most heavy requests waiting for one in flight to finish, or `None`
+            for no limit.
+        max_wait : float, optional
+            Seconds a heavy request may wait, or `None` to wait as long as it
+            takes.
+        loop : asyncio.AbstractEventLoop, optional
+            The asyncio event loop.  Defaults to the manager's.
+        '''
+
+        super().__init__(loop or manager.loop, manager.timeouts)
+        self.manager = manager
+        self.heavy_manager = heavy_manager
+        self.threshold = threshold
+        if max_in_flight is None:
+            self.limiter = None
+        else:
+            self.limiter = ConcurrencyLimiter(max_in_flight, max_queue, max_wait, self.loop)
+        self.requests = 0
+        self.heavy_requests = 0
+
+    def __repr__(self):
+        return '{}(manager={}, heavy_manager={}, threshold={})'.format(self.__class__.__name__,
+                                                                       repr(self.manager),
+                                                                       repr(self.heavy_manager),
+                                                                       self.threshold)
+
+    @property
+    def local(self):
+        '''Whether both groups of backends are on this host.
+
+        Returns
+        -------
+        bool
+        '''
+
+        return getattr(self.manager, 'local', False) and getattr(self.heavy_manager, 'local', False)
+
+    def close(self):
+        '''Closes both managers.'''
+
+        self.manager.close()
+        self.heavy_manager.close()
+
+    def new_connection(self, avoid=(), key=None, size=None):
+        '''Creates a connection to the group of backends for the size of the
+        request.
+
+        Parameters
+        ----------
+        avoid : collection, optional
+            Backends to only connect to if no others can be, passed to the
+            group's manager if it routes requests.
+        key : str or bytes, optional
+            Key of the request, passed to the group's manager if it routes
+            requests.
+        size : int, optional
+            Size of the request in bytes.  Requests of unknown size are
+            treated as light.
+
+        Returns
+        -------
+        aiospamc.connections.size_routing.RoutedConnection
+            Context manager that waits for the heavy group's limit, if
+            needed, and opens the connection.
+        '''
+
+        heavy = size is not None and size >= self.threshold
+        if heavy:
+            self.heavy_requests += 1
+            manager = self.heavy_manager
+        else:
+            self.requests += 1
+            manager = self.manager
+
+        if getattr(manager, 'routed', False):
+            connection = manager.new_connection(avoid, key, size)
+        else:
+            connection = manager.new_connection()
+
+        return RoutedConnection(connection, self.limiter if heavy else None)
+
+
+class RoutedConnection:
+    '''Opens a connection from the group chosen for a request, after waiting
+    for the group's limit on requests in flight.
+
+    Attributes
+    ----------
+    connection : object
+        Context manager that opens the connection.
+    limiter : aiospamc.connections.limiter.ConcurrencyLimiter
+        Limit to wait for, or `None`.
+    '''
+
+    def __init__(self, connection, limiter=None):
+        '''Constructor for RoutedConnection.
+
+        Parameters
+        ----------
+        connection : object
+            Context manager that opens the connection.
+        limiter : aiospamc.connections.limiter.ConcurrencyLimiter, optional
+            Limit to wait for.
+        '''
+
+        self.connection = connection
+        self.limiter = limiter
+
+    def __repr__(self):
+        return '{}(connection={})'.format(self.__class__.__name__, repr(self.connection))
+
+    @property
+    def backend(self):
+        '''The backend the connection is to, if it's from a pool.'''
+
+        return getattr(self.connection, 'backend', None)
+
+    async def __aenter__(self):
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        try:
+            return await self.connection.__aenter__()
+        except BaseException:
+            if self.limiter is not None:
+                self.limiter.release()
+            raise
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return await self.connection.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            if self.limiter is not None:
+                self.limiter.release()
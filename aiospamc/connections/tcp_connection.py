@@ -6,6 +6,8 @@ import asyncio
 
 from aiospamc.connections import Connection
 from aiospamc.connections import ConnectionManager
+from aiospamc.connections.resolver import connect_first, Resolver
+from aiospamc.connections.tls import create_ssl_context, SessionCachingContext
 from aiospamc.exceptions import AIOSpamcConnectionFailed
 
 
@@ -18,11 +20,28 @@ class TcpConnectionManager(ConnectionManager):
         Hostname or IP address of server.
     port : str
         Port number.
-    ssl : bool
-        Whether to use SSL/TLS.
+    ssl : ssl.SSLContext or bool
+        SSL context shared by every connection, or `False` to not use
+        SSL/TLS.
+    resolver : aiospamc.connections.resolver.Resolver
+        Resolves and caches the addresses of the host.
+    server_hostname : str
+        Hostname to check the server's certificate against, if the host is an
+        address.
+    happy_eyeballs_delay : float
+        Seconds to wait for an address to connect before also trying the
+        next.
     '''
 
-    def __init__(self, host, port, ssl=False, loop=None):
+    def __init__(self,
+                 host,
+                 port,
+                 ssl=False,
+                 loop=None,
+                 timeouts=None,
+                 resolver=None,
+                 server_hostname=None,
+                 happy_eyeballs_delay=0.25):
         '''Constructor for TcpConnectionManager.
 
         Parameters
@@ -31,22 +50,41 @@ class TcpConnectionManager(ConnectionManager):
             Hostname or IP address of server.
         port : str
             Port number
-        ssl : :obj:`bool` or optional
-            SSL/TLS enabled.
+        ssl : :obj:`bool` or :class:`ssl.SSLContext`, optional
+            SSL/TLS enabled.  If true, a context that trusts the system's
+            certificate authorities and resumes sessions is created.  Pass a
+            context to set the certificates to trust or a client certificate,
+            usually one from :func:`aiospamc.connections.tls.create_ssl_context`
+            so sessions are resumed.
         loop : asyncio.AbstractEventLoop
             The asyncio event loop.
+        timeouts : aiospamc.connections.Timeouts, optional
+            Timeouts given to each connection.
+        resolver : aiospamc.connections.resolver.Resolver, optional
+            Resolves and caches the addresses of the host.  Defaults to a
+            resolver that caches them for a minute.
+        server_hostname : str, optional
+            Hostname to check the server's certificate against, if the host is
+            an address.
+        happy_eyeballs_delay : float, optional
+            Seconds to wait for an address to connect before also trying the
+            next.
         '''
 
         self.host = host
         self.port = port
-        self.ssl = ssl
-        super().__init__(loop)
+        self.ssl = create_ssl_context() if ssl is True else ssl
+        self.server_hostname = server_hostname
+        self.happy_eyeballs_delay = happy_eyeballs_delay
+        super().__init__(loop, timeouts)
+        self.resolver = resolver or Resolver(loop=self.loop)
+        self._own_resolver = resolver is None
 
     def __repr__(self):
         return '{}(host={}, port={}, ssl={})'.format(self.__class__.__name__,
                                                      repr(self.host),
                                                      repr(self.port),
-                                                     self.ssl)
+                                                     bool(self.ssl))
 
     def new_connection(self):
         '''Creates a new TCP connection.
@@ -56,7 +94,60 @@ class TcpConnectionManager(ConnectionManager):
         aiospamc.exceptions.AIOSpamcConnectionFailed
         '''
 
-        return TcpConnection(self.host, self.port, self.ssl, self.loop)
+        return TcpConnection(self.host,
+                             self.port,
+                             self.ssl,
+                             self.loop,
+                             self.timeouts,
+                             self.resolver,
+                             self.server_hostname,
+                             self.happy_eyeballs_delay)
+
+    async def address_managers(self, refresh=False):
+        '''Creates a manager for each address of the host, so a
+        :class:`aiospamc.connections.pooled_connection.PooledConnectionManager`
+        can balance requests over them as separate backends.
+
+        Parameters
+        ----------
+        refresh : bool, optional
+            Whether to resolve the host again rather than use its cached
+            addresses.
+
+        Returns
+        -------
+        list of aiospamc.connections.tcp_connection.TcpConnectionManager
+
+        Raises
+        ------
+        aiospamc.exceptions.AIOSpamcConnectionFailed
+            Raised if the host couldn't be resolved.
+        '''
+
+        try:
+            if refresh:
+                addresses = await self.resolver.refresh(self.host, self.port)
+            else:
+                addresses = await self.resolver.resolve(self.host, self.port)
+        except OSError as error:
+            raise AIOSpamcConnectionFailed(error)
+
+        return [TcpConnectionManager(address,
+                                     self.port,
+                                     self.ssl,
+                                     self.loop,
+                                     self.timeouts,
+                                     self.resolver,
+                                     self.server_hostname or self.host,
+                                     self.happy_eyeballs_delay)
+                for address in addresses]
+
+    def close(self):
+        '''Cancels the lookups in progress of the resolver, if it was created
+        by this manager.'''
+
+        if self._own_resolver:
+            self.resolver.close()
 
 
 class TcpConnection(Connection):
@@ -68,13 +159,28 @@ class TcpConnection(Connection):
         Hostname or IP address of server.
     port : str
         Port number
-    ssl : bool
-        Whether to use SSL/TLS.
+    ssl : ssl.SSLContext or bool
+        SSL context, or whether to use SSL/TLS.
     loop : asyncio.AbstratEventLoop
         The asyncio event loop.
+    resolver : aiospamc.connections.resolver.Resolver
+        Resolves the host, or `None` to leave it to the event loop.
+    server_hostname : str
+        Hostname to check the server's certificate against.
+    happy_eyeballs_delay : float
+        Seconds to wait for an address to connect before also trying the
+        next.
     '''
 
-    def __init__(self, host, port, ssl, loop=None):
+    def __init__(self,
+                 host,
+                 port,
+                 ssl,
+                 loop=None,
+                 timeouts=None,
+                 resolver=None,
+                 server_hostname=None,
+                 happy_eyeballs_delay=0.25):
         '''Constructor for TcpConnection.
 
         Attributes
@@ -83,20 +189,33 @@ class TcpConnection(Connection):
             Hostname or IP address of server.
         port : str
             Port number
-        ssl :  :obj:`bool` or optional
-            SSL/TLS enabled.
+        ssl :  :obj:`bool` or :class:`ssl.SSLContext`
+            SSL/TLS enabled, or the SSL context to use.
+        timeouts : aiospamc.connections.Timeouts, optional
+            Timeouts for connecting, writing and reading.
+        resolver : aiospamc.connections.resolver.Resolver, optional
+            Resolves the host, or `None` to leave it to the event loop.
+        server_hostname : str, optional
+            Hostname to check the server's certificate against, if the host is
+            an address.
+        happy_eyeballs_delay : float, optional
+            Seconds to wait for an address to connect before also trying the
+            next.
         '''
 
         self.host = host
         self.port = port
         self.ssl = ssl
-        super().__init__(loop)
+        self.resolver = resolver
+        self.server_hostname = server_hostname
+        self.happy_eyeballs_delay = happy_eyeballs_delay
+        super().__init__(loop, timeouts)
 
     def __repr__(self):
         return '{}(host={}, port={}, ssl={})'.format(self.__class__.__name__,
                                                      repr(self.host),
                                                      repr(self.port),
-                                                     self.ssl)
+                                                     bool(self.ssl))
 
     async def open(self):
         '''Opens a connection.
@@ -112,10 +231,14 @@ class TcpConnection(Connection):
         '''
 
         try:
-            reader, writer = await asyncio.open_connection(self.host,
-                                                           self.port,
-                                                           ssl=self.ssl,
-                                                           loop=self.loop)
+            addresses = [self.host] if self.resolver is None else await self.resolver.resolve(self.host, self.port)
+            if len(addresses) == 1:
+                reader, writer = await self._connect(addresses[0])
+            else:
+                reader, writer = await connect_first(addresses,
+                                                     self._connect,
+                                                     self.happy_eyeballs_delay,
+                                                     self.loop)
         except (ConnectionRefusedError, OSError) as error:
             raised = AIOSpamcConnectionFailed(error)
             self.logger.exception('Exception occurred when connecting to %s:%s: %s',
@@ -126,6 +249,31 @@ class TcpConnection(Connection):
 
         return reader, writer
 
+    async def _connect(self, address):
+        if not self.ssl:
+            return await asyncio.open_connection(address, self.port, loop=self.loop)
+
+        if isinstance(self.ssl, SessionCachingContext):
+            context = self.ssl.server(self.host, self.port)
+        else:
+            context = self.ssl
+
+        return await asyncio.open_connection(address,
+                                             self.port,
+                                             ssl=context,
+                                             server_hostname=self.server_hostname or self.host,
+                                             loop=self.loop)
+
+    def close(self):
+        '''Closes the connection, saving its TLS session to resume.'''
+
+        if isinstance(self.ssl, SessionCachingContext):
+            self.ssl.save_session(self.server_hostname or self.host,
+                                  self.host,
+                                  self.port,
+                                  self.writer.get_extra_info('ssl_object'))
+        super().close()
+
     @property
     def connection_string(self):
         '''String representation of the connection.
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+'''TLS settings shared by the connections to SPAMD.'''
+
+import ssl
+
+
+class SessionCachingContext(ssl.SSLContext):
+    '''SSL context that resumes the last TLS session with each server.
+
+    SPAMD closes the connection after each response, so every request opens
+    a new one.  Resuming the session of the previous connection to the same
+    server skips most of the handshake.  The session is saved when a
+    connection closes, after any session tickets have arrived, and offered
+    when the next connection to that server is opened.
+
+    Sessions are kept for each server name, host and port, since several
+    SPAMD servers behind one name, such as the addresses of a pool, don't
+    share sessions.  Connections pass the context returned by
+    :meth:`server` to :mod:`asyncio` so it knows which server they're
+    opened to.
+
+    Attributes
+    ----------
+    sessions : dict
+        Last session for each server name, host and port.
+    handshakes : int
+        Number of handshakes completed.
+    resumed : int
+        Number of handshakes that resumed a session.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.sessions = {}
+        self.handshakes = 0
+        self.resumed = 0
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None:
+            return super().wrap_bio(incoming, outgoing, server_side, server_hostname)
+
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session=session)
+
+    def server(self, host, port):
+        '''Gets the context to open a connection to a server with, which
+        offers the server's last session.
+
+        Parameters
+        ----------
+        host : str
+            Hostname or IP address connected to.
+        port : int
+            Port number.
+
+        Returns
+        -------
+        aiospamc.connections.tls.ServerContext
+        '''
+
+        return ServerContext(self, host, port)
+
+    def save_session(self, server_hostname, host, port, ssl_object):
+        '''Saves the session of a connection so the next one to the same
+        server can resume it.
+
+        Parameters
+        ----------
+        server_hostname : str
+            Name of the server.
+        host : str
+            Hostname or IP address connected to.
+        port : int
+            Port number.
+        ssl_object : ssl.SSLObject
+            TLS state of the connection, or `None` if it isn't using TLS.
+        '''
+
+        if ssl_object is None:
+            return
+
+        self.handshakes += 1
+        if getattr(ssl_object, 'session_reused', False):
+            self.resumed += 1
+        session = getattr(ssl_object, 'session', None)
+        if session is not None:
+            self.sessions[(server_hostname, host, port)] = session
+
+
+class ServerContext:
+    '''A :class:`SessionCachingContext` for the connections to one server,
+    which offers them the server's last session.  Everything else is left to
+    the shared context.
+
+    Attributes
+    ----------
+    context : aiospamc.connections.tls.SessionCachingContext
+        The shared context.
+    host : str
+        Hostname or IP address connected to.
+    port : int
+        Port number.
+    '''
+
+    def __init__(self, context, host, port):
+        self.context = context
+        self.host = host
+        self.port = port
+
+    def __repr__(self):
+        return '{}(host={}, port={})'.format(self.__class__.__name__, repr(self.host), repr(self.port))
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.context.sessions.get((server_hostname, self.host, self.port))
+
+        return self.context.wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+
+def create_ssl_context(cafile=None,
+                       capath=None,
+                       cadata=None,
+                       certfile=None,
+                       keyfile=None,
+                       password=None,
+                       verify=True):
+    '''Creates an SSL context for connecting to SPAMD that resumes sessions.
+
+    The context should be created once and shared by every connection, so
+    sessions can be resumed and the certificates are only loaded once.
+
+    Parameters
+    ----------
+    cafile : str, optional
+        Path to the certificates of the authorities to trust.  If any of the
+        `cafile`, `capath` or `cadata` arguments are given, only those
+        authorities are trusted, otherwise the system's are.
+    capath : str, optional
+        Directory of certificates of the authorities to trust.
+    cadata : str or bytes, optional
+        Certificates of the authorities to trust.
+    certfile : str, optional
+        Path to the client certificate, to authenticate to SPAMD.
+    keyfile : str, optional
+        Path to the private key of the client certificate, if it isn't in
+        `certfile`.
+    password : str, bytes or callable, optional
+        Password to decrypt the private key.
+    verify : bool, optional
+        Whether to verify the server's certificate and hostname.
+
+    Returns
+    -------
+    aiospamc.connections.tls.SessionCachingContext
+    '''
+
+    context = SessionCachingContext(getattr(ssl, 'PROTOCOL_TLS_CLIENT', ssl.PROTOCOL_SSLv23))
+    if verify:
+        context.verify_mode = ssl.CERT_REQUIRED
+        context.check_hostname = True
+    else:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if cafile or capath or cadata:
+        context.load_verify_locations(cafile, capath, cadata)
+    else:
+        context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+    if certfile:
+        context.load_cert_chain(certfile, keyfile, password)
+
+    return context
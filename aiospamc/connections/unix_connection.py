@@ -18,7 +18,9 @@ class UnixConnectionManager(ConnectionManager):
         Path of the socket.
     '''
 
-    def __init__(self, path, loop=None):
+    local = True
+
+    def __init__(self, path, loop=None, timeouts=None):
         '''Constructor for UnixConnectionManager.
 
         Parameters
@@ -27,10 +29,12 @@ class UnixConnectionManager(ConnectionManager):
             Path of the socket.
         loop : asyncio.AbstractEventLoop
             The asyncio event loop.
+        timeouts : aiospamc.connections.Timeouts, optional
+            Timeouts given to each connection.
         '''
 
         self.path = path
-        super().__init__(loop)
+        super().__init__(loop, timeouts)
 
     def __repr__(self):
         return 'UnixConnectionManager(path={})'.format(repr(self.path))
@@ -43,7 +47,7 @@ class UnixConnectionManager(ConnectionManager):
         AIOSpamcConnectionFailed
         '''
 
-        return UnixConnection(self.path, self.loop)
+        return UnixConnection(self.path, self.loop, self.timeouts)
 
 
 class UnixConnection(Connection):
@@ -57,7 +61,7 @@ class UnixConnection(Connection):
         The asyncio event loop.
     '''
 
-    def __init__(self, path, loop=None):
+    def __init__(self, path, loop=None, timeouts=None):
         '''Constructor for UnixConnection.
 
         Parameters
@@ -66,10 +70,12 @@ class UnixConnection(Connection):
             Path of the socket.
         loop : asyncio.AbstractEventLoop
             The asyncio event loop.
+        timeouts : aiospamc.connections.Timeouts, optional
+            Timeouts for connecting, writing and reading.
         '''
 
         self.path = path
-        super().__init__(loop)
+        super().__init__(loop, timeouts)
 
     def __repr__(self):
         return 'UnixConnection(path={})'.format(repr(self.path))
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+'''Connection manager that keeps connections open ahead of requests.'''
+
+import asyncio
+import collections
+import logging
+import time
+
+from aiospamc.connections import ConnectionManager
+from aiospamc.exceptions import AIOSpamcConnectionFailed, AIOSpamcConnectionTimeout
+
+
+class WarmConnectionManager(ConnectionManager):
+    '''Keeps a few connections to a SPAMD service open and idle, so a request
+    can use one straight away instead of waiting to connect.
+
+    SPAMD closes the connection after each response, so every connection is
+    only used once.  The pool is refilled in the background as connections are
+    taken.  Connections that have been idle for :attr:`max_idle_time`, or
+    that SPAMD has closed, are discarded rather than used.
+
+    Attributes
+    ----------
+    manager : aiospamc.connections.ConnectionManager
+        Creates the connections.
+    size : int
+        Number of idle connections to keep open.
+    max_idle_time : float
+        Seconds a connection may stay idle before it's discarded.  Should be
+        shorter than SPAMD's own idle timeout.
+    retry_delay : float
+        Seconds to wait before refilling the pool after a connection failed.
+    idle : collections.deque
+        Idle connections and the time each was opened, oldest first.
+    hits : int
+        Number of requests given an idle connection.
+    misses : int
+        Number of requests that had to connect.
+    opened : int
+        Number of idle connections opened.
+    expired : int
+        Number of idle connections discarded.
+    failures : int
+        Number of idle connections that couldn't be opened.
+    logger : logging.Logger
+        Logging instance.
+    '''
+
+    def __init__(self, manager, size=2, max_idle_time=10.0, retry_delay=1.0, loop=None):
+        '''Constructor for WarmConnectionManager.
+
+        Parameters
+        ----------
+        manager : aiospamc.connections.ConnectionManager
+            Creates the connections, such as a
+            :class:`aiospamc.connections.tcp_connection.TcpConnectionManager`.
+        size : int, optional
+            Number of idle connections to keep open.
+        max_idle_time : float, optional
+            Seconds a connection may stay idle before it's discarded.
+        retry_delay : float, optional
+            Seconds to wait before refilling the pool after a connection
+            failed.
+        loop : asyncio.AbstractEventLoop, optional
+            The asyncio event loop.  Defaults to the manager's.
+
+        Raises
+        ------
+        ValueError
+            Raised if the size is less than one.
+        '''
+
+        if size < 1:
+            raise ValueError('Size must be at least one')
+
+        super().__init__(loop or manager.loop, manager.timeouts)
+        self.manager = manager
+        self.size = size
+        self.max_idle_time = max_idle_time
+        self.retry_delay = retry_delay
+        self.idle = collections.deque()
+        self.hits = 0
+        self.misses = 0
+        self.opened = 0
+        self.expired = 0
+        self.failures = 0
+        self._refill = None
+        self._wanted = asyncio.Event(loop=self.loop)
+        self.logger = logging.getLogger(__name__)
+
+    def __repr__(self):
+        return '{}(manager={}, size={}, max_idle_time={})'.format(self.__class__.__name__,
+                                                                 repr(self.manager),
+                                                                 self.size,
+                                                                 self.max_idle_time)
+
+    @property
+    def local(self):
+        '''Whether connections stay on this host.
+
+        Returns
+        -------
+        bool
+        '''
+
+        return self.manager.local
+
+    def new_connection(self):
+        '''Creates a connection that uses an idle connection if one is ready.
+        Starts filling the pool if it isn't already.
+
+        Returns
+        -------
+        aiospamc.connections.warm_pool.WarmConnection
+            Context manager that gives an open connection.
+        '''
+
+        self.start()
+
+        return WarmConnection(self)
+
+    def start(self):
+        '''Starts keeping the pool filled, if not already.  Restarts it if it
+        stopped because of an error.'''
+
+        if self._refill is not None and self._refill.done():
+            if not self._refill.cancelled() and self._refill.exception() is not None:
+                self.logger.error('Restarting the refill of %r after: %r', self.manager, self._refill.exception())
+            self._refill = None
+        if self._refill is None:
+            self._refill = asyncio.ensure_future(self._refill_forever(), loop=self.loop)
+
+    def close(self):
+        '''Stops filling the pool and closes the idle connections and the
+        manager.'''
+
+        if self._refill is not None:
+            self._refill.cancel()
+            self._refill = None
+        while self.idle:
+            connection, _ = self.idle.popleft()
+            connection.close()
+        self.manager.close()
+
+    def take(self):
+        '''Takes the oldest idle connection that can still be used, discarding
+        any that can't.
+
+        Returns
+        -------
+        aiospamc.connections.Connection
+            An open connection, or `None` if none are ready.
+        '''
+
+        now = time.monotonic()
+        while self.idle:
+            connection, opened = self.idle.popleft()
+            self._wanted.set()
+            if now - opened < self.max_idle_time and self._usable(connection):
+                self.hits += 1
+                return connection
+            self.expired += 1
+            connection.close()
+
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _usable(connection):
+        return (not connection.reader.at_eof()
+                and connection.reader.exception() is None
+                and not connection.writer.transport.is_closing())
+
+    def _discard_expired(self):
+        now = time.monotonic()
+        while self.idle and now - self.idle[0][1] >= self.max_idle_time:
+            connection, _ = self.idle.popleft()
+            self.expired += 1
+            connection.close()
+
+    async def _refill_forever(self):
+        while True:
+            self._wanted.clear()
+            self._discard_expired()
+            wait = None
+            while len(self.idle) < self.size:
+                try:
+                    connection = self.manager.new_connection()
+                    await connection.__aenter__()
+                except asyncio.CancelledError:
+                    raise
+                except (AIOSpamcConnectionFailed, AIOSpamcConnectionTimeout) as error:
+                    self.failures += 1
+                    self.logger.warning('Could not open an idle connection with %r: %s', self.manager, error)
+                    wait = self.retry_delay
+                    break
+                except Exception:
+                    self.failures += 1
+                    self.logger.exception('Unexpected error opening an idle connection with %r', self.manager)
+                    wait = self.retry_delay
+                    break
+                self.opened += 1
+                self.idle.append((connection, time.monotonic()))
+
+            if wait is None and self.idle:
+                wait = max(self.idle[0][1] + self.max_idle_time - time.monotonic(), 0)
+            try:
+                await asyncio.wait_for(self._wanted.wait(), wait, loop=self.loop)
+            except asyncio.TimeoutError:
+                pass
+
+
+class WarmConnection:
+    '''Gives an idle connection from a
+    :class:`aiospamc.connections.warm_pool.WarmConnectionManager`, or opens a
+    new one if none are ready.
+
+    Attributes
+    ----------
+    manager : aiospamc.connections.warm_pool.WarmConnectionManager
+        The pool the connection is from.
+    connection : aiospamc.connections.Connection
+        The connection, once it's open.
+    '''
+
+    def __init__(self, manager):
+        '''Constructor for WarmConnection.
+
+        Parameters
+        ----------
+        manager : aiospamc.connections.warm_pool.WarmConnectionManager
+            The pool the connection is from.
+        '''
+
+        self.manager = manager
+        self.connection = None
+
+    def __repr__(self):
+        return '{}(connection={})'.format(self.__class__.__name__, repr(self.connection))
+
+    async def __aenter__(self):
+        connection = self.manager.take()
+        if connection is None:
+            connection = self.manager.manager.new_connection()
+            await connection.__aenter__()
+        self.connection = connection
+
+        return connection
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return await self.connection.__aexit__(exc_type, exc_val, exc_tb)
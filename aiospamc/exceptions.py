@@ -19,6 +19,11 @@ class BadResponse(ClientException):
     pass
 
 
+class ClientClosed(ClientException):
+    '''The client is draining or closed and doesn't accept new requests.'''
+    pass
+
+
 # ConnectionManager and Connection object exceptions
 class AIOSpamcConnectionException(Exception):
     '''Base class for exceptions from the connection.'''
@@ -30,6 +35,18 @@ class AIOSpamcConnectionFailed(AIOSpamcConnectionException):
     pass
 
 
+class AIOSpamcConnectionTimeout(AIOSpamcConnectionException):
+    '''Connecting, sending, receiving or the whole request took too long.
+    The connection is closed when this is raised.'''
+    pass
+
+
+class AIOSpamcConnectionQueueFull(AIOSpamcConnectionException):
+    '''Too many requests are waiting for a connection, or one waited too
+    long.'''
+    pass
+
+
 class ResponseException(Exception):
     '''Base class for exceptions raised from a response.'''
     pass
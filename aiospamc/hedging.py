@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+'''Deciding when to hedge a slow request.'''
+
+from aiospamc.common import FileBody
+from aiospamc.latency import LatencyHistogram
+
+
+class HedgePolicy:
+    '''Decides when a request that's taking unusually long is sent a second
+    time, so a SPAMD child that stalls, for example on a DNS blocklist
+    lookup, doesn't hold up the response.
+
+    A request is hedged once it has taken longer than :attr:`quantile` of the
+    earlier requests with the same verb.  Whichever attempt answers first is
+    used and the other is cancelled.  Only verbs that don't change SPAMD's
+    state are hedged, and not requests with a body read from a file, since
+    both attempts would read it through the same file object.  Hedges are
+    limited by a budget: each request adds :attr:`max_rate` of a hedge to it
+    and each hedge takes a whole one.
+
+    Attributes
+    ----------
+    quantile : float
+        Quantile of the latencies to wait for before hedging.
+    max_rate : float
+        Largest fraction of requests that are hedged.
+    min_delay : float
+        Shortest time in seconds to wait before hedging.
+    default_delay : float
+        Time in seconds to wait before hedging until enough latencies have
+        been seen, or `None` to not hedge until then.
+    min_samples : int
+        Latencies needed before the delay is derived from them.
+    burst : float
+        Most hedges that can be saved up.
+    verbs : frozenset of str
+        Verbs that are hedged.
+    tokens : float
+        Hedges currently available.
+    histograms : dict
+        :class:`aiospamc.latency.LatencyHistogram` for each verb.
+    requests : int
+        Number of requests that could have been hedged.
+    hedged : int
+        Number of requests hedged.
+    wins : int
+        Number of hedges that answered first.
+    suppressed : int
+        Number of hedges not sent because the budget ran out.
+    '''
+
+    def __init__(self,
+                 quantile=0.95,
+                 max_rate=0.05,
+                 min_delay=0.01,
+                 default_delay=None,
+                 min_samples=100,
+                 burst=10.0,
+                 verbs=('CHECK', 'HEADERS', 'REPORT', 'SYMBOLS')):
+        '''HedgePolicy constructor.
+
+        Parameters
+        ----------
+        quantile : float, optional
+            Quantile of the latencies to wait for before hedging.
+        max_rate : float, optional
+            Largest fraction of requests that are hedged.  Defaults to 5%.
+        min_delay : float, optional
+            Shortest time in seconds to wait before hedging.
+        default_delay : float, optional
+            Time in seconds to wait before hedging until enough latencies
+            have been seen.  By default requests aren't hedged until then.
+        min_samples : int, optional
+            Latencies needed before the delay is derived from them.
+        burst : float, optional
+            Most hedges that can be saved up.
+        verbs : collection of str, optional
+            Verbs that are hedged.  Defaults to CHECK, HEADERS, REPORT and
+            SYMBOLS.
+
+        Raises
+        ------
+        ValueError
+            Raised if the quantile isn't between 0 and 1 or the rate isn't
+            between 0 and 1.
+        '''
+
+        if not 0 < quantile < 1:
+            raise ValueError('Quantile must be between 0 and 1')
+        if not 0 <= max_rate <= 1:
+            raise ValueError('Maximum rate must be between 0 and 1')
+
+        self.quantile = quantile
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.burst = burst
+        self.verbs = frozenset(verbs)
+        self.tokens = 1.0
+        self.histograms = {}
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.suppressed = 0
+
+    def __repr__(self):
+        return '{}(quantile={}, max_rate={}, verbs={})'.format(self.__class__.__name__,
+                                                              self.quantile,
+                                                              self.max_rate,
+                                                              sorted(self.verbs))
+
+    @property
+    def hedge_rate(self):
+        '''Fraction of requests hedged.
+
+        Returns
+        -------
+        float
+        '''
+
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def applies(self, request):
+        '''Whether a request may be hedged.
+
+        Parameters
+        ----------
+        request : aiospamc.requests.Request or aiospamc.requests.PreparedRequest
+
+        Returns
+        -------
+        bool
+        '''
+
+        return request.verb in self.verbs and \
+            not any(isinstance(buffer, FileBody) for buffer in request.buffers())
+
+    def record_request(self):
+        '''Adds a request's share of a hedge to the budget.'''
+
+        self.requests += 1
+        self.tokens = min(self.tokens + self.max_rate, self.burst)
+
+    def record(self, verb, seconds):
+        '''Records how long an attempt took to answer.
+
+        Parameters
+        ----------
+        verb : str
+            Method name of the request.
+        seconds : float
+            Time from connecting until the response was received.
+        '''
+
+        if verb not in self.histograms:
+            self.histograms[verb] = LatencyHistogram()
+        self.histograms[verb].record(seconds)
+
+    def delay(self, verb):
+        '''Gets how long to wait for a response before hedging.
+
+        Parameters
+        ----------
+        verb : str
+            Method name of the request.
+
+        Returns
+        -------
+        float
+            The delay in seconds, or `None` to not hedge.
+        '''
+
+        histogram = self.histograms.get(verb)
+        if histogram is None or histogram.count < self.min_samples:
+            return self.default_delay
+
+        return max(histogram.quantile(self.quantile), self.min_delay)
+
+    def acquire(self):
+        '''Takes a hedge from the budget.
+
+        Returns
+        -------
+        bool
+            Whether the request may be hedged.
+        '''
+
+        if self.tokens < 1:
+            self.suppressed += 1
+            return False
+
+        self.tokens -= 1
+        self.hedged += 1
+        return True
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+'''Latency tracking and timeouts derived from it.'''
+
+import bisect
+
+
+class LatencyHistogram:
+    '''Streaming estimate of latency quantiles.
+
+    Latencies are counted in buckets whose bounds grow geometrically, so a
+    quantile is accurate to within the growth factor across the whole range
+    while using a fixed amount of memory.  Once :attr:`window` latencies have
+    been counted every count is halved, so the estimate follows recent
+    behaviour.
+
+    Attributes
+    ----------
+    bounds : list of float
+        Upper bound in seconds of each bucket.
+    counts : list of float
+        Number of latencies in each bucket.  The last bucket counts the ones
+        above the largest bound.
+    count : float
+        Number of latencies counted, after halving.
+    window : int
+        Number of latencies counted before the counts are halved.
+    '''
+
+    def __init__(self, minimum=0.001, maximum=3600.0, growth=1.1, window=10000):
+        '''LatencyHistogram constructor.
+
+        Parameters
+        ----------
+        minimum : float, optional
+            Upper bound in seconds of the first bucket.
+        maximum : float, optional
+            Largest latency in seconds that's counted exactly.
+        growth : float, optional
+            Ratio between the bounds of neighbouring buckets.
+        window : int, optional
+            Number of latencies counted before the counts are halved.
+        '''
+
+        self.bounds = []
+        bound = minimum
+        while bound < maximum:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(maximum)
+        self.counts = [0.0] * (len(self.bounds) + 1)
+        self.count = 0.0
+        self.window = window
+
+    def __repr__(self):
+        return '{}(count={})'.format(self.__class__.__name__, self.count)
+
+    def record(self, seconds):
+        '''Counts a latency.
+
+        Parameters
+        ----------
+        seconds : float
+            The latency.
+        '''
+
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        if self.count >= self.window:
+            self.counts = [count / 2 for count in self.counts]
+            self.count /= 2
+
+    def quantile(self, quantile):
+        '''Estimates a quantile of the latencies.
+
+        Parameters
+        ----------
+        quantile : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        float
+            Upper bound of the bucket the quantile falls in, or `None` if
+            nothing has been counted.
+        '''
+
+        if not self.count:
+            return None
+
+        rank = quantile * self.count
+        cumulative = 0.0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+
+        return self.bounds[-1]
+
+
+class AdaptiveTimeouts:
+    '''Derives response timeouts from the latencies of earlier requests.
+
+    Latencies are tracked separately for each verb and body size bucket, since
+    SPAMD takes longer to scan larger messages.  A latency is the time from
+    sending a request until its whole response is received, so the timeout
+    derived from them is for the whole response rather than each read.  It's
+    a high quantile of the latencies of similar requests multiplied by a
+    factor, clamped to a range.  Until enough latencies have been seen the
+    connection's own read timeout is used.
+
+    Requests that time out are recorded with the time they waited, so the
+    timeout grows when SPAMD slows down instead of only the responses that
+    beat it being counted.
+
+    Attributes
+    ----------
+    quantile : float
+        Quantile of the latencies the timeout is based on.
+    factor : float
+        Multiple of the quantile to allow.
+    minimum : float
+        Shortest timeout in seconds.
+    maximum : float
+        Longest timeout in seconds.
+    min_samples : int
+        Latencies needed before a timeout is derived.
+    size_buckets : tuple of int
+        Upper bounds in bytes of the body size buckets.  Larger bodies go in
+        one more bucket.
+    histograms : dict
+        :class:`LatencyHistogram` for each ``(verb, size bucket)`` pair.
+    '''
+
+    def __init__(self,
+                 quantile=0.999,
+                 factor=3.0,
+                 minimum=1.0,
+                 maximum=300.0,
+                 min_samples=100,
+                 size_buckets=(2 ** 14, 2 ** 16, 2 ** 18, 2 ** 20, 2 ** 22)):
+        '''AdaptiveTimeouts constructor.
+
+        Parameters
+        ----------
+        quantile : float, optional
+            Quantile of the latencies the timeout is based on.
+        factor : float, optional
+            Multiple of the quantile to allow.
+        minimum : float, optional
+            Shortest timeout in seconds.
+        maximum : float, optional
+            Longest timeout in seconds.
+        min_samples : int, optional
+            Latencies needed before a timeout is derived.
+        size_buckets : tuple of int, optional
+            Upper bounds in bytes of the body size buckets.
+
+        Raises
+        ------
+        ValueError
+            Raised if the quantile isn't between 0 and 1 or the minimum is
+            larger than the maximum.
+        '''
+
+        if not 0 < quantile < 1:
+            raise ValueError('Quantile must be between 0 and 1')
+        if minimum > maximum:
+            raise ValueError('Minimum timeout must not be larger than the maximum')
+
+        self.quantile = quantile
+        self.factor = factor
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_samples = min_samples
+        self.size_buckets = tuple(size_buckets)
+        self.histograms = {}
+
+    def __repr__(self):
+        return '{}(quantile={}, factor={}, minimum={}, maximum={})'.format(self.__class__.__name__,
+                                                                          self.quantile,
+                                                                          self.factor,
+                                                                          self.minimum,
+                                                                          self.maximum)
+
+    def size_bucket(self, size):
+        '''Gets the size bucket of a body.
+
+        Parameters
+        ----------
+        size : int
+            Size of the body in bytes.
+
+        Returns
+        -------
+        int
+            Index of the bucket.
+        '''
+
+        return bisect.bisect_left(self.size_buckets, size)
+
+    def record(self, verb, size, seconds):
+        '''Records the latency of a request.
+
+        Parameters
+        ----------
+        verb : str
+            Method name of the request.
+        size : int
+            Size of the request body in bytes.
+        seconds : float
+            Time from sending the request until the response was received.
+        '''
+
+        key = (verb, self.size_bucket(size))
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram(maximum=self.maximum)
+        self.histograms[key].record(seconds)
+
+    def timeout(self, verb, size):
+        '''Derives the time to wait for the response to a request.
+
+        Parameters
+        ----------
+        verb : str
+            Method name of the request.
+        size : int
+            Size of the request body in bytes.
+
+        Returns
+        -------
+        float
+            The timeout in seconds, or `None` if there aren't enough
+            latencies yet.
+        '''
+
+        histogram = self.histograms.get((verb, self.size_bucket(size)))
+        if histogram is None:
+            return None
+
+        return self._derive(histogram)
+
+    def _derive(self, histogram):
+        if histogram.count < self.min_samples:
+            return None
+
+        return min(max(histogram.quantile(self.quantile) * self.factor, self.minimum), self.maximum)
+
+    def snapshot(self):
+        '''Describes the current state of the estimates.
+
+        Returns
+        -------
+        dict
+            For each ``(verb, size bucket)`` pair, a dict of the number of
+            latencies counted, the median, the 99th percentile, the quantile
+            the timeout is based on and the timeout, or `None` if there
+            aren't enough latencies for one.
+        '''
+
+        snapshot = {}
+        for key, histogram in self.histograms.items():
+            snapshot[key] = {
+                'count': histogram.count,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+                'quantile': histogram.quantile(self.quantile),
+                'timeout': self._derive(histogram),
+            }
+
+        return snapshot
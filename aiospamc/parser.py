@@ -3,8 +3,8 @@
 '''Parser object for SPAMC/SPAMD requests and responses.'''
 
 
+import enum
 import re
-from functools import wraps
 
 import aiospamc.headers
 import aiospamc.options
@@ -37,33 +37,54 @@ class ParseError(Exception):
         self.message = message
 
 
-def checkpoint(func):
-    '''A decorator to restore the index if an exception occurred.'''
-
-    @wraps(func)
-    def inner(self):
-        check = self.index
-        try:
-            return func(self)
-        except ParseError:
-            self.index = check
-            raise
-    return inner
+_WHITESPACE = re.compile(rb'[ \t]+')
+_NEWLINE = re.compile(rb'\r\n')
+_SLASH = re.compile(rb'/')
+_COLON = re.compile(rb':')
+_SEMICOLON = re.compile(rb';')
+_VERSION = re.compile(rb'\d+\.\d+')
+_INTEGER = re.compile(rb'\d+')
+_NUMBER = re.compile(rb'\d+(\.\d+)?')
+_COMPRESS = re.compile(rb'zlib')
+_MESSAGE_CLASS = re.compile(rb'ham|spam')
+_ACTION = re.compile(rb'(local|remote)([ \t]*,[ \t]*(local|remote))?')
+_BOOLEAN = re.compile(rb'True|False')
+_USER = re.compile(rb'[a-zA-Z0-9-_]+')
+_HEADER_NAME = re.compile(rb'[a-zA-Z0-9_-]+')
+_HEADER_VALUE = re.compile(rb'[^\r\n]*')
+_MESSAGE = re.compile(rb'[^\r\n]*')
+_SPAMC = re.compile(rb'SPAMC')
+_SPAMD = re.compile(rb'SPAMD')
+_METHOD = re.compile(rb'CHECK|'
+                     rb'HEADERS|'
+                     rb'PING|'
+                     rb'PROCESS|'
+                     rb'REPORT_IFSPAM|'
+                     rb'REPORT|'
+                     rb'SKIP|'
+                     rb'SYMBOLS|'
+                     rb'TELL')
 
 
 class Parser:
-    '''Parser object for requests and responses.'''
+    '''Parser object for requests and responses.
+
+    The parser walks the string once, matching precompiled patterns at the
+    current index of a :class:`memoryview` of the string so that the
+    unparsed remainder is never copied.
+    '''
 
     def __init__(self, string=None):
         '''Parser constructor.
 
         Parameters
         ----------
-        string : :obj:`str`, optional
+        string : :obj:`bytes`, optional
             The string to parse.
         '''
         self.string = string or b''
         self.index = 0
+        self._view = memoryview(self.string)
 
     def advance(self, by):
         '''Advance the current index by number of bytes.
@@ -81,10 +102,10 @@ class Parser:
 
         Returns
         -------
-        :obj:`str`
+        :class:`memoryview`
         '''
 
-        return self.string[self.index:]
+        return self._view[self.index:]
 
     def end(self):
         '''Whether the parser has parsed the entire string.
@@ -94,25 +115,24 @@ class Parser:
         :obj:`bool`
         '''
 
-        return self.index >= len(self.string)
+        return self.index >= len(self._view)
 
     def match(self, pattern):
         '''Returns the regular expression matches string at the current index.
 
         Parameters
         ----------
-        pattern : :obj:`bytes`
+        pattern : :obj:`bytes` or compiled regular expression
 
         Returns
         -------
-        Regular expression match
+        Regular expression match or `None`
         '''
 
-        success = re.match(pattern, self.current())
-        if success:
-            return success
-        else:
-            return None
+        if isinstance(pattern, bytes):
+            pattern = re.compile(pattern)
+
+        return pattern.match(self._view, self.index)
 
     def consume(self, pattern):
         '''If the pattern matches, advances the index the length of the match.
@@ -120,7 +140,7 @@ class Parser:
 
         Parameters
         ----------
-        pattern : :obj:`bytes`
+        pattern : :obj:`bytes` or compiled regular expression
 
         Returns
         -------
@@ -133,36 +153,44 @@ class Parser:
 
         match = self.match(pattern)
         if match:
-            self.advance(match.end())
+            self.index = match.end()
             return match
         else:
             raise ParseError(index=self.index, message='Unable to consume match  with pattern {}'.format(pattern))
 
-    @staticmethod
-    def skip(func):
-        '''Makes the parser function optional by ignore whether it raises a
-        :class:`aiospamc.parser.ParseError` exception or not.
+    def optional(self, pattern):
+        '''Like :meth:`consume`, but returns `None` instead of raising if the
+        pattern doesn't match.
 
         Parameters
         ----------
-        func : function
-            Function to execute.
+        pattern : :obj:`bytes` or compiled regular expression
+
+        Returns
+        -------
+        Regular expression match or `None`
         '''
 
-        try:
-            func()
-        except ParseError:
-            pass
+        match = self.match(pattern)
+        if match:
+            self.index = match.end()
+
+        return match
 
     def whitespace(self):
         '''Consumes spaces or tabs.'''
 
-        self.consume(rb'[ \t]+')
+        self.consume(_WHITESPACE)
+
+    def skip_whitespace(self):
+        '''Consumes spaces or tabs if there are any.'''
+
+        self.optional(_WHITESPACE)
 
     def newline(self):
         '''Consumes a newline sequence (carriage return and line feed).'''
 
-        self.consume(rb'\r\n')
+        self.consume(_NEWLINE)
 
     def version(self):
         '''Consumes a version pattern.  For example, "1.5".
@@ -172,7 +200,7 @@ class Parser:
         :obj:`str`
         '''
 
-        return self.consume(rb'\d+\.\d+').group().decode()
+        return self.consume(_VERSION).group().decode()
 
     def body(self):
         '''Consumes the rest of the message and returns the contents.
@@ -182,11 +210,13 @@ class Parser:
         :obj:`bytes`
         '''
 
-        return self.current()
+        body = bytes(self._view[self.index:])
+        self.index = len(self._view)
+
+        return body
 
     # Header functions
 
-    @checkpoint
     def compress_value(self):
         '''Consumes the Compression header value.
 
@@ -195,13 +225,12 @@ class Parser:
         :obj:`str`
         '''
 
-        self.skip(self.whitespace)
-        algorithm = self.consume(rb'zlib').group()
-        self.skip(self.whitespace)
+        self.skip_whitespace()
+        algorithm = self.consume(_COMPRESS).group()
+        self.skip_whitespace()
 
         return algorithm.decode()
 
-    @checkpoint
     def content_length_value(self):
         '''Consumes the Content-length header value.
 
@@ -210,13 +239,12 @@ class Parser:
         :obj:`int`
         '''
 
-        self.skip(self.whitespace)
-        length = int(self.consume(rb'\d+').group())
-        self.skip(self.whitespace)
+        self.skip_whitespace()
+        length = int(self.consume(_INTEGER).group())
+        self.skip_whitespace()
 
         return length
 
-    @checkpoint
     def message_class_value(self):
         '''Consumes the Message-class header value.
 
@@ -225,14 +253,13 @@ class Parser:
         :class:`aiospamc.options.MessageClassOption`
         '''
 
-        self.skip(self.whitespace)
+        self.skip_whitespace()
         m_class = aiospamc.options.MessageClassOption.ham if self.consume(
-            rb'(ham|spam)').group() == b'ham' else aiospamc.options.MessageClassOption.spam
-        self.skip(self.whitespace)
+            _MESSAGE_CLASS).group() == b'ham' else aiospamc.options.MessageClassOption.spam
+        self.skip_whitespace()
 
         return m_class
 
-    @checkpoint
     def set_remove_value(self):
         '''Consumes the value for the DidRemove, DidSet, Remove and Set headers.
 
@@ -241,13 +268,12 @@ class Parser:
         :class:`aiospamc.options.ActionOption`
         '''
 
-        self.skip(self.whitespace)
-        action = self.consume(rb'(local|remote)([ \t]*,[ \t]*(local|remote))?').group()
-        self.skip(self.whitespace)
+        self.skip_whitespace()
+        action = self.consume(_ACTION).group()
+        self.skip_whitespace()
 
         return aiospamc.options.ActionOption(local=b'local' in action, remote=b'remote' in action)
 
-    @checkpoint
     def spam_value(self):
         '''Consumes the Spam header value.
 
@@ -257,23 +283,20 @@ class Parser:
             Has the keys `value`, `score`, and `threshold`.
         '''
 
-        number = rb'(\d+(\.\d+)?)'
-
-        self.skip(self.whitespace)
-        value = True if self.consume(rb'(True|False)').group() == b'True' else False
-        self.skip(self.whitespace)
-        self.consume(rb';')
-        self.skip(self.whitespace)
-        score = float(self.consume(number).group())
-        self.skip(self.whitespace)
-        self.consume(rb'/')
-        self.skip(self.whitespace)
-        threshold = float(self.consume(number).group())
-        self.skip(self.whitespace)
+        self.skip_whitespace()
+        value = self.consume(_BOOLEAN).group() == b'True'
+        self.skip_whitespace()
+        self.consume(_SEMICOLON)
+        self.skip_whitespace()
+        score = float(self.consume(_NUMBER).group())
+        self.skip_whitespace()
+        self.consume(_SLASH)
+        self.skip_whitespace()
+        threshold = float(self.consume(_NUMBER).group())
+        self.skip_whitespace()
 
         return {'value': value, 'score': score, 'threshold': threshold}
 
-    @checkpoint
     def user_value(self):
         '''Consumes the User header value.
 
@@ -282,13 +305,52 @@ class Parser:
         :obj:`str`
         '''
 
-        self.skip(self.whitespace)
-        username = self.consume(rb'[a-zA-Z0-9-_]+').group()
-        self.skip(self.whitespace)
+        self.skip_whitespace()
+        username = self.consume(_USER).group()
+        self.skip_whitespace()
 
         return username.decode()
 
-    @checkpoint
+    def _compress_header(self):
+        self.compress_value()
+        return aiospamc.headers.Compress()
+
+    def _content_length_header(self):
+        return aiospamc.headers.ContentLength(length=self.content_length_value())
+
+    def _did_remove_header(self):
+        return aiospamc.headers.DidRemove(action=self.set_remove_value())
+
+    def _did_set_header(self):
+        return aiospamc.headers.DidSet(action=self.set_remove_value())
+
+    def _message_class_header(self):
+        return aiospamc.headers.MessageClass(value=self.message_class_value())
+
+    def _remove_header(self):
+        return aiospamc.headers.Remove(action=self.set_remove_value())
+
+    def _set_header(self):
+        return aiospamc.headers.Set(action=self.set_remove_value())
+
+    def _spam_header(self):
+        return aiospamc.headers.Spam(**self.spam_value())
+
+    def _user_header(self):
+        return aiospamc.headers.User(name=self.user_value())
+
+    _header_table = {
+        b'Compress': _compress_header,
+        b'Content-length': _content_length_header,
+        b'DidRemove': _did_remove_header,
+        b'DidSet': _did_set_header,
+        b'Message-class': _message_class_header,
+        b'Remove': _remove_header,
+        b'Set': _set_header,
+        b'Spam': _spam_header,
+        b'User': _user_header,
+    }
+
     def header(self):
         '''Consumes the string and returns an instance of
         :class:`aiospamc.headers.Header`.
@@ -298,37 +360,24 @@ class Parser:
         :class:`aiospamc.headers.Header`
         '''
 
-        self.skip(self.whitespace)
-        name = self.consume(rb'[a-zA-Z0-9_-]+').group()
-        self.skip(self.whitespace)
-        self.consume(rb':')
-        if name == b'Compress':
-            self.compress_value()
-            return aiospamc.headers.Compress()
-        elif name == b'Content-length':
-            return aiospamc.headers.ContentLength(length=self.content_length_value())
-        elif name == b'DidRemove':
-            return aiospamc.headers.DidRemove(action=self.set_remove_value())
-        elif name == b'DidSet':
-            return aiospamc.headers.DidSet(action=self.set_remove_value())
-        elif name == b'Message-class':
-            return aiospamc.headers.MessageClass(value=self.message_class_value())
-        elif name == b'Remove':
-            return aiospamc.headers.Remove(action=self.set_remove_value())
-        elif name == b'Set':
-            return aiospamc.headers.Set(action=self.set_remove_value())
-        elif name == b'Spam':
-            return aiospamc.headers.Spam(**self.spam_value())
-        elif name == b'User':
-            return aiospamc.headers.User(name=self.user_value())
-        else:
-            return aiospamc.headers.XHeader(
-                    name=name.decode(),
-                    value=self.consume(rb'.+(?=\r\n)').group().decode()
-            )
+        self.skip_whitespace()
+        name = self.consume(_HEADER_NAME).group()
+        self.skip_whitespace()
+        self.consume(_COLON)
+
+        value_parser = self._header_table.get(name)
+        if value_parser:
+            return value_parser(self)
+
+        self.skip_whitespace()
+        return aiospamc.headers.XHeader(
+                name=name.decode(),
+                value=self.consume(_HEADER_VALUE).group().decode()
+        )
 
     def headers(self):
-        '''Consumes all headers.
+        '''Consumes all headers up to the blank line separating them from the
+        body.
 
         Returns
         -------
@@ -336,13 +385,9 @@ class Parser:
         '''
 
         header_list = []
-        while not self.match(rb'\r\n'):
-            try:
-                h = self.header()
-                self.newline()
-                header_list.append(h)
-            except ParseError:
-                break
+        while not self.end() and not self.match(_NEWLINE):
+            header_list.append(self.header())
+            self.newline()
 
         return header_list
 
@@ -356,9 +401,8 @@ class Parser:
         :obj:`str`
         '''
 
-        return self.consume(rb'SPAMC').group().decode()
+        return self.consume(_SPAMC).group().decode()
 
-    @checkpoint
     def method(self):
         '''Consumes the method name in a request.
 
@@ -367,20 +411,11 @@ class Parser:
         :obj:`str`
         '''
 
-        name = self.consume(rb'CHECK|'
-                            rb'HEADERS|'
-                            rb'PING|'
-                            rb'PROCESS|'
-                            rb'REPORT_IFSPAM|'
-                            rb'REPORT|'
-                            rb'SKIP|'
-                            rb'SYMBOLS|'
-                            rb'TELL')
+        name = self.consume(_METHOD)
         self.whitespace()
 
         return name.group().decode()
 
-    @checkpoint
     def request(self):
         '''Consumes a SPAMC request.
 
@@ -390,15 +425,12 @@ class Parser:
         '''
 
         m = self.method()
-        p = self.spamc_protocol()
-        self.consume(rb'/')
+        self.spamc_protocol()
+        self.consume(_SLASH)
         v = self.version()
         self.newline()
 
-        if not self.end():
-            h = self.headers()
-        else:
-            h = []
+        h = self.headers()
 
         if not self.end():
             self.newline()
@@ -406,6 +438,8 @@ class Parser:
         else:
             b = None
 
+        b = aiospamc.requests.Request._decode_body(b, h)
+
         return aiospamc.requests.Request(verb=m, version=v, headers=h, body=b)
 
     # Response functions
@@ -418,9 +452,8 @@ class Parser:
         :obj:`str`
         '''
 
-        return self.consume(rb'SPAMD').group().decode()
+        return self.consume(_SPAMD).group().decode()
 
-    @checkpoint
     def status_code(self):
         '''Consumes the status code.
 
@@ -429,7 +462,7 @@ class Parser:
         :class:`aiospamc.responses.StatusCode` or int
         '''
 
-        code = int(self.consume(rb'\d+').group())
+        code = int(self.consume(_INTEGER).group())
         try:
             return aiospamc.responses.Status(code)
         except ValueError:
@@ -443,19 +476,23 @@ class Parser:
         :obj:`str`
         '''
 
-        return self.consume(rb'.*(?=\r\n)').group().decode()
+        return self.consume(_MESSAGE).group().decode()
 
-    @checkpoint
-    def response(self):
-        '''Consumes a SPAMD response.
+    def status_line(self):
+        '''Consumes the status line of a SPAMD response.
 
         Returns
         -------
-        :class:`aiospamc.responses.Response`
+        :obj:`str`
+            Protocol version.
+        :class:`aiospamc.responses.Status` or :obj:`int`
+            Status code.
+        :obj:`str`
+            Message accompanying the status code.
         '''
 
-        p = self.spamd_protocol()
-        self.consume(rb'/')
+        self.spamd_protocol()
+        self.consume(_SLASH)
         v = self.version()
         self.whitespace()
         c = self.status_code()
@@ -463,38 +500,413 @@ class Parser:
         m = self.message()
         self.newline()
 
-        if not self.end():
-            h = self.headers()
-        else:
-            h = []
+        return v, c, m
+
+    def response(self):
+        '''Consumes a SPAMD response.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+        '''
+
+        v, c, m = self.status_line()
+
+        h = self.headers()
 
         if not self.end():
             self.newline()
             b = self.body()
         else:
             b = None
+        b = aiospamc.responses.Response._decode_body(b, h)
 
         return aiospamc.responses.Response(version=v, status_code=c, message=m, headers=h,
                                            body=b)
 
-def parse(string):
-    '''Parses a request or response.
+
+class ParserState(enum.IntEnum):
+    '''States of the :class:`aiospamc.parser.ResponseParser`.'''
+
+    status_line = 1
+    headers = 2
+    body = 3
+    done = 4
+
+
+class ResponseParser:
+    '''Incremental parser for SPAMD responses.
+
+    Data is given to the parser with :meth:`feed` in chunks as it arrives from
+    the connection.  The status line and headers are parsed as soon as they are
+    complete.  Once the headers are complete a buffer the size of the
+    Content-length header is allocated and the body is copied into it as it
+    arrives, failing if the body ends up shorter or longer than declared.  A
+    Content-length over :attr:`max_body_size` fails before anything is
+    allocated.  The parser doesn't do any I/O of its own.
+
+    Attributes
+    ----------
+    state : :class:`aiospamc.parser.ParserState`
+        What part of the response the parser is expecting next.
+    version : :obj:`str`
+        Protocol version of the response, or `None` if the status line hasn't
+        been parsed.
+    status_code : :class:`aiospamc.responses.Status` or :obj:`int`
+        Status code of the response, or `None` if the status line hasn't been
+        parsed.
+    message : :obj:`str`
+        Message accompanying the status code, or `None` if the status line
+        hasn't been parsed.
+    headers : :obj:`list` of :class:`aiospamc.headers.Header`
+        Headers parsed so far.
+    content_length : :obj:`int`
+        Value of the Content-length header, or `None` if there isn't one.
+    body_received : :obj:`int`
+        Number of bytes of the body received so far.
+    max_body_size : :obj:`int`
+        Largest Content-length accepted, in bytes.
+    '''
+
+    _protocol = b'SPAMD/'
+
+    def __init__(self, on_status_line=None, on_headers=None, on_body=None, max_body_size=2 ** 26):
+        '''ResponseParser constructor.
+
+        Parameters
+        ----------
+        on_status_line : callable, optional
+            Called with the parser once the status line has been parsed.
+        on_headers : callable, optional
+            Called with the parser once all the headers have been parsed.
+        on_body : callable, optional
+            Called with the parser and the bytes-like chunk of the body each
+            time part of the body is received.
+        max_body_size : :obj:`int`, optional
+            Largest Content-length accepted, in bytes.  Defaults to 64 MiB.
+        '''
+
+        self.state = ParserState.status_line
+        self.version = None
+        self.status_code = None
+        self.message = None
+        self.headers = []
+        self.content_length = None
+        self.body_received = 0
+        self.max_body_size = max_body_size
+
+        self.on_status_line = on_status_line
+        self.on_headers = on_headers
+        self.on_body = on_body
+
+        self._buffer = bytearray()
+        self._index = 0
+        self._body = bytearray()
+
+    def __repr__(self):
+        return '{}(state={}, body_received={}, content_length={})'.format(
+                self.__class__.__name__,
+                str(self.state),
+                self.body_received,
+                self.content_length
+        )
+
+    @property
+    def complete(self):
+        '''Whether the whole response has been parsed.
+
+        Returns
+        -------
+        :obj:`bool`
+        '''
+
+        return self.state is ParserState.done
+
+    @property
+    def bytes_needed(self):
+        '''Number of bytes left in the body, or `None` if the parser hasn't
+        reached the body yet.
+
+        Returns
+        -------
+        :obj:`int`
+        '''
+
+        if self.state is ParserState.body:
+            return self.content_length - self.body_received
+        elif self.state is ParserState.done:
+            return 0
+        else:
+            return None
+
+    @property
+    def body(self):
+        '''The body as received, still compressed if the response has a
+        Compress header.
+
+        Returns
+        -------
+        :obj:`bytearray`
+        '''
+
+        return self._body
+
+    @property
+    def compressed(self):
+        '''Whether the response has a Compress header.
+
+        Returns
+        -------
+        :obj:`bool`
+        '''
+
+        return any(header.field_name() == 'Compress' for header in self.headers)
+
+    def get_header(self, header_name):
+        '''Gets the parsed header matching the name.
+
+        Parameters
+        ----------
+        header_name : :obj:`str`
+            String name of the header.
+
+        Returns
+        -------
+        :class:`aiospamc.headers.Header`
+
+        Raises
+        ------
+        :class:`KeyError`
+        '''
+
+        for header in self.headers:
+            if header.field_name() == header_name:
+                return header
+        raise KeyError(header_name)
+
+    def feed(self, data):
+        '''Parses a chunk of the response.
+
+        Parameters
+        ----------
+        data : :obj:`bytes`
+            The next chunk of data received.
+
+        Raises
+        ------
+        :class:`aiospamc.parser.ParseError`
+            Raised if the data isn't a valid response.
+        '''
+
+        if self.state is ParserState.done:
+            if data:
+                raise ParseError(index=self.body_received,
+                                 message='Received data after the end of the response')
+            return
+
+        if self.state is ParserState.body:
+            self._receive_body(data)
+            return
+
+        self._buffer += data
+        if self.state is ParserState.status_line:
+            self._parse_status_line()
+        if self.state is ParserState.headers:
+            self._parse_headers()
+
+    def feed_eof(self):
+        '''Signals the parser that there's no more data to be received.
+
+        Raises
+        ------
+        :class:`aiospamc.parser.ParseError`
+            Raised if the response was incomplete.
+        '''
+
+        if self.state is ParserState.status_line:
+            raise ParseError(index=self._index, message='Incomplete status line')
+        elif self.state is ParserState.headers:
+            if self._index < len(self._buffer):
+                raise ParseError(index=self._index, message='Incomplete header')
+            self._finish_headers()
+            if self.content_length:
+                raise ParseError(index=0, message='Missing body')
+        elif self.state is ParserState.body:
+            raise ParseError(index=self.body_received,
+                             message='Body is shorter than the Content-length')
+        self.state = ParserState.done
+
+    def result(self, body=None):
+        '''Composes the response from the parsed data.
+
+        Parameters
+        ----------
+        body : bytes-like object, optional
+            The decoded body to use instead of decoding the received one, for
+            callers that decompress the body themselves.
+
+        Returns
+        -------
+        :class:`aiospamc.responses.Response`
+
+        Raises
+        ------
+        :class:`aiospamc.parser.ParseError`
+            Raised if the response hasn't been completely parsed.
+        '''
+
+        if self.state is not ParserState.done:
+            raise ParseError(index=self._index, message='Response is incomplete')
+
+        if body is None:
+            body = aiospamc.responses.Response._decode_body(self._body, self.headers)
+        response = aiospamc.responses.Response(
+                version=self.version,
+                status_code=self.status_code,
+                message=self.message,
+                headers=self.headers
+        )
+        response._set_received_body(self._body, body)
+
+        return response
+
+    def _next_line(self):
+        '''Returns the next complete line in the buffer including the newline,
+        or `None` if there isn't one yet.'''
+
+        end = self._buffer.find(b'\r\n', self._index)
+        if end == -1:
+            return None
+        line = bytes(self._buffer[self._index:end + 2])
+        self._index = end + 2
+
+        return line
+
+    def _parse_status_line(self):
+        start = self._buffer[:len(self._protocol)]
+        if not self._protocol.startswith(start):
+            raise ParseError(index=0, message='Not a SPAMD response')
+
+        line = self._next_line()
+        if line is None:
+            return
+
+        self.version, self.status_code, self.message = Parser(line).status_line()
+        self.state = ParserState.headers
+        if self.on_status_line:
+            self.on_status_line(self)
+
+    def _parse_headers(self):
+        while True:
+            line = self._next_line()
+            if line is None:
+                return
+            if line == b'\r\n':
+                break
+
+            parser = Parser(line)
+            header = parser.header()
+            parser.newline()
+            self.headers.append(header)
+
+        remainder = memoryview(self._buffer)[self._index:]
+        self._finish_headers()
+        if self.content_length:
+            self.state = ParserState.body
+            self._body = bytearray(self.content_length)
+            self._body_view = memoryview(self._body)
+            self._receive_body(remainder)
+        elif remainder:
+            raise ParseError(index=self._index, message='Received body without a Content-length')
+        else:
+            self.state = ParserState.done
+
+    def _finish_headers(self):
+        self._buffer = bytearray()
+        self._index = 0
+        try:
+            self.content_length = self.get_header('Content-length').length
+        except KeyError:
+            self.content_length = None
+        if self.content_length is not None and self.content_length > self.max_body_size:
+            raise ParseError(index=0,
+                             message='Content-length {} is over the limit of {} bytes'.format(self.content_length,
+                                                                                          self.max_body_size))
+        if self.on_headers:
+            self.on_headers(self)
+
+    def _receive_body(self, data):
+        if not data:
+            return
+        remaining = self.content_length - self.body_received
+        if len(data) > remaining:
+            raise ParseError(index=self.body_received,
+                             message='Body is longer than the Content-length')
+
+        end = self.body_received + len(data)
+        self._body_view[self.body_received:end] = data
+        self.body_received = end
+        if self.on_body:
+            self.on_body(self, data)
+        if self.body_received == self.content_length:
+            self._body_view.release()
+            self.state = ParserState.done
+
+
+def parse_request(string):
+    '''Parses a SPAMC request.
+
+    Parameters
+    ----------
+    string : :obj:`bytes`
+        The request to parse.
 
     Returns
     -------
-    :class:`aiospamc.requests.Request` or :class:`aiospamc.responses.Response`
+    :class:`aiospamc.requests.Request`
+
+    Raises
+    ------
+    :class:`aiospamc.parser.ParseError`
+    '''
+
+    return Parser(string).request()
+
+
+def parse_response(string):
+    '''Parses a SPAMD response.
+
+    Parameters
+    ----------
+    string : :obj:`bytes`
+        The response to parse.
+
+    Returns
+    -------
+    :class:`aiospamc.responses.Response`
+
+    Raises
+    ------
+    :class:`aiospamc.parser.ParseError`
     '''
 
-    parser = Parser(string)
+    return Parser(string).response()
+
 
-    try:
-        return parser.request()
-    except ParseError:
-        pass
+def parse(string):
+    '''Parses a request or response.  Responses are told apart from requests
+    by the "SPAMD" protocol name they start with.
 
-    try:
-        return parser.response()
-    except ParseError:
-        pass
+    Returns
+    -------
+    :class:`aiospamc.requests.Request` or :class:`aiospamc.responses.Response`
+
+    Raises
+    ------
+    :class:`aiospamc.parser.ParseError`
+    '''
 
-    raise ParseError(0, 'Unable to parse request or response')
+    if string.startswith(b'SPAMD'):
+        return parse_response(string)
+    else:
+        return parse_request(string)
@@ -2,7 +2,36 @@
 
 '''Contains all requests that can be made to the SPAMD service.'''
 
-from aiospamc.common import RequestResponseBase
+from functools import lru_cache
+
+from aiospamc.common import FileBody, RequestResponseBase
+
+
+@lru_cache(maxsize=32)
+def _status_line(verb, version):
+    '''Returns the encoded status line of a request.  There are only a handful
+    of verbs so the result is cached.
+
+    Parameters
+    ----------
+    verb : :obj:`str`
+        Method name of the request.
+    version : :obj:`str`
+        Protocol version.
+
+    Returns
+    -------
+    :obj:`bytes`
+    '''
+
+    return b'%b SPAMC/%b\r\n' % (verb.encode(), version.encode())
+
+
+def _join(buffers):
+    '''Joins buffers into a bytes object, reading file bodies into memory.'''
+
+    return b''.join(bytes(buffer) if isinstance(buffer, FileBody) else buffer
+                    for buffer in buffers)
 
 
 class Request(RequestResponseBase):
@@ -14,8 +43,8 @@ class Request(RequestResponseBase):
         Method name of the request.
     version : :obj:`str`
         Protocol version.
-    body : :obj:`str` or :obj:`bytes`
-        String representation of the body.  An instance of the
+    body : bytes-like object
+        Contents of the body.  An instance of the
         :class:`aiospamc.headers.ContentLength` will be automatically added.
     '''
 
@@ -28,9 +57,10 @@ class Request(RequestResponseBase):
             Method name of the request.
         version: :obj:`str`
             Version of the protocol.
-        body : :obj:`str` or :obj:`bytes`, optional
-            String representation of the body.  An instance of the
-            :class:`aiospamc.headers.ContentLength` will be automatically added.
+        body : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview` or :obj:`str`, optional
+            Contents of the body.  Strings are encoded as UTF-8.  An instance of
+            the :class:`aiospamc.headers.ContentLength` will be automatically
+            added.
         headers : tuple of :class:`aiospamc.headers.Header`, optional
             Collection of headers to be added.  If it contains an instance of
             :class:`aiospamc.headers.Compress` then the body is automatically
@@ -42,20 +72,174 @@ class Request(RequestResponseBase):
         super().__init__(body, headers)
 
     def __bytes__(self):
+        return _join(self.buffers())
+
+    def buffers(self):
+        '''Serializes the request as a list of buffers so it can be written
+        without joining the body into a new bytes object.
+
+        Returns
+        -------
+        :obj:`list`
+            The status line and header block as :obj:`bytes` followed by the
+            body, if there is one, as a :class:`memoryview`.  An uncompressed
+            :class:`aiospamc.common.FileBody` is added as-is so the connection
+            can send it from the file.
+        '''
+
+        buffers = [_status_line(self.verb, self.version),
+                   b''.join(map(bytes, self._headers.values())) + b'\r\n']
+        body = self._body_buffer()
+        if body is not None:
+            buffers.append(body)
+
+        return buffers
+
+    def prepare(self):
+        '''Serializes the request into a :class:`PreparedRequest` that can be
+        sent any number of times.
+
+        The body isn't copied, so it shouldn't be modified while the prepared
+        request is in use.
+
+        Returns
+        -------
+        :class:`aiospamc.requests.PreparedRequest`
+        '''
+
+        return PreparedRequest(self.verb,
+                               self.version,
+                               [(name, bytes(header)) for name, header in self._headers.items()],
+                               self._body_buffer())
+
+    def _body_buffer(self):
         if self._compressed_body:
-            body = self._compressed_body
+            return memoryview(self._compressed_body)
+        elif isinstance(self.body, FileBody):
+            return self.body
         elif self.body:
-            body = self.body.encode()
+            return memoryview(self.body)
         else:
-            body = b''
-
-        request = (b'%(verb)b '
-                   b'SPAMC/%(version)b'
-                   b'\r\n'
-                   b'%(headers)b\r\n'
-                   b'%(body)b')
-
-        return request % {b'verb': self.verb.encode(),
-                          b'version': self.version.encode(),
-                          b'headers': b''.join(map(bytes, self._headers.values())),
-                          b'body': body}
+            return None
+
+
+class PreparedRequest:
+    '''A request that has been serialized into its wire buffers once, so it
+    can be sent any number of times over any connection without encoding or
+    compressing it again.
+
+    Prepared requests can't be modified.  :meth:`with_headers` creates a new
+    prepared request with different headers that shares the body.
+
+    Attributes
+    ----------
+    verb : :obj:`str`
+        Method name of the request.
+    version : :obj:`str`
+        Protocol version.
+    '''
+
+    __slots__ = ('_verb', '_version', '_headers', '_header_block', '_body')
+
+    def __init__(self, verb, version, headers, body=None):
+        '''PreparedRequest constructor.  Use :meth:`Request.prepare` to
+        create one from a request.
+
+        Parameters
+        ----------
+        verb : :obj:`str`
+            Method name of the request.
+        version : :obj:`str`
+            Version of the protocol.
+        headers : iterable of (:obj:`str`, :obj:`bytes`) pairs
+            Names of the headers and their encoded form.
+        body : bytes-like object or :class:`aiospamc.common.FileBody`, optional
+            The body as it's sent, already compressed if the headers include
+            Compress.
+        '''
+
+        self._verb = verb
+        self._version = version
+        self._headers = tuple(headers)
+        self._header_block = b''.join(encoded for _, encoded in self._headers) + b'\r\n'
+        self._body = body
+
+    def __repr__(self):
+        return '{}(verb={}, version={}, headers={})'.format(
+                self.__class__.__name__,
+                repr(self._verb),
+                repr(self._version),
+                repr(tuple(name for name, _ in self._headers))
+        )
+
+    def __bytes__(self):
+        return _join(self.buffers())
+
+    @property
+    def verb(self):
+        return self._verb
+
+    @property
+    def version(self):
+        return self._version
+
+    def buffers(self):
+        '''Returns the wire buffers of the request.
+
+        Returns
+        -------
+        :obj:`list`
+            The status line and header block as :obj:`bytes` followed by the
+            body, if there is one.
+        '''
+
+        buffers = [_status_line(self._verb, self._version), self._header_block]
+        if self._body is not None:
+            buffers.append(self._body)
+
+        return buffers
+
+    def with_headers(self, *headers):
+        '''Creates a prepared request with headers added.  Headers with the
+        same name are replaced.  The body is shared, not copied.
+
+        Parameters
+        ----------
+        headers : :class:`aiospamc.headers.Header`
+            Headers to add.
+
+        Returns
+        -------
+        :class:`aiospamc.requests.PreparedRequest`
+        '''
+
+        added = [(header.field_name(), bytes(header)) for header in headers]
+        names = {name for name, _ in added}
+        kept = [(name, encoded) for name, encoded in self._headers if name not in names]
+
+        return PreparedRequest(self._verb, self._version, kept + added, self._body)
+
+    def encoded_header(self, header_name):
+        '''Gets the serialized form of a header.
+
+        Parameters
+        ----------
+        header_name : :obj:`str`
+            String name of the header.
+
+        Returns
+        -------
+        :obj:`bytes`
+            The header line.
+
+        Raises
+        ------
+        KeyError
+            Raised if the request has no header with that name.
+        '''
+
+        for name, encoded in self._headers:
+            if name == header_name:
+                return encoded
+
+        raise KeyError(header_name)
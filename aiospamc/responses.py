@@ -59,8 +59,9 @@ class Response(RequestResponseBase):
         Status code give by the response.
     message : :obj:`str`
         Message accompanying the status code.
-    body : :obj:`str` or :obj:`bytes`
-        Contents of the response body.
+    body : bytes-like object
+        Contents of the response body, which is :obj:`bytes` for a received
+        response.  Use :meth:`text` to decode it to a string.
     '''
 
     def __init__(self, version, status_code, message, headers=None, body=None):
@@ -74,9 +75,10 @@ class Response(RequestResponseBase):
             Success or error code.
         message : :obj:`str`
             Message associated with status code.
-        body : :obj:`str` or :obj:`bytes`, optional
-            String representation of the body.  An instance of the
-            :class:`aiospamc.headers.ContentLength` will be automatically added.
+        body : :obj:`bytes`, :obj:`bytearray`, :obj:`memoryview` or :obj:`str`, optional
+            Contents of the body.  Strings are encoded as UTF-8.  An instance of
+            the :class:`aiospamc.headers.ContentLength` will be automatically
+            added.
         headers : tuple of :class:`aiospamc.headers.Header`, optional
             Collection of headers to be added.  If it contains an instance of
             :class:`aiospamc.headers.Compress` then the body is automatically
@@ -92,7 +94,7 @@ class Response(RequestResponseBase):
         if self._compressed_body:
             body = self._compressed_body
         elif self.body:
-            body = self.body.encode()
+            body = self.body
         else:
             body = b''
 
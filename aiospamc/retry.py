@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+'''Deciding when and how soon to retry a failed request.'''
+
+import random
+
+from aiospamc.exceptions import AIOSpamcConnectionFailed, TemporaryFailureException
+
+
+class RetryPolicy:
+    '''Retries requests that failed for a reason that's likely to pass, such
+    as SPAMD restarting.
+
+    The delay before each retry is picked at random between zero and an
+    exponentially growing backoff, so clients that failed together don't
+    retry together.  Retries are also limited by a budget: each request sent
+    adds :attr:`budget` of a retry to it and each retry takes a whole one, so
+    a SPAMD service that stays down sees a bounded share of extra traffic
+    rather than every request several times over.
+
+    TELL requests change what SPAMD has learnt, and can't be told apart from
+    a repeat if the first attempt got through, so they're only retried if
+    :attr:`retry_tell` is set.
+
+    Attributes
+    ----------
+    max_attempts : int
+        Most times a request is sent, including the first.
+    backoff : float
+        Longest delay in seconds before the first retry.
+    max_backoff : float
+        Longest delay in seconds before any retry.
+    multiplier : float
+        Growth of the longest delay after each retry.
+    budget : float
+        Retries earned by each request, as a fraction.
+    min_tokens : float
+        Retries available before any requests have been sent.
+    max_tokens : float
+        Most retries that can be saved up.
+    tokens : float
+        Retries currently available.
+    retry_on : tuple of type
+        Exceptions that are retried.
+    retry_tell : bool
+        Whether TELL requests are retried.
+    retries : int
+        Number of retries made.
+    exhausted : int
+        Number of retries refused because the budget ran out.
+    '''
+
+    def __init__(self,
+                 max_attempts=3,
+                 backoff=0.1,
+                 max_backoff=2.0,
+                 multiplier=2.0,
+                 budget=0.1,
+                 min_tokens=10.0,
+                 max_tokens=100.0,
+                 retry_on=(TemporaryFailureException, AIOSpamcConnectionFailed),
+                 retry_tell=False,
+                 random_=None):
+        '''RetryPolicy constructor.
+
+        Parameters
+        ----------
+        max_attempts : int, optional
+            Most times a request is sent, including the first.
+        backoff : float, optional
+            Longest delay in seconds before the first retry.
+        max_backoff : float, optional
+            Longest delay in seconds before any retry.
+        multiplier : float, optional
+            Growth of the longest delay after each retry.
+        budget : float, optional
+            Retries earned by each request, as a fraction.  Defaults to 10%.
+        min_tokens : float, optional
+            Retries available before any requests have been sent.
+        max_tokens : float, optional
+            Most retries that can be saved up.
+        retry_on : tuple of type, optional
+            Exceptions that are retried.  Defaults to temporary failure
+            responses and failures to connect.
+        retry_tell : bool, optional
+            Whether TELL requests are retried.
+        random_ : random.Random, optional
+            Source of randomness for the delays.
+
+        Raises
+        ------
+        ValueError
+            Raised if the maximum attempts is less than one.
+        '''
+
+        if max_attempts < 1:
+            raise ValueError('Maximum attempts must be at least one')
+
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.budget = budget
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self.retry_on = tuple(retry_on)
+        self.retry_tell = retry_tell
+        self.random = random_ or random.Random()
+        self.retries = 0
+        self.exhausted = 0
+
+    def __repr__(self):
+        return '{}(max_attempts={}, backoff={}, max_backoff={}, budget={})'.format(self.__class__.__name__,
+                                                                                  self.max_attempts,
+                                                                                  self.backoff,
+                                                                                  self.max_backoff,
+                                                                                  self.budget)
+
+    def record_request(self):
+        '''Adds a request's share of a retry to the budget.'''
+
+        self.tokens = min(self.tokens + self.budget, self.max_tokens)
+
+    def should_retry(self, request, error, attempt):
+        '''Decides whether to retry a failed request, taking a retry from the
+        budget if so.
+
+        Parameters
+        ----------
+        request : aiospamc.requests.Request or aiospamc.requests.PreparedRequest
+            The request that failed.
+        error : Exception
+            Why it failed.
+        attempt : int
+            Number of times the request has been sent.
+
+        Returns
+        -------
+        bool
+        '''
+
+        if attempt >= self.max_attempts:
+            return False
+        if not isinstance(error, self.retry_on):
+            return False
+        if request.verb == 'TELL' and not self.retry_tell:
+            return False
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+
+        self.tokens -= 1
+        self.retries += 1
+        return True
+
+    def delay(self, attempt):
+        '''Picks how long to wait before the next attempt.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of times the request has been sent.
+
+        Returns
+        -------
+        float
+            The delay in seconds.
+        '''
+
+        return self.random.uniform(0, min(self.backoff * self.multiplier ** (attempt - 1), self.max_backoff))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+'''Break-even benchmark for compressing request bodies.
+
+Measures the zlib compression throughput and ratio of a synthetic email for
+each compression level, then reports the link throughput below which
+compressing makes sending the body faster.  This is the same comparison
+:class:`aiospamc.compression.CompressionPolicy` makes for each request.  A
+table of the time to send a 1 MiB body over links of a few typical speeds,
+with and without compression, is printed for each level.
+
+Usage::
+
+    python benchmarks/compression_benchmark.py [path to a message]
+'''
+
+import sys
+import timeit
+
+from aiospamc.compression import Compressor
+
+
+LEVELS = (1, 6, 9)
+BODY_SIZE = 2 ** 20
+LINK_THROUGHPUTS = (
+    ('1 Mbit/s', 1e6 / 8),
+    ('10 Mbit/s', 10e6 / 8),
+    ('100 Mbit/s', 100e6 / 8),
+    ('1 Gbit/s', 1e9 / 8),
+    ('10 Gbit/s', 10e9 / 8),
+)
+REPEAT = 5
+NUMBER = 5
+
+
+def make_message(size):
+    '''Builds an email-like message of roughly the given size.
+
+    Parameters
+    ----------
+    size : :obj:`int`
+        Length of the message in bytes.
+
+    Returns
+    -------
+    :obj:`bytes`
+    '''
+
+    headers = (b'Received: from mail.example.net (mail.example.net [192.0.2.1])\r\n'
+               b'From: John Doe <jdoe@machine.example>\r\n'
+               b'To: Mary Smith <mary@example.net>\r\n'
+               b'Subject: Quarterly report\r\n'
+               b'Message-ID: <1234@local.machine.example>\r\n'
+               b'Content-Type: text/plain; charset=utf-8\r\n\r\n')
+    lines = [b'Line %d of the report, with figures %d, %d and %d.\r\n' % (index, index * 7, index * 13, index * 31)
+             for index in range(size // 40 + 1)]
+
+    return (headers + b''.join(lines))[:size]
+
+
+def measure(body, level):
+    '''Measures the compression throughput and ratio of a body.
+
+    Parameters
+    ----------
+    body : :obj:`bytes`
+        The body to compress.
+    level : :obj:`int`
+        The compression level.
+
+    Returns
+    -------
+    :obj:`float`
+        Bytes compressed per second.
+    :obj:`float`
+        Ratio of compressed to original size.
+    '''
+
+    compressor = Compressor(level=level)
+    seconds = min(timeit.repeat(lambda: compressor.compress(body), repeat=REPEAT, number=NUMBER)) / NUMBER
+
+    return len(body) / seconds, len(compressor.compress(body)) / len(body)
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as file:
+            body = file.read()
+    else:
+        body = make_message(BODY_SIZE)
+
+    for level in LEVELS:
+        throughput, ratio = measure(body, level)
+        break_even = throughput * (1 - ratio)
+        print('level {}: {:.1f} MB/s, ratio {:.3f}, compress below {:.1f} MB/s ({:.0f} Mbit/s)'.format(
+                level, throughput / 1e6, ratio, break_even / 1e6, break_even * 8 / 1e6))
+        print('    {:>12} {:>16} {:>16}'.format('link', 'plain (ms)', 'compressed (ms)'))
+        for name, link in LINK_THROUGHPUTS:
+            plain = len(body) / link
+            compressed = len(body) / throughput + len(body) * ratio / link
+            print('    {:>12} {:>16.2f} {:>16.2f}'.format(name, plain * 1e3, compressed * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+'''Benchmark for the response parser.
+
+Parses the status line and headers of responses with a varying number of
+headers and body sizes and reports the cost of each header.  The per-header
+cost should stay flat as the body grows since the parser never copies the
+unparsed remainder of the response.
+
+Usage::
+
+    python benchmarks/parser_benchmark.py
+'''
+
+import timeit
+
+from aiospamc.parser import Parser
+
+
+HEADER_COUNTS = (0, 50)
+BODY_SIZES = (0, 2 ** 10, 2 ** 20, 10 * 2 ** 20)
+REPEAT = 5
+NUMBER = 200
+
+
+def make_response(header_count, body_size):
+    '''Builds a response in bytes.
+
+    Parameters
+    ----------
+    header_count : :obj:`int`
+        Number of extension headers to add.
+    body_size : :obj:`int`
+        Length of the body in bytes.
+
+    Returns
+    -------
+    :obj:`bytes`
+    '''
+
+    headers = b''.join(b'X-Header-%d: value %d\r\n' % (index, index)
+                       for index in range(header_count))
+
+    return (b'SPAMD/1.5 0 EX_OK\r\n'
+            b'Spam: True ; 1000.0 / 1.0\r\n'
+            b'%b'
+            b'Content-length: %d\r\n'
+            b'\r\n'
+            b'%b') % (headers, body_size, b'x' * body_size)
+
+
+def parse_head(response):
+    '''Parses the status line and headers of the response.'''
+
+    parser = Parser(response)
+    parser.status_line()
+    parser.headers()
+
+
+def best_time(response):
+    '''Returns the best average time in seconds to parse the status line and
+    headers of the response.'''
+
+    timer = timeit.Timer(lambda: parse_head(response))
+
+    return min(timer.repeat(repeat=REPEAT, number=NUMBER)) / NUMBER
+
+
+def main():
+    print('{:>12} {:>16} {:>16}'.format('body bytes', 'headers (ms)', 'per header (us)'))
+    low, high = HEADER_COUNTS
+    for body_size in BODY_SIZES:
+        without_headers = best_time(make_response(low, body_size))
+        with_headers = best_time(make_response(high, body_size))
+        per_header = (with_headers - without_headers) / (high - low)
+        print('{:>12} {:>16.3f} {:>16.3f}'.format(body_size,
+                                                  with_headers * 1e3,
+                                                  per_header * 1e6))
+
+
+if __name__ == '__main__':
+    main()
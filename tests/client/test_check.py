@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 
+import os
+
 import pytest
 from asynctest import patch
 
 from aiospamc import Client
+from aiospamc.common import FileBody
 from aiospamc.exceptions import BadResponse, AIOSpamcConnectionFailed
 from aiospamc.responses import Response
 from aiospamc.requests import Request
@@ -44,3 +47,43 @@ async def test_check_invalid_response(spam, mock_connection, response_invalid):
     client = Client(host='localhost')
     with pytest.raises(BadResponse):
         response = await client.check(spam)
+
+
+@pytest.mark.asyncio
+@patch('aiospamc.client.Client.send')
+async def test_check_file_valid_request(mock_connection, spam, spam_file):
+    client = Client(host='localhost')
+    response = await client.check_file(spam_file)
+
+    request = client.send.call_args[0][0]
+
+    assert isinstance(request, Request)
+    assert request.verb == 'CHECK'
+    assert isinstance(request.body, FileBody)
+    assert request.get_header('Content-length').length == len(spam.encode())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('open_file', [
+    lambda path: open(path, 'rb'),
+    lambda path: os.open(path, os.O_RDONLY),
+])
+async def test_check_file_object(mock_connection, spam_file, open_file):
+    file = open_file(spam_file)
+    client = Client(host='localhost')
+    try:
+        response = await client.check_file(file)
+    finally:
+        if isinstance(file, int):
+            os.close(file)
+        else:
+            file.close()
+
+    assert isinstance(response, Response)
+
+
+@pytest.mark.asyncio
+async def test_check_file_missing(tmpdir):
+    client = Client(host='localhost')
+    with pytest.raises(OSError):
+        await client.check_file(str(tmpdir.join('missing.eml')))
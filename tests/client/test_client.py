@@ -1,21 +1,40 @@
 #!/usr/bin/env python3
 
+import asyncio
+import itertools
+import zlib
+
 import pytest
-from asynctest import CoroutineMock, Mock
+from asynctest import CoroutineMock, Mock, patch
 
 from aiospamc import Client
 from aiospamc.client import _add_user_header, _add_compress_header
+from aiospamc.compression import CompressionExecutor, CompressionPolicy, Compressor
+from aiospamc.connections import Timeouts
+from aiospamc.connections.pooled_connection import PooledConnectionManager
 from aiospamc.connections.tcp_connection import TcpConnectionManager
+from aiospamc.connections.tls import SessionCachingContext
 from aiospamc.connections.unix_connection import UnixConnectionManager
-from aiospamc.exceptions import (BadResponse, ResponseException,
+from aiospamc.exceptions import (AIOSpamcConnectionFailed, AIOSpamcConnectionTimeout, BadResponse, ClientClosed,
+                                 ResponseException,
                                  UsageException, DataErrorException, NoInputException, NoUserException,
                                  NoHostException, UnavailableException, InternalSoftwareException, OSErrorException,
                                  OSFileException, CantCreateException, IOErrorException, TemporaryFailureException,
                                  ProtocolException, NoPermissionException, ConfigException, TimeoutException)
 from aiospamc.headers import Compress, User
+from aiospamc.hedging import HedgePolicy
+from aiospamc.latency import AdaptiveTimeouts
+from aiospamc.parser import parse_request
+from aiospamc.requests import Request
+from aiospamc.retry import RetryPolicy
 from aiospamc.responses import Response, Status
 
 
+@pytest.fixture
+def ping_request(request_ping):
+    return parse_request(request_ping)
+
+
 def test_client_repr():
     client = Client(host='localhost')
     assert repr(client) == ('Client(socket_path=\'/var/run/spamassassin/spamd.sock\', '
@@ -38,33 +57,336 @@ def test_unix_manager():
     assert isinstance(client.connection, UnixConnectionManager)
 
 
+def test_connection_manager():
+    manager = PooledConnectionManager([TcpConnectionManager('localhost', 783)])
+    client = Client(connection_manager=manager)
+
+    assert client.connection is manager
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'host': 'localhost'},
+    {'socket_path': '/var/run/spamassassin/spamd.sock'},
+])
+def test_timeouts_given_to_manager(kwargs):
+    timeouts = Timeouts(connect=1, read=2)
+    client = Client(timeouts=timeouts, **kwargs)
+
+    assert client.timeouts is timeouts
+    assert client.connection.timeouts is timeouts
+
+
+@pytest.mark.asyncio
+async def test_send_total_timeout(mock_connection, ping_request):
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    mock_connection.side_effect = hang
+    client = Client(host='localhost', timeouts=Timeouts(total=0.01))
+
+    with pytest.raises(AIOSpamcConnectionTimeout):
+        await client.send(ping_request)
+
+
+@pytest.mark.parametrize('adaptive_timeouts,expected', [
+    (False, type(None)),
+    (True, AdaptiveTimeouts),
+])
+def test_adaptive_timeouts_default(adaptive_timeouts, expected):
+    client = Client(adaptive_timeouts=adaptive_timeouts)
+
+    assert isinstance(client.adaptive_timeouts, expected)
+
+
+@pytest.mark.asyncio
+async def test_send_records_latency(mock_connection, ping_request):
+    adaptive_timeouts = AdaptiveTimeouts()
+    client = Client(host='localhost', adaptive_timeouts=adaptive_timeouts)
+    await client.send(ping_request)
+
+    assert adaptive_timeouts.histograms[('PING', 0)].count == 1
+
+
+@pytest.mark.asyncio
+async def test_send_adaptive_timeout_recorded(mock_connection, ping_request):
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    adaptive_timeouts = Mock(AdaptiveTimeouts())
+    adaptive_timeouts.timeout.return_value = 0.01
+    mock_connection.side_effect = hang
+    client = Client(host='localhost', adaptive_timeouts=adaptive_timeouts)
+
+    with pytest.raises(AIOSpamcConnectionTimeout):
+        await client.send(ping_request)
+
+    (verb, _, seconds), _ = adaptive_timeouts.record.call_args
+    assert verb == 'PING'
+    assert seconds >= 0.01
+
+
+@pytest.mark.asyncio
+async def test_send_adaptive_timeout_whole_response(mock_connection, ping_request):
+    chunks = itertools.chain([b'SPAMD/1.5 0 EX_OK\r\nContent-length: 100\r\n\r\n'], itertools.repeat(b'a'))
+
+    async def trickle(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return next(chunks)
+
+    adaptive_timeouts = Mock(AdaptiveTimeouts())
+    adaptive_timeouts.timeout.return_value = 0.05
+    mock_connection.side_effect = trickle
+    client = Client(host='localhost', timeouts=Timeouts(read=1), adaptive_timeouts=adaptive_timeouts)
+
+    with pytest.raises(AIOSpamcConnectionTimeout):
+        await client.send(ping_request)
+
+
+@pytest.fixture
+def retry():
+    return RetryPolicy(backoff=0)
+
+
+def tempfail_response():
+    return Response(version='1.5', status_code=Status.EX_TEMPFAIL, message='')
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('error', [
+    tempfail_response(),
+    AIOSpamcConnectionFailed(),
+])
+async def test_send_retries(ping_request, retry, error):
+    client = Client(host='localhost', retry=retry)
+    ok = Response(version='1.5', status_code=Status.EX_OK, message='')
+
+    with patch.object(client, '_exchange', CoroutineMock(side_effect=[error, ok])) as exchange:
+        response = await client.send(ping_request)
+
+    assert response is ok
+    assert exchange.call_count == 2
+    assert retry.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_send_retries_give_up(ping_request, retry):
+    client = Client(host='localhost', retry=retry)
+
+    with patch.object(client, '_exchange', CoroutineMock(return_value=tempfail_response())) as exchange:
+        with pytest.raises(TemporaryFailureException):
+            await client.send(ping_request)
+
+    assert exchange.call_count == retry.max_attempts
+
+
+@pytest.mark.asyncio
+async def test_send_no_retry_by_default(ping_request):
+    client = Client(host='localhost')
+
+    with patch.object(client, '_exchange', CoroutineMock(side_effect=AIOSpamcConnectionFailed())) as exchange:
+        with pytest.raises(AIOSpamcConnectionFailed):
+            await client.send(ping_request)
+
+    assert client.retry is None
+    assert exchange.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_tell_not_retried(retry):
+    client = Client(host='localhost', retry=retry)
+
+    with patch.object(client, '_exchange', CoroutineMock(return_value=tempfail_response())) as exchange:
+        with pytest.raises(TemporaryFailureException):
+            await client.tell(b'Test', 'spam')
+
+    assert exchange.call_count == 1
+
+
+def stalled_exchange(delays, cancelled):
+    ok = Response(version='1.5', status_code=Status.EX_OK, message='')
+    calls = iter(delays)
+
+    async def exchange(request, on_headers, new_connection=None):
+        delay = next(calls)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return ok
+
+    return exchange
+
+
+@pytest.mark.asyncio
+async def test_hedge_first_response_wins():
+    hedge = HedgePolicy(default_delay=0.01)
+    client = Client(host='localhost', hedge=hedge)
+    cancelled = []
+
+    with patch.object(client, '_exchange', side_effect=stalled_exchange([10, 0], cancelled)) as exchange:
+        response = await client.send(Request('CHECK', body=b'Test'))
+
+    assert response.status_code is Status.EX_OK
+    assert exchange.call_count == 2
+    assert cancelled == [10]
+    assert hedge.hedged == hedge.wins == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_loser_finished_before_return():
+    hedge = HedgePolicy(default_delay=0.01)
+    client = Client(host='localhost', hedge=hedge)
+    ok = Response(version='1.5', status_code=Status.EX_OK, message='')
+    delays = iter([10, 0])
+    closed = []
+
+    async def exchange(request, on_headers, new_connection=None):
+        try:
+            await asyncio.sleep(next(delays))
+        except asyncio.CancelledError:
+            await asyncio.sleep(0)
+            closed.append(True)
+            raise
+        return ok
+
+    with patch.object(client, '_exchange', side_effect=exchange):
+        await client.send(Request('CHECK', body=b'Test'))
+
+        assert closed == [True]
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_sent_when_fast():
+    hedge = HedgePolicy(default_delay=1)
+    client = Client(host='localhost', hedge=hedge)
+
+    with patch.object(client, '_exchange', side_effect=stalled_exchange([0], [])) as exchange:
+        await client.send(Request('CHECK', body=b'Test'))
+
+    assert exchange.call_count == 1
+    assert hedge.hedged == 0
+    assert hedge.histograms['CHECK'].count == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_capped():
+    hedge = HedgePolicy(default_delay=0.01)
+    hedge.tokens = 0
+    client = Client(host='localhost', hedge=hedge)
+
+    with patch.object(client, '_exchange', side_effect=stalled_exchange([0.05], [])) as exchange:
+        await client.send(Request('CHECK', body=b'Test'))
+
+    assert exchange.call_count == 1
+    assert hedge.suppressed == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_only_read_verbs(ping_request):
+    hedge = HedgePolicy(default_delay=0.01)
+    client = Client(host='localhost', hedge=hedge)
+
+    with patch.object(client, '_exchange', side_effect=stalled_exchange([0.05], [])) as exchange:
+        await client.send(ping_request)
+
+    assert exchange.call_count == 1
+    assert hedge.requests == 0
+
+
+def test_ssl_given_to_manager():
+    client = Client(host='localhost', ssl=True)
+
+    assert isinstance(client.connection.ssl, SessionCachingContext)
+    assert repr(client).endswith('ssl=True)')
+
+
+@pytest.mark.asyncio
+async def test_pool_given_user_key(ping_request):
+    manager = Mock(PooledConnectionManager([TcpConnectionManager('localhost', 783)], health_check_interval=None))
+    manager.new_connection.side_effect = AIOSpamcConnectionFailed
+    client = Client(connection_manager=manager, user='alice')
+
+    with pytest.raises(AIOSpamcConnectionFailed):
+        await client.send(ping_request)
+
+    manager.new_connection.assert_called_once_with((), b'User: alice\r\n', len(b'PING SPAMC/1.5\r\nUser: alice\r\n\r\n'))
+
+
+@pytest.mark.parametrize('request_', [
+    Request('CHECK', body=b'Test'),
+    Request('CHECK', body=b'Test').prepare(),
+])
+def test_pool_no_user_key(request_):
+    manager = Mock(PooledConnectionManager([TcpConnectionManager('localhost', 783)], health_check_interval=None))
+    client = Client(connection_manager=manager)
+    client._new_connection(request_)
+
+    manager.new_connection.assert_called_once_with((), None, len(bytes(request_)))
+
+
+def test_manager_not_routed():
+    manager = Mock(TcpConnectionManager('localhost', 783))
+    manager.routed = TcpConnectionManager.routed
+    client = Client(connection_manager=manager)
+    client._new_connection(Request('CHECK'))
+
+    manager.new_connection.assert_called_once_with()
+
+
 def test_value_error():
     with pytest.raises(ValueError):
         client = Client(host=None, socket_path=None)
 
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize('compress,body,called,expected', [
-    (None, None, False, None),
-    (True, None, False, None),
-    (True, 'Body', True, Compress),
+@pytest.mark.parametrize('compress,body,expected', [
+    (None, None, False),
+    (True, None, False),
+    (None, 'Body', False),
+    (True, 'Body', True),
 ])
 async def test_compress_decorator(compress,
                                   body,
-                                  called,
                                   expected):
     cls = Mock()
-    request = Mock()
+    request = Request('CHECK', body=body)
     cls.compress = compress
-    cls.body = body
+    cls.compressor = Compressor()
+    cls.compression_executor = None
     cls.func = CoroutineMock()
     cls.func = _add_compress_header(cls.func)
 
     await cls.func(cls, request)
 
-    assert request.add_header.called is called
-    if request.add_header.call_args:
-        assert isinstance(request.add_header.call_args[0][0], expected)
+    assert ('Compress' in request._headers) is expected
+
+
+def test_client_compressor_settings():
+    compressor = Compressor(level=9, wbits=12)
+    client = Client(host='localhost', compress=compressor)
+
+    assert client.compressor is compressor
+
+
+@pytest.mark.asyncio
+async def test_compress_decorator_compresses_once(monkeypatch):
+    compressor = Compressor()
+    compress_chunks = Mock(wraps=compressor.compress_chunks)
+    monkeypatch.setattr(compressor, 'compress_chunks', CoroutineMock(side_effect=compress_chunks))
+    cls = Mock()
+    cls.compress = True
+    cls.compressor = compressor
+    cls.compression_executor = None
+    cls.func = _add_compress_header(CoroutineMock())
+    request = Request('CHECK', body='Body')
+
+    await cls.func(cls, request)
+    await cls.func(cls, request)
+    request.add_header(Compress())
+
+    assert compressor.compress_chunks.call_count == 1
+    assert zlib.decompress(request.buffers()[-1]) == b'Body'
 
 
 @pytest.mark.asyncio
@@ -77,6 +399,7 @@ async def test_user_decorator(user,
                               expected):
     cls = Mock()
     request = Mock()
+    request.get_header.side_effect = KeyError('User')
     cls.user = user
     cls.func = CoroutineMock()
     cls.func = _add_user_header(cls.func)
@@ -89,15 +412,285 @@ async def test_user_decorator(user,
 
 
 @pytest.mark.asyncio
-async def test_send(mock_connection, request_ping, response_pong):
+@pytest.mark.parametrize('prepare', [False, True])
+async def test_user_decorator_keeps_request_user(prepare):
+    cls = Mock()
+    cls.user = 'client'
+    cls.func = _add_user_header(CoroutineMock())
+    request = Request('CHECK', headers=[User('alice')], body=b'Test')
+    if prepare:
+        request = request.prepare()
+
+    await cls.func(cls, request)
+
+    sent = cls.func.__wrapped__.call_args[0][1]
+    assert b'User: alice\r\n' in bytes(sent)
+    assert b'User: client' not in bytes(sent)
+
+
+@pytest.mark.asyncio
+async def test_send(mock_connection, ping_request, response_pong):
     mock_connection.side_effect = [response_pong, ]
     client = Client(host='localhost')
 
-    response = await client.send(request_ping)
+    response = await client.send(ping_request)
 
     assert isinstance(response, Response)
 
 
+def hung_send(client):
+    release = asyncio.Event(loop=client.loop)
+
+    async def exchange(request, on_headers, new_connection=None):
+        await release.wait()
+        return Response(version='1.5', status_code=Status.EX_OK, message='PONG')
+
+    client._exchange = exchange
+
+    return release
+
+
+@pytest.mark.asyncio
+async def test_send_counts_in_flight(event_loop, ping_request):
+    client = Client(host='localhost', loop=event_loop)
+    release = hung_send(client)
+
+    task = asyncio.ensure_future(client.send(ping_request), loop=event_loop)
+    await asyncio.sleep(0)
+
+    assert client.in_flight == 1
+
+    release.set()
+    await task
+
+    assert client.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_send_counts_cancelled(event_loop, ping_request):
+    client = Client(host='localhost', loop=event_loop)
+    hung_send(client)
+    task = asyncio.ensure_future(client.send(ping_request), loop=event_loop)
+    await asyncio.sleep(0)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert client.cancelled == 1
+    assert client.errors == 0
+    assert client.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_send_counts_errors(event_loop, ping_request):
+    client = Client(host='localhost', loop=event_loop)
+    client._exchange = CoroutineMock(side_effect=AIOSpamcConnectionFailed)
+
+    with pytest.raises(AIOSpamcConnectionFailed):
+        await client.send(ping_request)
+
+    assert client.errors == 1
+    assert client.cancelled == 0
+
+
+@pytest.mark.asyncio
+async def test_drain_refuses_new_requests(event_loop, ping_request):
+    client = Client(host='localhost', loop=event_loop)
+
+    assert await client.drain() is True
+    assert client.closing
+    assert not client.closed
+    with pytest.raises(ClientClosed):
+        await client.send(ping_request)
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_in_flight(event_loop, ping_request):
+    client = Client(host='localhost', loop=event_loop)
+    release = hung_send(client)
+    task = asyncio.ensure_future(client.send(ping_request), loop=event_loop)
+    await asyncio.sleep(0)
+
+    draining = asyncio.ensure_future(client.drain(), loop=event_loop)
+    await asyncio.sleep(0)
+
+    assert not draining.done()
+    with pytest.raises(ClientClosed):
+        await client.send(ping_request)
+
+    release.set()
+
+    assert await draining is True
+    assert isinstance(await task, Response)
+
+
+@pytest.mark.asyncio
+async def test_drain_timeout(event_loop, ping_request):
+    client = Client(host='localhost', loop=event_loop)
+    release = hung_send(client)
+    task = asyncio.ensure_future(client.send(ping_request), loop=event_loop)
+    await asyncio.sleep(0)
+
+    assert await client.drain(0.01) is False
+    assert not task.done()
+
+    release.set()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_aclose(event_loop, ping_request):
+    manager = Mock(spec=TcpConnectionManager('localhost', 783))
+    client = Client(connection_manager=manager, loop=event_loop)
+
+    with patch.object(client.compression_executor, 'shutdown') as shutdown:
+        assert await client.aclose() is True
+        assert await client.aclose() is True
+
+    assert client.closed
+    manager.close.assert_called_once_with()
+    shutdown.assert_called_once_with(wait=False)
+    with pytest.raises(ClientClosed):
+        await client.send(ping_request)
+
+
+@pytest.mark.asyncio
+async def test_aclose_keeps_given_executor(event_loop):
+    executor = CompressionExecutor(loop=event_loop)
+    client = Client(host='localhost', loop=event_loop, compression_executor=executor)
+
+    with patch.object(executor, 'shutdown') as shutdown:
+        await client.aclose()
+
+    shutdown.assert_not_called()
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_async_with(event_loop, ping_request):
+    manager = Mock(spec=TcpConnectionManager('localhost', 783))
+
+    async with Client(connection_manager=manager, loop=event_loop) as client:
+        release = hung_send(client)
+        task = asyncio.ensure_future(client.send(ping_request), loop=event_loop)
+        await asyncio.sleep(0)
+        event_loop.call_later(0.01, release.set)
+
+    assert task.done()
+    assert client.closed
+    manager.close.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_send_on_headers(mock_connection, ping_request, response_with_body):
+    mock_connection.side_effect = [response_with_body]
+    on_headers = Mock()
+    client = Client(host='localhost')
+
+    await client.send(ping_request, on_headers=on_headers)
+
+    assert on_headers.called
+    assert on_headers.call_args[0][0].content_length == 10
+
+
+@pytest.mark.asyncio
+async def test_send_compressed_response_offloaded(mock_connection, ping_request):
+    body = b'Test body\n' * 1000
+    compressed = zlib.compress(body)
+    mock_connection.side_effect = [b'SPAMD/1.5 0 EX_OK\r\n'
+                                   b'Compress: zlib\r\n'
+                                   b'Content-length: %d\r\n\r\n%b' % (len(compressed), compressed)]
+    executor = CompressionExecutor(threshold=1, max_workers=1)
+    client = Client(host='localhost', compression_executor=executor)
+
+    response = await client.send(ping_request)
+
+    assert response.body == body
+    assert type(response.body) is bytes
+    assert executor.offloaded == 1
+
+
+@pytest.mark.asyncio
+async def test_send_bad_compressed_response(mock_connection, ping_request):
+    mock_connection.side_effect = [b'SPAMD/1.5 0 EX_OK\r\n'
+                                   b'Compress: zlib\r\n'
+                                   b'Content-length: 4\r\n\r\nbody']
+    client = Client(host='localhost')
+
+    with pytest.raises(BadResponse):
+        await client.send(ping_request)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('link_throughput,expected', [
+    (1, True),
+    (None, False),
+])
+async def test_compress_decorator_policy(link_throughput, expected):
+    policy = CompressionPolicy(min_size=0, link_throughput=link_throughput)
+    cls = Mock()
+    cls.compress = policy
+    cls.compressor = policy.compressor
+    cls.compression_executor = None
+    cls.connection = TcpConnectionManager('localhost', 783)
+    cls.func = _add_compress_header(CoroutineMock())
+    request = Request('CHECK', body='Test body\n' * 1000)
+
+    await cls.func(cls, request)
+
+    assert ('Compress' in request._headers) is expected
+
+
+@pytest.mark.asyncio
+async def test_send_records_transfer(mock_connection, response_ok, monkeypatch):
+    mock_connection.side_effect = [response_ok]
+    monkeypatch.setattr('aiospamc.client.time', Mock(monotonic=Mock(side_effect=[0.0, 0.1])))
+    monkeypatch.setattr('aiospamc.connections.time', Mock(monotonic=Mock(return_value=1.0)))
+    policy = CompressionPolicy(min_transfer_size=0)
+    client = Client(host='localhost', compress=policy)
+    policy.response_times[client.connection] = 0.5
+    request = Request('CHECK', body='Test body\n')
+    size = len(bytes(request))
+
+    await client.send(request)
+
+    assert client.compressor is policy.compressor
+    assert policy.link_throughputs[client.connection] == size / 0.5
+
+
+@pytest.mark.asyncio
+async def test_send_records_transfer_per_backend(mock_connection, response_ok):
+    mock_connection.side_effect = [response_ok]
+    policy = CompressionPolicy()
+    pool = PooledConnectionManager([TcpConnectionManager('localhost', 783)], health_check_interval=None)
+    client = Client(connection_manager=pool, compress=policy)
+
+    await client.send(Request('CHECK', body='Test body\n'))
+
+    assert list(policy.response_times) == pool.backends
+
+
+@pytest.mark.asyncio
+async def test_prepare_compresses_once(mock_connection):
+    client = Client(host='localhost', compress=True, user='tester')
+    request = Request('CHECK', body='Test body\n')
+    prepared = await client.prepare(request)
+    request.compress = CoroutineMock()
+
+    with patch('aiospamc.connections.Connection.send', CoroutineMock()) as send:
+        await client.send(prepared)
+        await client.send(prepared)
+
+    assert not request.compress.called
+    assert send.call_count == 2
+    buffers = send.call_args[0][0]
+    assert b'User: tester\r\n' in buffers[1]
+    assert b'Compress: zlib\r\n' in buffers[1]
+    assert zlib.decompress(buffers[-1]) == b'Test body\n'
+    assert b'User' not in bytes(prepared)
+
+
 def test_response_exception_ok():
     response = Response(version='1.5', status_code=Status.EX_OK, message='')
 
@@ -132,18 +725,36 @@ def test_response_exception(test_input, expected):
 
 
 @pytest.mark.asyncio
-async def test_bad_response_exception(mock_connection, request_ping):
+async def test_bad_response_exception(mock_connection, ping_request):
     mock_connection.side_effect = [b'invalid']
     c = Client(host='localhost')
 
     with pytest.raises(BadResponse):
-        await c.send(request_ping)
+        await c.send(ping_request)
+
+
+@pytest.mark.asyncio
+async def test_oversized_response_exception(mock_connection, ping_request):
+    mock_connection.side_effect = [b'SPAMD/1.5 0 EX_OK\r\nContent-length: 99999999999\r\n\r\n']
+    c = Client(host='localhost')
+
+    with pytest.raises(BadResponse):
+        await c.send(ping_request)
+
+
+@pytest.mark.asyncio
+async def test_truncated_response_exception(mock_connection, ping_request, response_with_body):
+    mock_connection.side_effect = [response_with_body[:-1], b'']
+    c = Client(host='localhost')
+
+    with pytest.raises(BadResponse):
+        await c.send(ping_request)
 
 
 @pytest.mark.asyncio
-async def test_response_general_exception(mock_connection, request_ping):
-    mock_connection.side_effect = [b'SPAMD/1.5 999 PONG\r\n']
+async def test_response_general_exception(mock_connection, ping_request):
+    mock_connection.side_effect = [b'SPAMD/1.5 999 PONG\r\n', b'']
     c = Client(host='localhost')
 
     with pytest.raises(ResponseException):
-        await c.send(request_ping)
+        await c.send(ping_request)
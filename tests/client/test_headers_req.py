@@ -4,6 +4,7 @@ import pytest
 from asynctest import patch
 
 from aiospamc import Client
+from aiospamc.common import FileBody
 from aiospamc.exceptions import BadResponse, AIOSpamcConnectionFailed
 from aiospamc.responses import Response
 from aiospamc.requests import Request
@@ -45,3 +46,17 @@ async def test_headers_req_invalid_response(mock_connection, response_invalid, s
     client = Client(host='localhost')
     with pytest.raises(BadResponse):
         response = await client.headers(spam)
+
+
+@pytest.mark.asyncio
+@patch('aiospamc.client.Client.send')
+async def test_headers_file_valid_request(mock_connection, spam, spam_file):
+    client = Client(host='localhost')
+    response = await client.headers_file(spam_file)
+
+    request = client.send.call_args[0][0]
+
+    assert isinstance(request, Request)
+    assert request.verb == 'HEADERS'
+    assert isinstance(request.body, FileBody)
+    assert request.get_header('Content-length').length == len(spam.encode())
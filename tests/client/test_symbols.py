@@ -4,6 +4,7 @@ import pytest
 from asynctest import patch
 
 from aiospamc import Client
+from aiospamc.common import FileBody
 from aiospamc.exceptions import BadResponse, AIOSpamcConnectionFailed
 from aiospamc.responses import Response
 from aiospamc.requests import Request
@@ -45,3 +46,17 @@ async def test_symbols_invalid_response(mock_connection, response_invalid, spam)
     client = Client(host='localhost')
     with pytest.raises(BadResponse):
         response = await client.symbols(spam)
+
+
+@pytest.mark.asyncio
+@patch('aiospamc.client.Client.send')
+async def test_symbols_file_valid_request(mock_connection, spam, spam_file):
+    client = Client(host='localhost')
+    response = await client.symbols_file(spam_file)
+
+    request = client.send.call_args[0][0]
+
+    assert isinstance(request, Request)
+    assert request.verb == 'SYMBOLS'
+    assert isinstance(request.body, FileBody)
+    assert request.get_header('Content-length').length == len(spam.encode())
@@ -4,6 +4,7 @@ import pytest
 from asynctest import patch
 
 from aiospamc import Client
+from aiospamc.common import FileBody
 from aiospamc.exceptions import BadResponse, AIOSpamcConnectionFailed
 from aiospamc.options import ActionOption, MessageClassOption
 from aiospamc.responses import Response
@@ -76,3 +77,17 @@ async def test_tell_invalid_response(mock_connection, response_invalid, spam):
         response = await client.tell(MessageClassOption.spam,
                                      spam,
                                      ActionOption(local=True, remote=True))
+
+
+@pytest.mark.asyncio
+@patch('aiospamc.client.Client.send')
+async def test_tell_file_valid_request(mock_connection, spam, spam_file):
+    client = Client(host='localhost')
+    response = await client.tell_file(MessageClassOption.spam, spam_file)
+
+    request = client.send.call_args[0][0]
+
+    assert isinstance(request, Request)
+    assert request.verb == 'TELL'
+    assert isinstance(request.body, FileBody)
+    assert request.get_header('Content-length').length == len(spam.encode())
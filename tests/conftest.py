@@ -43,6 +43,15 @@ def spam():
             'You should send this test mail from an account outside of your network.\n\n')
 
 
+@pytest.fixture
+def spam_file(tmpdir, spam):
+    '''Path to a file containing the GTUBE message.'''
+
+    path = tmpdir.join('spam.eml')
+    path.write_binary(spam.encode())
+    return str(path)
+
+
 @pytest.fixture
 def request_ping():
     '''PING request in bytes.'''
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import asyncio
+import socket
+
+import pytest
+from asynctest import CoroutineMock, patch
+
+from aiospamc.connections.address_pool import AddressPoolConnectionManager
+from aiospamc.connections.pooled_connection import BackendState
+from aiospamc.connections.resolver import Resolver
+from aiospamc.connections.tcp_connection import TcpConnectionManager
+
+
+def info(address):
+    return (socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, 783))
+
+
+@pytest.fixture
+def manager(event_loop):
+    getaddrinfo = CoroutineMock(return_value=[info('192.0.2.1'), info('192.0.2.2')])
+    with patch.object(event_loop, 'getaddrinfo', getaddrinfo):
+        resolver = Resolver(ttl=60, loop=event_loop)
+        yield TcpConnectionManager('spamd', 783, loop=event_loop, resolver=resolver)
+
+
+def hosts(pool):
+    return [backend.manager.host for backend in pool.backends]
+
+
+def test_hostname_until_resolved(manager):
+    pool = AddressPoolConnectionManager(manager, health_check_interval=None)
+
+    assert hosts(pool) == ['spamd']
+    assert pool.interval == 60
+    assert pool.backends[0].manager.resolver is manager.resolver
+
+
+def test_repr(manager):
+    pool = AddressPoolConnectionManager(manager, health_check_interval=None)
+
+    assert repr(pool) == 'AddressPoolConnectionManager(manager={}, backends={})'.format(repr(manager),
+                                                                                       repr(pool.backends))
+
+
+@pytest.mark.asyncio
+async def test_refresh_follows_dns(manager):
+    pool = AddressPoolConnectionManager(manager, health_check_interval=None)
+
+    assert await pool.refresh() is True
+    assert hosts(pool) == ['192.0.2.1', '192.0.2.2']
+
+    kept = pool.backends[1]
+    pool.eject(kept)
+    manager.resolver.loop.getaddrinfo.return_value = [info('192.0.2.2'), info('192.0.2.3')]
+
+    assert await pool.refresh() is True
+    assert hosts(pool) == ['192.0.2.2', '192.0.2.3']
+    assert pool.backends[0] is kept
+    assert kept.state is BackendState.ejected
+    assert pool.refreshes == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_failure_keeps_backends(manager):
+    pool = AddressPoolConnectionManager(manager, health_check_interval=None)
+    manager.resolver.loop.getaddrinfo.side_effect = socket.gaierror
+
+    assert await pool.refresh() is False
+    assert pool.refresh_failures == 1
+    assert hosts(pool) == ['spamd']
+
+
+@pytest.mark.asyncio
+async def test_watch(manager, event_loop):
+    pool = AddressPoolConnectionManager(manager, interval=0.01, loop=event_loop, health_check_interval=None)
+    pool.new_connection()
+    try:
+        for _ in range(100):
+            if pool.refreshes:
+                break
+            await asyncio.sleep(0.01)
+
+        assert hosts(pool) == ['192.0.2.1', '192.0.2.2']
+
+        manager.resolver.loop.getaddrinfo.return_value = [info('192.0.2.3')]
+        for _ in range(100):
+            if hosts(pool) == ['192.0.2.3']:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        pool.stop_watching()
+
+    assert hosts(pool) == ['192.0.2.3']
+
+
+def test_watch_disabled(manager):
+    pool = AddressPoolConnectionManager(manager, interval=0, health_check_interval=None)
+    pool.start_watching()
+
+    assert pool._watch is None
+
+
+def test_close(manager, event_loop):
+    pool = AddressPoolConnectionManager(manager, interval=0.01, loop=event_loop, health_check_interval=None)
+    pool.start_watching()
+
+    with patch.object(manager, 'close') as close:
+        pool.close()
+    event_loop.run_until_complete(asyncio.sleep(0))
+
+    assert pool._watch is None
+    close.assert_called_once_with()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import os
+import ssl
+
+import pytest
+
+from aiospamc.connections import Timeouts
+from aiospamc.connections.backend_file import BackendFileConnectionManager, read_backend_file
+from aiospamc.connections.pooled_connection import BackendState
+from aiospamc.connections.tcp_connection import TcpConnectionManager
+from aiospamc.connections.unix_connection import UnixConnectionManager
+
+
+INI = '''
+[spamd1]
+host = spamd1.example.net
+weight = 2
+
+[spamd2]
+host = spamd2.example.net
+port = 1783
+ssl = yes
+
+[local]
+socket = /var/run/spamassassin/spamd.sock
+'''
+
+
+def write(path, text):
+    with open(str(path), 'w') as file:
+        file.write(text)
+    # Make sure the change is noticed even within the resolution of the
+    # file system's timestamps.
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+
+@pytest.fixture
+def ini_file(tmpdir):
+    path = tmpdir.join('backends.ini')
+    write(path, INI)
+
+    return str(path)
+
+
+@pytest.fixture
+def json_file(tmpdir):
+    path = tmpdir.join('backends.json')
+    write(path, json.dumps({'backends': [{'host': 'spamd1.example.net', 'weight': 2},
+                                         {'socket': '/var/run/spamassassin/spamd.sock'}]}))
+
+    return str(path)
+
+
+def test_read_ini(ini_file):
+    assert read_backend_file(ini_file) == [
+        {'host': 'spamd1.example.net', 'port': 783, 'socket': None, 'weight': 2.0, 'ssl': None},
+        {'host': 'spamd2.example.net', 'port': 1783, 'socket': None, 'weight': 1.0, 'ssl': True},
+        {'host': None, 'port': 783, 'socket': '/var/run/spamassassin/spamd.sock', 'weight': 1.0, 'ssl': None},
+    ]
+
+
+def test_read_json(json_file):
+    assert read_backend_file(json_file) == [
+        {'host': 'spamd1.example.net', 'port': 783, 'socket': None, 'weight': 2.0, 'ssl': None},
+        {'host': None, 'port': 783, 'socket': '/var/run/spamassassin/spamd.sock', 'weight': 1.0, 'ssl': None},
+    ]
+
+
+def test_read_json_list(tmpdir):
+    path = tmpdir.join('backends.json')
+    write(path, '[{"host": "127.0.0.1", "port": 1783, "ssl": false}]')
+
+    assert read_backend_file(str(path)) == [
+        {'host': '127.0.0.1', 'port': 1783, 'socket': None, 'weight': 1.0, 'ssl': False},
+    ]
+
+
+@pytest.mark.parametrize('name,text', [
+    ('backends.json', '{"backends": "spamd1"}'),
+    ('backends.json', '{not json'),
+    ('backends.ini', 'host = spamd1'),
+    ('backends.ini', '[spamd1]\nport = 783\n'),
+    ('backends.ini', '[spamd1]\nhost = spamd1\nsocket = /tmp/spamd.sock\n'),
+    ('backends.ini', '[spamd1]\nhost = spamd1\nport = spamd\n'),
+])
+def test_read_invalid(tmpdir, name, text):
+    path = tmpdir.join(name)
+    write(path, text)
+
+    with pytest.raises(ValueError):
+        read_backend_file(str(path))
+
+
+def test_read_missing(tmpdir):
+    with pytest.raises(OSError):
+        read_backend_file(str(tmpdir.join('missing.ini')))
+
+
+def test_managers(ini_file, event_loop):
+    timeouts = Timeouts(connect=1)
+    manager = BackendFileConnectionManager(ini_file, timeouts=timeouts, loop=event_loop)
+    first, second, third = (backend.manager for backend in manager.backends)
+
+    assert isinstance(first, TcpConnectionManager)
+    assert (first.host, first.port, first.ssl) == ('spamd1.example.net', 783, False)
+    assert manager.backends[0].weight == 2
+    assert isinstance(second.ssl, ssl.SSLContext)
+    assert isinstance(third, UnixConnectionManager)
+    assert third.path == '/var/run/spamassassin/spamd.sock'
+    assert first.timeouts is timeouts
+    assert manager.timeouts is timeouts
+    assert first.loop is event_loop
+
+
+def test_shared_ssl_context(tmpdir, event_loop):
+    path = tmpdir.join('backends.ini')
+    write(path, '[spamd1]\nhost = spamd1\n\n[spamd2]\nhost = spamd2\n\n[spamd3]\nhost = spamd3\nssl = no\n')
+    manager = BackendFileConnectionManager(str(path), ssl=True, loop=event_loop)
+
+    first, second, third = (backend.manager for backend in manager.backends)
+
+    assert isinstance(first.ssl, ssl.SSLContext)
+    assert first.ssl is second.ssl
+    assert third.ssl is False
+
+
+def test_pool_options(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, loop=event_loop, strategy='least_outstanding',
+                                           max_in_flight=4)
+
+    assert repr(manager.strategy) == 'LeastOutstanding()'
+    assert all(backend.limiter.limit == 4 for backend in manager.backends)
+
+
+def test_repr(json_file, event_loop):
+    manager = BackendFileConnectionManager(json_file, loop=event_loop)
+
+    assert repr(manager) == 'BackendFileConnectionManager(path={}, backends={})'.format(repr(json_file),
+                                                                                       repr(manager.backends))
+
+
+def test_invalid_file(tmpdir, event_loop):
+    path = tmpdir.join('backends.ini')
+    write(path, '')
+
+    with pytest.raises(ValueError):
+        BackendFileConnectionManager(str(path), loop=event_loop)
+
+
+def test_reload_unchanged(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, loop=event_loop)
+
+    assert manager.reload() is False
+    assert manager.reloads == 0
+
+
+def test_reload_keeps_state(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, loop=event_loop)
+    kept = manager.backends[0]
+    kept.latency = 0.2
+    manager.eject(kept)
+
+    write(ini_file, '[spamd1]\nhost = spamd1.example.net\nweight = 3\n\n[spamd3]\nhost = spamd3.example.net\n')
+
+    assert manager.reload() is True
+    assert manager.reloads == 1
+    assert manager.backends[0] is kept
+    assert kept.weight == 3
+    assert kept.latency == 0.2
+    assert kept.state is BackendState.ejected
+    assert manager.backends[1].manager.host == 'spamd3.example.net'
+    assert len(manager.backends) == 2
+
+
+def test_reload_force(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, loop=event_loop)
+
+    assert manager.reload(force=True) is True
+    assert manager.reloads == 1
+
+
+@pytest.mark.parametrize('text', ['', '[spamd1]\nport = 783\n'])
+def test_reload_invalid_keeps_backends(ini_file, event_loop, text):
+    manager = BackendFileConnectionManager(ini_file, loop=event_loop)
+    backends = list(manager.backends)
+
+    write(ini_file, text)
+
+    assert manager.reload() is False
+    assert manager.reload_failures == 1
+    assert manager.backends == backends
+
+    assert manager.reload() is False
+    assert manager.reload_failures == 1
+
+
+def test_reload_missing_file(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, loop=event_loop)
+    os.remove(ini_file)
+
+    assert manager.reload() is False
+    assert manager.reload_failures == 1
+    assert len(manager.backends) == 3
+
+
+@pytest.mark.asyncio
+async def test_watch(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, interval=0.01, loop=event_loop, health_check_interval=None)
+    manager.new_connection()
+    try:
+        write(ini_file, '[spamd3]\nhost = spamd3.example.net\n')
+        for _ in range(100):
+            if manager.reloads:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        manager.stop_watching()
+
+    assert manager.reloads == 1
+    assert [backend.manager.host for backend in manager.backends] == ['spamd3.example.net']
+
+
+def test_watch_disabled(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, interval=None, loop=event_loop, health_check_interval=None)
+    manager.start_watching()
+
+    assert manager._watch is None
+
+
+def test_close(ini_file, event_loop):
+    manager = BackendFileConnectionManager(ini_file, interval=0.01, loop=event_loop, health_check_interval=None)
+    manager.start_watching()
+
+    manager.close()
+    event_loop.run_until_complete(asyncio.sleep(0))
+
+    assert manager._watch is None
@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
 
+import asyncio
+import itertools
+import socket
+import struct
+
 import pytest
+from asynctest import CoroutineMock, MagicMock, Mock, patch
 
-from aiospamc.connections import Connection
+from aiospamc.common import FileBody
+from aiospamc.connections import Connection, Timeouts
+from aiospamc.exceptions import AIOSpamcConnectionTimeout
+from aiospamc.parser import ParseError, ResponseParser
 
 
 def test_instantiates():
@@ -51,6 +60,61 @@ async def test_send():
         conn.writer.write.assert_called_with(data)
 
 
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('mock_connection')
+async def test_send_buffers():
+    async with Connection() as conn:
+        data = [b'Test ', memoryview(b'data' * 2 ** 20)]
+        await conn.send(data)
+
+        written = [call[0][0] for call in conn.writer.write.call_args_list]
+        assert len(written) == 2
+        assert all(buffer is item for buffer, item in zip(written, data))
+        assert not conn.writer.writelines.called
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('mock_connection')
+async def test_send_file_body(spam_file, spam):
+    async with Connection() as conn:
+        conn.writer.get_extra_info.return_value = None
+        conn.loop = Mock()
+        conn.loop.sendfile = CoroutineMock()
+        with open(spam_file, 'rb') as file:
+            body = FileBody(file)
+            await conn.send([b'Header\r\n', body])
+
+        conn.writer.write.assert_called_once_with(b'Header\r\n')
+        conn.loop.sendfile.assert_called_with(conn.writer.transport, file, 0, len(spam.encode()))
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('mock_connection')
+async def test_send_file_body_tls_chunked(spam_file, spam):
+    async with Connection() as conn:
+        conn.writer.get_extra_info.return_value = Mock()
+        with open(spam_file, 'rb') as file:
+            body = FileBody(file)
+            body.chunk_size = 100
+            await conn.send([body])
+
+        written = b''.join(call[0][0] for call in conn.writer.write.call_args_list)
+        assert written == spam.encode()
+        assert not conn.writer.writelines.called
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('mock_connection')
+async def test_send_file_body_empty(tmpdir):
+    path = tmpdir.join('empty.eml')
+    path.write_binary(b'')
+    async with Connection() as conn:
+        with open(str(path), 'rb') as file:
+            await conn.send([FileBody(file)])
+
+        assert not conn.writer.write.called
+
+
 @pytest.mark.asyncio
 async def test_receive(mock_connection):
     async with Connection() as conn:
@@ -63,6 +127,67 @@ async def test_receive(mock_connection):
         assert data == test_data
 
 
+@pytest.mark.asyncio
+async def test_receive_response(mock_connection, response_with_body):
+    async with Connection() as conn:
+        mock_connection.side_effect = [response_with_body[:-6], response_with_body[-6:]]
+        parser = ResponseParser()
+
+        result = await conn.receive_response(parser)
+
+        assert result is parser
+        assert parser.complete
+        assert mock_connection.call_count == 2
+        assert mock_connection.call_args[0][0] == 6
+
+
+@pytest.mark.asyncio
+async def test_receive_response_eof(mock_connection):
+    async with Connection() as conn:
+        mock_connection.side_effect = [b'SPAMD/1.5 0 PONG\r\n', b'']
+        parser = ResponseParser()
+
+        await conn.receive_response(parser)
+
+        assert parser.complete
+        assert parser.message == 'PONG'
+
+
+@pytest.mark.asyncio
+async def test_receive_response_stream(mock_connection, response_with_body, event_loop):
+    async with Connection() as conn:
+        conn.reader = asyncio.StreamReader(loop=event_loop)
+        conn.reader.feed_data(response_with_body)
+        conn.reader.feed_eof()
+
+        parser = await conn.receive_response(ResponseParser())
+
+    assert parser.body == b'Test body\n'
+
+
+@pytest.mark.asyncio
+async def test_receive_response_stops_at_content_length(mock_connection, response_with_body, event_loop):
+    async with Connection() as conn:
+        conn.reader = asyncio.StreamReader(loop=event_loop)
+        conn.reader.feed_data(response_with_body + b'extra')
+        conn.reader.feed_eof()
+        conn.read_size = response_with_body.index(b'Test')
+
+        parser = await conn.receive_response(ResponseParser())
+
+        assert parser.body == b'Test body\n'
+        assert await conn.reader.read() == b'extra'
+
+
+@pytest.mark.asyncio
+async def test_receive_response_truncated(mock_connection):
+    async with Connection() as conn:
+        mock_connection.side_effect = [b'SPAMD/1.5 0 EX_OK\r\nContent-length: 10\r\n\r\nTest', b'']
+
+        with pytest.raises(ParseError):
+            await conn.receive_response(ResponseParser())
+
+
 @pytest.mark.asyncio
 @pytest.mark.usefixtures('mock_connection')
 async def test_context_manager_aenter():
@@ -82,3 +207,145 @@ async def test_context_manager_aexit():
     assert conn.connected is False
     assert not hasattr(conn, 'reader')
     assert not hasattr(conn, 'writer')
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('exception', [asyncio.CancelledError, RuntimeError])
+@pytest.mark.usefixtures('mock_connection')
+async def test_context_manager_aexit_aborts(exception):
+    conn = Connection()
+
+    with pytest.raises(exception):
+        async with conn:
+            writer = conn.writer
+            raise exception
+
+    assert writer.transport.abort.called
+    assert not writer.close.called
+    assert conn.connected is False
+    assert not hasattr(conn, 'writer')
+
+
+def make_socket_writer(family):
+    sock = Mock(family=family)
+    writer = MagicMock(spec=asyncio.StreamWriter)
+    writer.get_extra_info.side_effect = lambda name: sock if name == 'socket' else None
+
+    return sock, writer
+
+
+@pytest.mark.parametrize('family', [socket.AF_INET, socket.AF_INET6])
+def test_abort_resets_tcp(family):
+    conn = Connection()
+    sock, conn.writer = make_socket_writer(family)
+
+    conn.abort()
+
+    sock.setsockopt.assert_called_once_with(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+    assert conn.writer.transport.abort.called
+
+
+def test_abort_unix_not_reset():
+    conn = Connection()
+    sock, conn.writer = make_socket_writer(socket.AF_UNIX)
+
+    conn.abort()
+
+    assert not sock.setsockopt.called
+    assert conn.writer.transport.abort.called
+
+
+def test_abort_reset_fails():
+    conn = Connection()
+    sock, conn.writer = make_socket_writer(socket.AF_INET)
+    sock.setsockopt.side_effect = OSError
+
+    conn.abort()
+
+    assert conn.writer.transport.abort.called
+    assert conn.connected is False
+
+
+def test_timeouts_repr():
+    assert repr(Timeouts(connect=1, read=2.5)) == 'Timeouts(connect=1, write=None, read=2.5, total=None)'
+
+
+@pytest.mark.parametrize('name', ['connect', 'write', 'read', 'total'])
+def test_timeouts_not_positive(name):
+    with pytest.raises(ValueError):
+        Timeouts(**{name: 0})
+
+
+async def hang(*args, **kwargs):
+    await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_connect_timeout():
+    conn = Connection(timeouts=Timeouts(connect=0.01))
+
+    with patch('aiospamc.connections.Connection.open', side_effect=hang), \
+            patch('aiospamc.connections.Connection.connection_string', 'MockConnectionString'):
+        with pytest.raises(AIOSpamcConnectionTimeout):
+            async with conn:
+                pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('mock_connection')
+async def test_write_timeout():
+    async with Connection(timeouts=Timeouts(write=0.01)) as conn:
+        conn.writer.drain.side_effect = hang
+
+        with pytest.raises(AIOSpamcConnectionTimeout):
+            await conn.send([b'Test data'])
+
+        assert conn.writer.transport.abort.called
+        assert conn.connected is False
+
+
+@pytest.mark.asyncio
+async def test_read_timeout(mock_connection):
+    mock_connection.side_effect = hang
+
+    async with Connection(timeouts=Timeouts(read=0.01)) as conn:
+        with pytest.raises(AIOSpamcConnectionTimeout):
+            await conn.receive_response(ResponseParser())
+
+        assert conn.writer.transport.abort.called
+
+
+@pytest.mark.asyncio
+async def test_read_within_timeout(mock_connection, response_ok):
+    mock_connection.side_effect = [response_ok]
+
+    async with Connection(timeouts=Timeouts(read=1)) as conn:
+        parser = await conn.receive_response(ResponseParser())
+
+    assert parser.complete
+
+
+@pytest.mark.asyncio
+async def test_response_timeout_overrides_read_timeout(mock_connection):
+    mock_connection.side_effect = hang
+
+    async with Connection(timeouts=Timeouts(read=10)) as conn:
+        with pytest.raises(AIOSpamcConnectionTimeout):
+            await conn.receive_response(ResponseParser(), timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_response_timeout_covers_all_reads(mock_connection):
+    chunks = itertools.chain([b'SPAMD/1.5 0 EX_OK\r\nContent-length: 100\r\n\r\n'], itertools.repeat(b'a'))
+
+    async def trickle(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return next(chunks)
+
+    mock_connection.side_effect = trickle
+
+    async with Connection(timeouts=Timeouts(read=1)) as conn:
+        with pytest.raises(AIOSpamcConnectionTimeout):
+            await conn.receive_response(ResponseParser(), timeout=0.05)
+
+        assert conn.writer.transport.abort.called
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import asyncio
+
+import pytest
+
+from aiospamc.connections.limiter import ConcurrencyLimiter
+from aiospamc.exceptions import AIOSpamcConnectionQueueFull
+
+
+def test_repr():
+    assert repr(ConcurrencyLimiter(2, 10, 1.5)) == 'ConcurrencyLimiter(limit=2, max_queue=10, max_wait=1.5)'
+
+
+def test_limit_less_than_one():
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(0)
+
+
+@pytest.mark.asyncio
+async def test_acquire_under_limit():
+    limiter = ConcurrencyLimiter(2)
+    await limiter.acquire()
+
+    assert limiter.in_flight == 1
+    assert limiter.available
+
+    await limiter.acquire()
+
+    assert not limiter.available
+
+    limiter.release()
+
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_fifo_order(event_loop):
+    limiter = ConcurrencyLimiter(1, loop=event_loop)
+    order = []
+
+    async def request(name):
+        async with limiter:
+            order.append(name)
+            await asyncio.sleep(0)
+
+    await limiter.acquire()
+    tasks = [event_loop.create_task(request(name)) for name in 'abc']
+    await asyncio.sleep(0)
+
+    assert limiter.queue_depth == 3
+
+    limiter.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ['a', 'b', 'c']
+    assert limiter.in_flight == 0
+    assert limiter.queued == 3
+    assert limiter.admitted == 4
+    assert limiter.wait_time_max >= limiter.mean_wait_time > 0
+
+
+@pytest.mark.asyncio
+async def test_max_queue():
+    limiter = ConcurrencyLimiter(1, max_queue=0)
+    await limiter.acquire()
+
+    with pytest.raises(AIOSpamcConnectionQueueFull):
+        await limiter.acquire()
+    assert limiter.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_max_wait(event_loop):
+    limiter = ConcurrencyLimiter(1, max_wait=0.01, loop=event_loop)
+    await limiter.acquire()
+
+    with pytest.raises(AIOSpamcConnectionQueueFull):
+        await limiter.acquire()
+    assert limiter.rejected == 1
+    assert limiter.queue_depth == 0
+
+    limiter.release()
+
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue(event_loop):
+    limiter = ConcurrencyLimiter(1, loop=event_loop)
+    await limiter.acquire()
+    task = event_loop.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert limiter.queue_depth == 0
+
+    limiter.release()
+
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_after_grant_passes_slot_on(event_loop):
+    limiter = ConcurrencyLimiter(1, loop=event_loop)
+    await limiter.acquire()
+    first = event_loop.create_task(limiter.acquire())
+    second = event_loop.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    limiter.release()
+    first.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    await second
+
+    assert limiter.in_flight == 1
+    assert limiter.queue_depth == 0
@@ -0,0 +1,818 @@
+#!/usr/bin/env python3
+
+import asyncio
+from collections import Counter
+import random
+import time
+
+import pytest
+from asynctest import CoroutineMock, patch, MagicMock
+
+from aiospamc.connections.pooled_connection import (Backend, BackendState, ConsistentHash, LeastOutstanding,
+                                                    PooledConnectionManager, PowerOfTwoChoices, RoundRobin)
+from aiospamc.connections.tcp_connection import TcpConnection, TcpConnectionManager
+from aiospamc.connections.unix_connection import UnixConnection, UnixConnectionManager
+from aiospamc.connections import Timeouts
+from aiospamc.connections.limiter import ConcurrencyLimiter
+from aiospamc.exceptions import AIOSpamcConnectionFailed, AIOSpamcConnectionQueueFull
+
+
+@pytest.fixture
+def tcp_manager():
+    return TcpConnectionManager('127.0.0.1', 783)
+
+
+@pytest.fixture
+def unix_manager():
+    return UnixConnectionManager('/var/run/spamassassin/spamd.sock')
+
+
+@pytest.fixture
+def mock_open():
+    streams = (MagicMock(spec=asyncio.StreamReader), MagicMock(spec=asyncio.StreamWriter))
+    with patch('asyncio.open_connection', return_value=streams), \
+            patch('asyncio.open_unix_connection', return_value=streams):
+        yield
+
+
+class TestBackend:
+    def test_repr(self, tcp_manager):
+        assert repr(Backend(tcp_manager, 2)) == 'Backend(manager={}, weight=2)'.format(repr(tcp_manager))
+
+    @pytest.mark.parametrize('weight', [0, -1])
+    def test_weight_not_positive(self, tcp_manager, weight):
+        with pytest.raises(ValueError):
+            Backend(tcp_manager, weight)
+
+    def test_record_latency(self, tcp_manager):
+        backend = Backend(tcp_manager, smoothing=0.5)
+        backend.record_latency(1.0)
+        backend.record_latency(3.0)
+
+        assert backend.latency == 2.0
+
+    def test_error_rate_window(self, tcp_manager):
+        backend = Backend(tcp_manager, window=4)
+
+        assert backend.error_rate == 0.0
+
+        backend.record_failure()
+        backend.record_success(0.1)
+
+        assert backend.error_rate == 0.5
+
+        for _ in range(4):
+            backend.record_success(0.1)
+
+        assert backend.error_rate == 0.0
+        assert backend.failures == 1
+
+    def test_recovery_clears_error_rate(self, tcp_manager):
+        backend = Backend(tcp_manager)
+        backend.record_failure()
+        backend.state = BackendState.half_open
+        backend.record_success(0.1)
+
+        assert list(backend.outcomes) == [False]
+
+
+class TestStrategies:
+    def test_round_robin_weights(self, tcp_manager, unix_manager):
+        heavy, light = Backend(tcp_manager, 2), Backend(unix_manager, 1)
+        strategy = RoundRobin()
+
+        selected = [strategy.select([heavy, light]) for _ in range(6)]
+
+        assert selected == [heavy, light, heavy, heavy, light, heavy]
+
+    def test_least_outstanding(self, tcp_manager, unix_manager):
+        busy, idle = Backend(tcp_manager), Backend(unix_manager)
+        busy.outstanding = 3
+        idle.outstanding = 1
+
+        assert LeastOutstanding().select([busy, idle]) is idle
+
+    def test_least_outstanding_weights(self, tcp_manager, unix_manager):
+        heavy, light = Backend(tcp_manager, 4), Backend(unix_manager, 1)
+        heavy.outstanding = 2
+
+        assert LeastOutstanding().select([heavy, light]) is heavy
+
+    def test_power_of_two_prefers_lower_cost(self, tcp_manager, unix_manager):
+        slow, fast = Backend(tcp_manager), Backend(unix_manager)
+        slow.latency = 1.0
+        fast.latency = 0.1
+        strategy = PowerOfTwoChoices(random.Random(0))
+
+        assert all(strategy.select([slow, fast]) is fast for _ in range(10))
+
+    def test_power_of_two_tries_unmeasured(self, tcp_manager, unix_manager):
+        measured, unmeasured = Backend(tcp_manager), Backend(unix_manager)
+        measured.latency = 0.1
+
+        assert PowerOfTwoChoices(random.Random(0)).select([measured, unmeasured]) is unmeasured
+
+    def test_power_of_two_single_backend(self, tcp_manager):
+        backend = Backend(tcp_manager)
+
+        assert PowerOfTwoChoices().select([backend]) is backend
+
+    def test_power_of_two_spreads_by_weight(self, tcp_manager, unix_manager):
+        backends = [Backend(tcp_manager, 3), Backend(unix_manager, 1),
+                    Backend(TcpConnectionManager('127.0.0.2', 783), 1)]
+        strategy = PowerOfTwoChoices(random.Random(0))
+
+        counts = Counter(strategy._choose(backends) for _ in range(5000))
+
+        assert counts[backends[0]] > 2 * counts[backends[1]]
+
+
+class TestConsistentHash:
+    @pytest.fixture
+    def backends(self):
+        return [Backend(TcpConnectionManager('127.0.0.{}'.format(index), 783)) for index in range(1, 5)]
+
+    def test_repr(self):
+        assert repr(ConsistentHash()) == 'ConsistentHash(replicas=64, load_factor=1.25)'
+
+    def test_load_factor_less_than_one(self):
+        with pytest.raises(ValueError):
+            ConsistentHash(load_factor=0.5)
+
+    def test_same_key_same_backend(self, backends):
+        strategy = ConsistentHash()
+
+        assert len({strategy.select(backends, b'User: alice\r\n') for _ in range(10)}) == 1
+
+    def test_keys_spread(self, backends):
+        strategy = ConsistentHash()
+        counts = Counter(strategy.select(backends, 'user{}'.format(index)) for index in range(1000))
+
+        assert len(counts) == 4
+        assert min(counts.values()) > 100
+
+    def test_stable_across_instances(self, backends):
+        keys = ['user{}'.format(index) for index in range(100)]
+        first = [ConsistentHash().select(backends, key).manager.host for key in keys]
+        second = [ConsistentHash().select(list(reversed(backends)), key).manager.host for key in keys]
+
+        assert first == second
+
+    def test_removing_backend_only_moves_its_keys(self, backends):
+        strategy = ConsistentHash()
+        keys = ['user{}'.format(index) for index in range(1000)]
+        before = {key: strategy.select(backends, key) for key in keys}
+        removed = backends[0]
+        after = {key: strategy.select(backends[1:], key) for key in keys}
+
+        assert all(after[key] is before[key] for key in keys if before[key] is not removed)
+
+    def test_weights(self, backends):
+        backends[0].weight = 3
+        strategy = ConsistentHash()
+        counts = Counter(strategy.select(backends, 'user{}'.format(index)) for index in range(2000))
+
+        assert counts[backends[0]] > 2 * counts[backends[1]]
+
+    def test_bounded_load_spills(self, backends):
+        strategy = ConsistentHash(load_factor=1.25)
+        home = strategy.select(backends, 'alice')
+        home.outstanding = 4
+
+        selected = strategy.select(backends, 'alice')
+
+        assert selected is not home
+        assert strategy.spilled == 1
+
+    def test_no_key_uses_fallback(self, backends):
+        backends[0].outstanding = 1
+        strategy = ConsistentHash(fallback=LeastOutstanding())
+
+        assert strategy.select(backends) is backends[1]
+
+    @pytest.mark.asyncio
+    async def test_pool_routes_by_key(self, backends, mock_open):
+        manager = PooledConnectionManager(backends, strategy='consistent_hash', health_check_interval=None)
+        selected = set()
+        for _ in range(5):
+            pooled = manager.new_connection(key='alice')
+            async with pooled:
+                selected.add(pooled.backend)
+
+        assert len(selected) == 1
+
+    def test_weight_change_moves_keys(self, backends):
+        manager = PooledConnectionManager(backends, strategy='consistent_hash', health_check_interval=None)
+        keys = ['user{}'.format(index) for index in range(200)]
+        before = [manager.select(key=key) for key in keys]
+
+        manager.update([(backend.manager, 4 if index == 0 else 1) for index, backend in enumerate(backends)])
+        after = [manager.select(key=key) for key in keys]
+
+        assert after.count(backends[0]) > before.count(backends[0])
+        assert all(new is backends[0] for old, new in zip(before, after) if new is not old)
+
+    def test_pool_skips_unhealthy(self, backends):
+        manager = PooledConnectionManager(backends, strategy='consistent_hash', health_check_interval=None)
+        home = manager.select(key='alice')
+        manager.eject(home)
+
+        assert manager.select(key='alice') is not home
+
+
+class TestPooledConnectionManager:
+    def test_backends(self, tcp_manager, unix_manager):
+        backend = Backend(tcp_manager)
+        manager = PooledConnectionManager([backend, (unix_manager, 3), tcp_manager])
+
+        assert manager.backends[0] is backend
+        assert manager.backends[1].manager is unix_manager
+        assert manager.backends[1].weight == 3
+        assert manager.backends[2].weight == 1
+
+    def test_no_backends(self):
+        with pytest.raises(ValueError):
+            PooledConnectionManager([])
+
+    @pytest.mark.parametrize('name,expected', [
+        ('round_robin', RoundRobin),
+        ('least_outstanding', LeastOutstanding),
+        ('power_of_two', PowerOfTwoChoices),
+        ('consistent_hash', ConsistentHash),
+    ])
+    def test_strategy_names(self, tcp_manager, name, expected):
+        assert isinstance(PooledConnectionManager([tcp_manager], strategy=name).strategy, expected)
+
+    def test_unknown_strategy(self, tcp_manager):
+        with pytest.raises(ValueError):
+            PooledConnectionManager([tcp_manager], strategy='random')
+
+    def test_repr(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager])
+
+        assert repr(manager) == 'PooledConnectionManager(backends=[{}], strategy=RoundRobin())'.format(
+                repr(manager.backends[0]))
+
+    def test_local(self, tcp_manager, unix_manager):
+        assert PooledConnectionManager([unix_manager]).local is True
+        assert PooledConnectionManager([unix_manager, tcp_manager]).local is False
+
+    @pytest.mark.asyncio
+    async def test_new_connection_mixed(self, tcp_manager, unix_manager, mock_open):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+
+        async with manager.new_connection() as first:
+            async with manager.new_connection() as second:
+                assert isinstance(first, TcpConnection)
+                assert isinstance(second, UnixConnection)
+                assert [backend.outstanding for backend in manager.backends] == [1, 1]
+
+        assert [backend.outstanding for backend in manager.backends] == [0, 0]
+        assert all(backend.latency is not None for backend in manager.backends)
+
+
+class TestUpdate:
+    def test_keeps_matching_backends(self, tcp_manager, unix_manager):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+        kept = manager.backends[0]
+        kept.latency = 0.5
+        kept.failures = 2
+
+        manager.update([(TcpConnectionManager('127.0.0.1', 783), 3), TcpConnectionManager('127.0.0.2', 783)])
+
+        assert manager.backends[0] is kept
+        assert kept.manager is tcp_manager
+        assert kept.weight == 3
+        assert kept.latency == 0.5
+        assert kept.failures == 2
+        assert manager.backends[1].manager.host == '127.0.0.2'
+        assert len(manager.backends) == 2
+
+    def test_keeps_ejection(self, tcp_manager, unix_manager):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+        manager.eject(manager.backends[1])
+
+        manager.update([UnixConnectionManager('/var/run/spamassassin/spamd.sock')])
+
+        assert manager.backends[0].state is BackendState.ejected
+
+    def test_no_backends(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None)
+
+        with pytest.raises(ValueError):
+            manager.update([])
+
+        assert manager.backends[0].manager is tcp_manager
+
+    def test_new_backends_limited(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None, max_in_flight=2, max_queue=3)
+
+        manager.update([tcp_manager, TcpConnectionManager('127.0.0.2', 783)])
+
+        assert manager.backends[1].limiter.limit == 2
+        assert manager.backends[1].limiter.max_queue == 3
+
+    @pytest.mark.asyncio
+    async def test_removed_backend_drains(self, tcp_manager, unix_manager, mock_open):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+        removed = manager.backends[0]
+
+        pooled = manager.new_connection()
+        with patch.object(tcp_manager, 'close') as close:
+            async with pooled:
+                assert pooled.backend is removed
+
+                manager.update([unix_manager])
+
+                assert manager.draining == [removed]
+                assert all(manager.select() is manager.backends[0] for _ in range(4))
+                close.assert_not_called()
+
+        assert removed.outstanding == 0
+        assert removed.latency is not None
+        assert manager.draining == []
+        close.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_removed_backend_closed_after_failed_connect(self, tcp_manager, unix_manager, event_loop):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], loop=event_loop,
+                                          health_check_interval=None, connect_attempts=1)
+
+        async def open_connection(*args, **kwargs):
+            manager.update([unix_manager])
+            raise ConnectionRefusedError
+
+        with patch('asyncio.open_connection', side_effect=open_connection), \
+                patch.object(tcp_manager, 'close') as close:
+            with pytest.raises(AIOSpamcConnectionFailed):
+                await manager.new_connection().__aenter__()
+
+        assert manager.draining == []
+        close.assert_called_once_with()
+
+    def test_removed_idle_backend_closed(self, tcp_manager, unix_manager):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+
+        with patch.object(tcp_manager, 'close') as close:
+            manager.update([unix_manager])
+
+        assert manager.draining == []
+        close.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_health_check_during_update(self, tcp_manager, unix_manager, event_loop):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], loop=event_loop,
+                                          health_check_interval=None, max_failures=1)
+
+        async def probe(backend):
+            manager.update([unix_manager])
+            return False
+
+        with patch.object(manager, 'probe', side_effect=probe):
+            await manager.check_health()
+
+        assert manager.backends[0].manager is unix_manager
+        assert manager.backends[0].state is BackendState.ejected
+
+
+class TestPooledConnection:
+    @pytest.mark.asyncio
+    async def test_connect_failed(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None)
+        backend = manager.backends[0]
+
+        with patch('asyncio.open_connection', side_effect=ConnectionRefusedError):
+            with pytest.raises(AIOSpamcConnectionFailed):
+                async with manager.new_connection():
+                    pass
+
+        assert backend.outstanding == 0
+        assert backend.failures == 1
+        assert backend.latency is None
+
+    @pytest.mark.asyncio
+    async def test_connect_failover(self, tcp_manager, unix_manager):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+        streams = (MagicMock(spec=asyncio.StreamReader), MagicMock(spec=asyncio.StreamWriter))
+
+        with patch('asyncio.open_connection', side_effect=ConnectionRefusedError), \
+                patch('asyncio.open_unix_connection', return_value=streams):
+            async with manager.new_connection() as connection:
+                assert isinstance(connection, UnixConnection)
+
+        assert manager.backends[0].failures == 1
+        assert manager.backends[1].failures == 0
+
+    @pytest.mark.asyncio
+    async def test_connect_timeout_failover(self, unix_manager):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        slow = TcpConnectionManager('127.0.0.1', 783, timeouts=Timeouts(connect=0.01))
+        manager = PooledConnectionManager([slow, unix_manager], health_check_interval=None)
+        streams = (MagicMock(spec=asyncio.StreamReader), MagicMock(spec=asyncio.StreamWriter))
+
+        with patch('asyncio.open_connection', side_effect=hang), \
+                patch('asyncio.open_unix_connection', return_value=streams):
+            async with manager.new_connection() as connection:
+                assert isinstance(connection, UnixConnection)
+
+        assert manager.backends[0].failures == 1
+
+    @pytest.mark.asyncio
+    async def test_error_not_timed(self, tcp_manager, mock_open):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None)
+        backend = manager.backends[0]
+
+        with pytest.raises(RuntimeError):
+            async with manager.new_connection():
+                raise RuntimeError
+
+        assert backend.outstanding == 0
+        assert backend.requests == 1
+        assert backend.failures == 1
+        assert backend.latency is None
+
+    @pytest.mark.asyncio
+    async def test_cancelled_not_failure(self, tcp_manager, mock_open):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None)
+
+        with pytest.raises(asyncio.CancelledError):
+            async with manager.new_connection():
+                raise asyncio.CancelledError
+
+        assert manager.backends[0].failures == 0
+
+    @pytest.mark.asyncio
+    async def test_avoid(self, tcp_manager, unix_manager, mock_open):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+        avoided = manager.backends[0]
+
+        for _ in range(4):
+            pooled = manager.new_connection(avoid=(avoided,))
+            async with pooled as connection:
+                assert isinstance(connection, UnixConnection)
+
+    @pytest.mark.asyncio
+    async def test_avoid_only_backend(self, tcp_manager, mock_open):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None)
+        pooled = manager.new_connection(avoid=manager.backends)
+
+        async with pooled:
+            assert pooled.backend is manager.backends[0]
+
+
+class TestHealth:
+    @pytest.fixture
+    def manager(self, tcp_manager, unix_manager, event_loop):
+        return PooledConnectionManager([tcp_manager, unix_manager, TcpConnectionManager('127.0.0.2', 783)],
+                                       loop=event_loop,
+                                       health_check_interval=None,
+                                       max_failures=2,
+                                       ejection_time=10.0,
+                                       max_ejection_time=30.0,
+                                       min_requests=1)
+
+    def test_eject_after_consecutive_failures(self, manager):
+        backend = manager.backends[0]
+        manager.record_failure(backend)
+
+        assert backend.state is BackendState.healthy
+
+        manager.record_failure(backend)
+
+        assert backend.state is BackendState.ejected
+        assert backend not in [manager.select() for _ in range(10)]
+
+    def test_success_resets_consecutive_failures(self, manager):
+        backend = manager.backends[0]
+        manager.record_failure(backend)
+        manager.record_success(backend, 0.1)
+        manager.record_failure(backend)
+
+        assert backend.state is BackendState.healthy
+
+    def test_half_open_trial(self, manager):
+        backend = manager.backends[0]
+        manager.eject(backend)
+        backend.ejected_until = 0
+
+        assert backend.available(time.monotonic())
+        assert backend.state is BackendState.half_open
+
+        backend.begin()
+
+        assert not backend.available(time.monotonic())
+
+        backend.end()
+        manager.record_success(backend, 0.1)
+
+        assert backend.state is BackendState.healthy
+        assert backend.ejections == 0
+
+    def test_half_open_failure_doubles_ejection(self, manager):
+        backend = manager.backends[0]
+        manager.eject(backend)
+        backend.ejected_until = 0
+        backend.available(time.monotonic())
+        manager.record_failure(backend)
+
+        assert backend.state is BackendState.ejected
+        assert backend.ejected_until - time.monotonic() == pytest.approx(20.0, abs=1)
+
+        backend.state = BackendState.half_open
+        manager.record_failure(backend)
+
+        assert backend.ejected_until - time.monotonic() == pytest.approx(30.0, abs=1)
+
+    def test_all_ejected_uses_all(self, manager):
+        for backend in manager.backends:
+            manager.eject(backend)
+
+        assert manager.select() in manager.backends
+
+    def test_latency_outlier(self, manager):
+        for backend, latency in zip(manager.backends, (0.1, 0.1, 1.0)):
+            backend.requests = 1
+            backend.record_latency(latency)
+        manager.detect_outliers()
+
+        assert [backend.state for backend in manager.backends] == \
+            [BackendState.healthy, BackendState.healthy, BackendState.ejected]
+
+    def test_error_rate_outlier(self, manager):
+        backend = manager.backends[0]
+        backend.outcomes.extend([True, False] * 3 + [True] * 4)
+        manager.detect_outliers()
+
+        assert backend.state is BackendState.ejected
+
+    def test_error_rate_needs_min_requests(self, manager):
+        backend = manager.backends[0]
+        backend.outcomes.extend([True] * 9)
+        manager.detect_outliers()
+
+        assert backend.state is BackendState.healthy
+
+    def test_error_rate_not_before_consecutive_failures(self, tcp_manager, unix_manager):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=None)
+        backend = manager.backends[0]
+        for _ in range(5):
+            backend.begin()
+            backend.end()
+            manager.record_success(backend, 0.1)
+        manager.record_failure(backend)
+        manager.record_failure(backend)
+
+        assert backend.state is BackendState.healthy
+
+        manager.record_failure(backend)
+
+        assert backend.state is BackendState.ejected
+
+    def test_error_window(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager], error_window=5, health_check_interval=None)
+
+        assert manager.backends[0].outcomes.maxlen == 5
+
+    def test_outlier_ejection_limit(self, manager):
+        for backend in manager.backends:
+            backend.outcomes.extend([True] * 10)
+        manager.detect_outliers()
+
+        assert [backend.state for backend in manager.backends].count(BackendState.ejected) == 1
+
+    @pytest.mark.asyncio
+    async def test_probe(self, manager, mock_connection, response_pong):
+        mock_connection.side_effect = [response_pong, b'']
+
+        assert await manager.probe(manager.backends[0]) is True
+
+    @pytest.mark.asyncio
+    async def test_probe_failed(self, manager):
+        with patch('asyncio.open_connection', side_effect=ConnectionRefusedError):
+            assert await manager.probe(manager.backends[0]) is False
+
+    @pytest.mark.asyncio
+    async def test_check_health(self, manager):
+        healthy, ejected, failing = manager.backends
+        manager.eject(ejected)
+        results = {healthy: True, ejected: True, failing: False}
+        manager.probe = CoroutineMock(side_effect=lambda backend: results[backend])
+
+        await manager.check_health()
+
+        assert healthy.failures == 0
+        assert failing.failures == 1
+        assert ejected.available(time.monotonic())
+        assert ejected.state is BackendState.half_open
+
+    @pytest.mark.asyncio
+    async def test_check_health_busy_not_failure(self, manager):
+        busy, recent, idle = manager.backends
+        busy.outstanding = 1
+        manager.record_success(recent, 0.1)
+        manager.probe = CoroutineMock(return_value=False)
+
+        await manager.check_health()
+
+        assert busy.failures == 0
+        assert recent.failures == 0
+        assert idle.failures == 1
+
+    @pytest.mark.asyncio
+    async def test_check_health_skipped_not_failure(self, manager):
+        manager.probe = CoroutineMock(return_value=None)
+
+        await manager.check_health()
+
+        assert all(backend.failures == 0 for backend in manager.backends)
+
+    @pytest.mark.asyncio
+    async def test_probe_skipped_without_capacity(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None, max_in_flight=1)
+        manager.backends[0].limiter.in_flight = 1
+
+        with patch('asyncio.open_connection') as open_connection:
+            assert await manager.probe(manager.backends[0]) is None
+
+        assert not open_connection.called
+
+    @pytest.mark.asyncio
+    async def test_probe_uses_limiter(self, tcp_manager, mock_connection, response_pong):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None, max_in_flight=1)
+        limiter = manager.backends[0].limiter
+        in_flight = []
+
+        def read(*args, **kwargs):
+            in_flight.append(limiter.in_flight)
+            return response_pong
+
+        mock_connection.side_effect = read
+
+        assert await manager.probe(manager.backends[0]) is True
+        assert in_flight[0] == 1
+        assert limiter.in_flight == 0
+
+    def test_health_check_defaults(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager])
+
+        assert manager.health_check_interval == 5.0
+        assert manager.health_check_timeout == 2.0
+
+    @pytest.mark.asyncio
+    async def test_probe_timeout(self, tcp_manager, event_loop):
+        manager = PooledConnectionManager([tcp_manager], loop=event_loop,
+                                          health_check_interval=None, health_check_timeout=0.01)
+
+        async def open_connection(*args, **kwargs):
+            await asyncio.sleep(1, loop=event_loop)
+
+        with patch('asyncio.open_connection', side_effect=open_connection):
+            assert await manager.probe(manager.backends[0]) is False
+
+    @pytest.mark.asyncio
+    async def test_health_checks_start_and_stop(self, tcp_manager, event_loop):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=0.01, loop=event_loop)
+        manager.check_backend = CoroutineMock()
+
+        manager.new_connection()
+        tasks = dict(manager._health_checks)
+        manager.new_connection()
+
+        assert manager._health_checks == tasks
+
+        await asyncio.sleep(0.05)
+        manager.stop_health_checks()
+
+        assert manager.check_backend.called
+        assert manager._health_checks is None
+
+    @pytest.mark.asyncio
+    async def test_health_checks_per_backend(self, tcp_manager, unix_manager, event_loop):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], health_check_interval=0.01, loop=event_loop)
+        slow, fast = manager.backends
+        checked = []
+
+        async def check_backend(backend):
+            checked.append(backend)
+            if backend is slow:
+                await asyncio.sleep(1, loop=event_loop)
+
+        manager.check_backend = CoroutineMock(side_effect=check_backend)
+        manager.start_health_checks()
+        await asyncio.sleep(0.1, loop=event_loop)
+        manager.stop_health_checks()
+
+        assert checked.count(slow) == 1
+        assert checked.count(fast) > 2
+
+    @pytest.mark.asyncio
+    async def test_health_checks_follow_update(self, tcp_manager, unix_manager, event_loop):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=0.01, loop=event_loop)
+        manager.check_backend = CoroutineMock()
+        manager.start_health_checks()
+        removed = manager._health_checks[manager.backends[0]]
+
+        manager.update([unix_manager])
+        await asyncio.sleep(0, loop=event_loop)
+
+        assert list(manager._health_checks) == manager.backends
+        assert removed.cancelled()
+        manager.stop_health_checks()
+
+    @pytest.mark.asyncio
+    async def test_check_backend_since_own_check(self, manager):
+        backend = manager.backends[0]
+        manager.probe = CoroutineMock(return_value=False)
+        manager.record_success(backend, 0.1)
+
+        await manager.check_backend(backend)
+        await manager.check_backend(backend)
+
+        assert backend.failures == 1
+
+    def test_close(self, tcp_manager, unix_manager, event_loop):
+        manager = PooledConnectionManager([tcp_manager, unix_manager], loop=event_loop)
+        manager.new_connection()
+        manager.backends[1].outstanding = 1
+        manager.update([tcp_manager])
+
+        with patch.object(tcp_manager, 'close') as close_tcp, patch.object(unix_manager, 'close') as close_unix:
+            manager.close()
+        event_loop.run_until_complete(asyncio.sleep(0))
+
+        assert manager._health_checks is None
+        assert manager.draining == []
+        close_tcp.assert_called_once_with()
+        close_unix.assert_called_once_with()
+
+
+class TestLimits:
+    def test_limiters_created(self, tcp_manager, unix_manager):
+        own = ConcurrencyLimiter(1)
+        manager = PooledConnectionManager([tcp_manager, Backend(unix_manager, limiter=own)],
+                                          health_check_interval=None,
+                                          max_in_flight=4,
+                                          max_queue=8)
+
+        assert manager.backends[0].limiter.limit == 4
+        assert manager.backends[0].limiter.max_queue == 8
+        assert manager.backends[1].limiter is own
+
+    def test_no_limiters_by_default(self, tcp_manager):
+        assert PooledConnectionManager([tcp_manager]).backends[0].limiter is None
+
+    def test_select_prefers_capacity(self, tcp_manager, unix_manager):
+        manager = PooledConnectionManager([tcp_manager, unix_manager],
+                                          health_check_interval=None,
+                                          max_in_flight=1)
+        manager.backends[0].limiter.in_flight = 1
+
+        assert all(manager.select() is manager.backends[1] for _ in range(4))
+
+    @pytest.mark.asyncio
+    async def test_queued_until_released(self, tcp_manager, mock_open, event_loop):
+        manager = PooledConnectionManager([tcp_manager],
+                                          loop=event_loop,
+                                          health_check_interval=None,
+                                          max_in_flight=1)
+        limiter = manager.backends[0].limiter
+
+        async def request():
+            async with manager.new_connection():
+                pass
+
+        async with manager.new_connection():
+            task = event_loop.create_task(request())
+            await asyncio.sleep(0)
+
+            assert limiter.queue_depth == 1
+
+        await task
+
+        assert limiter.in_flight == 0
+        assert limiter.queued == 1
+
+    @pytest.mark.asyncio
+    async def test_connect_failure_releases(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None, max_in_flight=1)
+
+        with patch('asyncio.open_connection', side_effect=ConnectionRefusedError):
+            with pytest.raises(AIOSpamcConnectionFailed):
+                async with manager.new_connection():
+                    pass
+
+        assert manager.backends[0].limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_full_not_a_failure(self, tcp_manager):
+        manager = PooledConnectionManager([tcp_manager], health_check_interval=None,
+                                          max_in_flight=1, max_queue=0)
+        manager.backends[0].limiter.in_flight = 1
+
+        with pytest.raises(AIOSpamcConnectionQueueFull):
+            async with manager.new_connection():
+                pass
+
+        assert manager.backends[0].failures == 0
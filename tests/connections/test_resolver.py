@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import asyncio
+import socket
+
+import pytest
+from asynctest import CoroutineMock, MagicMock, patch
+
+from aiospamc.connections.resolver import connect_first, interleave, Resolver
+from aiospamc.connections.tcp_connection import TcpConnection, TcpConnectionManager
+from aiospamc.exceptions import AIOSpamcConnectionFailed
+
+
+def info(family, address):
+    return (family, socket.SOCK_STREAM, 6, '', (address, 783))
+
+
+def streams():
+    return MagicMock(spec=asyncio.StreamReader), MagicMock(spec=asyncio.StreamWriter)
+
+
+def test_interleave():
+    infos = [info(socket.AF_INET6, '::1'),
+             info(socket.AF_INET6, '::2'),
+             info(socket.AF_INET6, '::1'),
+             info(socket.AF_INET, '127.0.0.1'),
+             info(socket.AF_INET, '127.0.0.2')]
+
+    assert interleave(infos) == ['::1', '127.0.0.1', '::2', '127.0.0.2']
+
+
+@pytest.mark.asyncio
+async def test_connect_first_after_failure(event_loop):
+    async def connect(address):
+        if address == 'a':
+            raise ConnectionRefusedError
+        return address, MagicMock()
+
+    assert (await connect_first(['a', 'b'], connect, delay=10, loop=event_loop))[0] == 'b'
+
+
+@pytest.mark.asyncio
+async def test_connect_first_staggers(event_loop):
+    started = []
+    cancelled = []
+
+    async def connect(address):
+        started.append(address)
+        try:
+            await asyncio.sleep(10 if address == 'a' else 0)
+        except asyncio.CancelledError:
+            cancelled.append(address)
+            raise
+        return address, MagicMock()
+
+    result = await connect_first(['a', 'b'], connect, delay=0.01, loop=event_loop)
+    await asyncio.sleep(0)
+
+    assert result[0] == 'b'
+    assert started == ['a', 'b']
+    assert cancelled == ['a']
+
+
+@pytest.mark.asyncio
+async def test_connect_first_all_fail(event_loop):
+    async def connect(address):
+        raise ConnectionRefusedError(address)
+
+    with pytest.raises(ConnectionRefusedError, match='b'):
+        await connect_first(['a', 'b'], connect, delay=10, loop=event_loop)
+
+
+@pytest.fixture
+def resolver(event_loop):
+    getaddrinfo = CoroutineMock(return_value=[info(socket.AF_INET, '192.0.2.1')])
+    with patch.object(event_loop, 'getaddrinfo', getaddrinfo):
+        yield Resolver(ttl=60, loop=event_loop)
+
+
+def test_repr():
+    assert repr(Resolver(ttl=30)) == 'Resolver(ttl=30)'
+
+
+@pytest.mark.asyncio
+async def test_resolve_address(resolver):
+    assert await resolver.resolve('::1', 783) == ['::1']
+    assert not resolver.loop.getaddrinfo.called
+
+
+@pytest.mark.asyncio
+async def test_resolve_cached(resolver):
+    assert await resolver.resolve('spamd', 783) == ['192.0.2.1']
+    assert await resolver.resolve('spamd', 783) == ['192.0.2.1']
+
+    assert resolver.lookups == 1
+    assert resolver.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_concurrent_once(resolver, event_loop):
+    results = await asyncio.gather(resolver.resolve('spamd', 783), resolver.resolve('spamd', 783), loop=event_loop)
+
+    assert results == [['192.0.2.1'], ['192.0.2.1']]
+    assert resolver.loop.getaddrinfo.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_refreshes_in_background(resolver):
+    await resolver.resolve('spamd', 783)
+    resolver.cache[('spamd', 783)] = (['192.0.2.1'], 0)
+    resolver.loop.getaddrinfo.return_value = [info(socket.AF_INET, '192.0.2.2')]
+
+    assert await resolver.resolve('spamd', 783) == ['192.0.2.1']
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert await resolver.resolve('spamd', 783) == ['192.0.2.2']
+
+
+@pytest.mark.asyncio
+async def test_resolve_failure_keeps_addresses(resolver):
+    await resolver.resolve('spamd', 783)
+    resolver.cache[('spamd', 783)] = (['192.0.2.1'], 0)
+    resolver.loop.getaddrinfo.side_effect = socket.gaierror
+
+    await resolver.resolve('spamd', 783)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert resolver.failures == 1
+    assert resolver.cache[('spamd', 783)][0] == ['192.0.2.1']
+    assert resolver.cache[('spamd', 783)][1] > 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_ignores_cache(resolver):
+    await resolver.resolve('spamd', 783)
+    resolver.loop.getaddrinfo.return_value = [info(socket.AF_INET, '192.0.2.2')]
+
+    assert await resolver.refresh('spamd', 783) == ['192.0.2.2']
+    assert await resolver.refresh('::1', 783) == ['::1']
+    assert resolver.lookups == 2
+
+
+@pytest.mark.asyncio
+async def test_resolve_failure(resolver):
+    resolver.loop.getaddrinfo.side_effect = socket.gaierror
+
+    with pytest.raises(OSError):
+        await resolver.resolve('spamd', 783)
+
+
+@pytest.mark.asyncio
+async def test_connection_tries_each_address(resolver, event_loop):
+    resolver.loop.getaddrinfo.return_value = [info(socket.AF_INET6, '2001:db8::1'), info(socket.AF_INET, '192.0.2.1')]
+    connection = TcpConnection('spamd', 783, False, event_loop, resolver=resolver)
+
+    with patch('asyncio.open_connection', side_effect=[ConnectionRefusedError, streams()]) as open_connection:
+        await connection.open()
+
+    assert [call[0][0] for call in open_connection.call_args_list] == ['2001:db8::1', '192.0.2.1']
+
+
+@pytest.mark.asyncio
+async def test_connection_resolve_failed(resolver, event_loop):
+    resolver.loop.getaddrinfo.side_effect = socket.gaierror
+    connection = TcpConnection('spamd', 783, False, event_loop, resolver=resolver)
+
+    with pytest.raises(AIOSpamcConnectionFailed):
+        await connection.open()
+
+
+@pytest.mark.asyncio
+async def test_address_managers(resolver, event_loop):
+    resolver.loop.getaddrinfo.return_value = [info(socket.AF_INET, '192.0.2.1'), info(socket.AF_INET, '192.0.2.2')]
+    manager = TcpConnectionManager('spamd', 783, ssl=True, loop=event_loop, resolver=resolver)
+    managers = await manager.address_managers()
+
+    assert [address_manager.host for address_manager in managers] == ['192.0.2.1', '192.0.2.2']
+    assert all(address_manager.server_hostname == 'spamd' for address_manager in managers)
+    assert all(address_manager.ssl is manager.ssl for address_manager in managers)
+
+
+@pytest.mark.asyncio
+async def test_address_managers_refresh(resolver, event_loop):
+    manager = TcpConnectionManager('spamd', 783, loop=event_loop, resolver=resolver)
+    await manager.address_managers()
+    resolver.loop.getaddrinfo.return_value = [info(socket.AF_INET, '192.0.2.2')]
+
+    assert [address_manager.host for address_manager in await manager.address_managers()] == ['192.0.2.1']
+    assert [address_manager.host for address_manager in await manager.address_managers(refresh=True)] == \
+        ['192.0.2.2']
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_lookups(resolver, event_loop):
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    resolver.loop.getaddrinfo.side_effect = hang
+    lookup = asyncio.ensure_future(resolver.resolve('spamd', 783), loop=event_loop)
+    await asyncio.sleep(0)
+
+    resolver.close()
+
+    with pytest.raises(asyncio.CancelledError):
+        await lookup
+
+
+@pytest.mark.asyncio
+async def test_manager_closes_own_resolver(resolver, event_loop):
+    shared = TcpConnectionManager('spamd', 783, loop=event_loop, resolver=resolver)
+    own = TcpConnectionManager('spamd', 783, loop=event_loop)
+
+    with patch.object(resolver, 'close') as close_shared, patch.object(own.resolver, 'close') as close_own:
+        shared.close()
+        own.close()
+
+    close_shared.assert_not_called()
+    close_own.assert_called_once_with()
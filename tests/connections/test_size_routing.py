@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+import asyncio
+
+import pytest
+from asynctest import CoroutineMock, MagicMock, Mock
+
+from aiospamc.connections import ConnectionManager
+from aiospamc.connections.pooled_connection import PooledConnectionManager
+from aiospamc.connections.size_routing import RoutedConnection, SizeRoutingConnectionManager
+from aiospamc.connections.tcp_connection import TcpConnectionManager
+from aiospamc.connections.unix_connection import UnixConnectionManager
+from aiospamc.exceptions import AIOSpamcConnectionFailed, AIOSpamcConnectionQueueFull
+
+
+def make_manager(routed=False):
+    manager = Mock(spec=TcpConnectionManager('127.0.0.1', 783))
+    manager.routed = routed
+    manager.loop = asyncio.get_event_loop()
+    manager.new_connection.return_value = MagicMock(__aenter__=CoroutineMock(), __aexit__=CoroutineMock())
+
+    return manager
+
+
+def test_repr():
+    manager = SizeRoutingConnectionManager(TcpConnectionManager('127.0.0.1', 783),
+                                           TcpConnectionManager('127.0.0.1', 784),
+                                           threshold=1024)
+
+    assert repr(manager) == ("SizeRoutingConnectionManager(manager=TcpConnectionManager(host='127.0.0.1', "
+                             "port=783, ssl=False), heavy_manager=TcpConnectionManager(host='127.0.0.1', "
+                             "port=784, ssl=False), threshold=1024)")
+
+
+def test_routed():
+    assert ConnectionManager.routed is False
+    assert SizeRoutingConnectionManager.routed is True
+
+
+def test_no_limit_by_default():
+    manager = SizeRoutingConnectionManager(make_manager(), make_manager())
+
+    assert manager.threshold == 2 ** 20
+    assert manager.limiter is None
+
+
+def test_limiter():
+    manager = SizeRoutingConnectionManager(make_manager(), make_manager(),
+                                           max_in_flight=2, max_queue=5, max_wait=1.5)
+
+    assert manager.limiter.limit == 2
+    assert manager.limiter.max_queue == 5
+    assert manager.limiter.max_wait == 1.5
+
+
+@pytest.mark.parametrize('light,heavy,expected', [
+    (UnixConnectionManager('/var/run/spamassassin/spamd.sock'),
+     UnixConnectionManager('/var/run/spamassassin/bulk.sock'),
+     True),
+    (UnixConnectionManager('/var/run/spamassassin/spamd.sock'), TcpConnectionManager('127.0.0.1', 783), False),
+    (TcpConnectionManager('127.0.0.1', 783), UnixConnectionManager('/var/run/spamassassin/bulk.sock'), False),
+])
+def test_local(light, heavy, expected):
+    assert SizeRoutingConnectionManager(light, heavy).local is expected
+
+
+@pytest.mark.parametrize('size,heavy', [
+    (None, False),
+    (0, False),
+    (1023, False),
+    (1024, True),
+    (4096, True),
+])
+def test_new_connection_by_size(size, heavy):
+    light_manager, heavy_manager = make_manager(), make_manager()
+    manager = SizeRoutingConnectionManager(light_manager, heavy_manager, threshold=1024, max_in_flight=1)
+
+    connection = manager.new_connection(size=size)
+
+    assert isinstance(connection, RoutedConnection)
+    if heavy:
+        assert connection.connection is heavy_manager.new_connection.return_value
+        assert connection.limiter is manager.limiter
+        assert manager.heavy_requests == 1
+        light_manager.new_connection.assert_not_called()
+    else:
+        assert connection.connection is light_manager.new_connection.return_value
+        assert connection.limiter is None
+        assert manager.requests == 1
+        heavy_manager.new_connection.assert_not_called()
+
+
+def test_new_connection_forwards_to_routed_manager():
+    light_manager = make_manager(routed=True)
+    manager = SizeRoutingConnectionManager(light_manager, make_manager())
+
+    manager.new_connection(avoid=['backend'], key=b'user', size=10)
+
+    light_manager.new_connection.assert_called_once_with(['backend'], b'user', 10)
+
+
+def test_new_connection_not_routed_manager():
+    heavy_manager = make_manager()
+    manager = SizeRoutingConnectionManager(make_manager(), heavy_manager, threshold=10)
+
+    manager.new_connection(avoid=['backend'], key=b'user', size=10)
+
+    heavy_manager.new_connection.assert_called_once_with()
+
+
+def test_new_connection_pool():
+    pool = PooledConnectionManager([TcpConnectionManager('127.0.0.1', 783),
+                                    TcpConnectionManager('127.0.0.1', 784)])
+    manager = SizeRoutingConnectionManager(make_manager(), pool, threshold=10)
+
+    connection = manager.new_connection(size=10)
+
+    assert connection.connection.manager is pool
+
+
+def test_backend():
+    inner = MagicMock()
+    inner.backend = 'backend'
+
+    assert RoutedConnection(inner).backend == 'backend'
+    assert RoutedConnection(object()).backend is None
+
+
+@pytest.mark.asyncio
+async def test_routed_connection_holds_limiter(event_loop):
+    manager = SizeRoutingConnectionManager(make_manager(), make_manager(),
+                                           threshold=10, max_in_flight=1, loop=event_loop)
+    connection = manager.new_connection(size=10)
+
+    async with connection as conn:
+        assert conn is connection.connection.__aenter__.return_value
+        assert manager.limiter.in_flight == 1
+
+    assert manager.limiter.in_flight == 0
+    connection.connection.__aexit__.assert_called_once_with(None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_light_requests_not_limited(event_loop):
+    manager = SizeRoutingConnectionManager(make_manager(), make_manager(),
+                                           threshold=10, max_in_flight=1, loop=event_loop)
+    heavy = manager.new_connection(size=10)
+    light = manager.new_connection(size=9)
+
+    async with heavy:
+        async with light:
+            assert manager.limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_heavy_requests_queue(event_loop):
+    manager = SizeRoutingConnectionManager(make_manager(), make_manager(),
+                                           threshold=10, max_in_flight=1, loop=event_loop)
+    first = manager.new_connection(size=10)
+    second = manager.new_connection(size=10)
+
+    await first.__aenter__()
+    waiting = asyncio.ensure_future(second.__aenter__(), loop=event_loop)
+    await asyncio.sleep(0)
+
+    assert not waiting.done()
+    assert manager.limiter.queue_depth == 1
+
+    await first.__aexit__(None, None, None)
+    await waiting
+    await second.__aexit__(None, None, None)
+
+    assert manager.limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_heavy_queue_full(event_loop):
+    manager = SizeRoutingConnectionManager(make_manager(), make_manager(),
+                                           threshold=10, max_in_flight=1, max_queue=0, loop=event_loop)
+    first = manager.new_connection(size=10)
+    await first.__aenter__()
+
+    with pytest.raises(AIOSpamcConnectionQueueFull):
+        await manager.new_connection(size=10).__aenter__()
+
+    await first.__aexit__(None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_limiter_released_when_connect_fails(event_loop):
+    heavy_manager = make_manager()
+    heavy_manager.new_connection.return_value.__aenter__.side_effect = AIOSpamcConnectionFailed
+    manager = SizeRoutingConnectionManager(make_manager(), heavy_manager,
+                                           threshold=10, max_in_flight=1, loop=event_loop)
+
+    with pytest.raises(AIOSpamcConnectionFailed):
+        await manager.new_connection(size=10).__aenter__()
+
+    assert manager.limiter.in_flight == 0
+
+
+def test_close():
+    light_manager, heavy_manager = make_manager(), make_manager()
+
+    SizeRoutingConnectionManager(light_manager, heavy_manager).close()
+
+    light_manager.close.assert_called_once_with()
+    heavy_manager.close.assert_called_once_with()
@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
 import asyncio
+import ssl
 
 import pytest
-from asynctest import patch, MagicMock
+from asynctest import patch, MagicMock, Mock
 
 from aiospamc.connections.tcp_connection import TcpConnection, TcpConnectionManager
+from aiospamc.connections.tls import create_ssl_context, SessionCachingContext
 from aiospamc.exceptions import AIOSpamcConnectionFailed
 
 
@@ -29,7 +31,17 @@ class TestTcpConnectionManager:
         assert 'conn_man' in locals()
         assert conn_man.host is LOCALHOST
         assert conn_man.port is PORT
-        assert conn_man.ssl is True
+        assert isinstance(conn_man.ssl, SessionCachingContext)
+
+    def test_ssl_context_shared(self):
+        context = create_ssl_context()
+        conn_man = TcpConnectionManager(host=LOCALHOST,
+                                        port=PORT,
+                                        ssl=context)
+
+        assert conn_man.ssl is context
+        assert conn_man.new_connection().ssl is context
+        assert repr(conn_man).endswith('ssl=True)')
 
     def test_instantiates_with_loop(self, event_loop):
         conn_man = TcpConnectionManager(host=LOCALHOST,
@@ -143,3 +155,50 @@ class TestTcpConnection:
                              ssl=False)
 
         assert conn.connection_string == '{}:{}'.format(LOCALHOST, PORT)
+
+
+@pytest.mark.asyncio
+async def test_close_saves_session():
+    context = create_ssl_context()
+    ssl_object = Mock(session='session', session_reused=False)
+    writer = MagicMock(spec=asyncio.StreamWriter)
+    writer.get_extra_info.return_value = ssl_object
+
+    with patch('asyncio.open_connection', return_value=(MagicMock(spec=asyncio.StreamReader), writer)):
+        async with TcpConnection(LOCALHOST, PORT, context):
+            pass
+
+    writer.get_extra_info.assert_called_with('ssl_object')
+    assert context.sessions == {(LOCALHOST, LOCALHOST, PORT): 'session'}
+    assert context.handshakes == 1
+
+
+@pytest.mark.asyncio
+async def test_sessions_per_address_behind_one_name():
+    context = create_ssl_context()
+    writer = MagicMock(spec=asyncio.StreamWriter)
+    writer.get_extra_info.side_effect = [Mock(session='first'), Mock(session='second')]
+
+    with patch('asyncio.open_connection', return_value=(MagicMock(spec=asyncio.StreamReader), writer)) as open_:
+        for address in ('192.0.2.1', '192.0.2.2'):
+            async with TcpConnection(address, PORT, context, server_hostname='spamd'):
+                pass
+
+    assert [call[1]['ssl'].host for call in open_.call_args_list] == ['192.0.2.1', '192.0.2.2']
+    assert all(call[1]['server_hostname'] == 'spamd' for call in open_.call_args_list)
+    assert context.sessions == {('spamd', '192.0.2.1', PORT): 'first', ('spamd', '192.0.2.2', PORT): 'second'}
+
+
+@pytest.mark.asyncio
+async def test_abort_does_not_save_session():
+    context = create_ssl_context()
+    writer = MagicMock(spec=asyncio.StreamWriter)
+    writer.get_extra_info.return_value = Mock(session='session', session_reused=False)
+
+    with patch('asyncio.open_connection', return_value=(MagicMock(spec=asyncio.StreamReader), writer)):
+        with pytest.raises(asyncio.CancelledError):
+            async with TcpConnection(LOCALHOST, PORT, context):
+                raise asyncio.CancelledError
+
+    assert writer.transport.abort.called
+    assert context.sessions == {}
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import ssl
+
+import pytest
+from asynctest import Mock, patch
+
+from aiospamc.connections.tls import create_ssl_context, SessionCachingContext
+
+
+def test_create_verifies():
+    context = create_ssl_context()
+
+    assert isinstance(context, SessionCachingContext)
+    assert context.verify_mode == ssl.CERT_REQUIRED
+    assert context.check_hostname is True
+
+
+def test_create_without_verify():
+    context = create_ssl_context(verify=False)
+
+    assert context.verify_mode == ssl.CERT_NONE
+    assert context.check_hostname is False
+
+
+def test_create_pins_authorities():
+    with patch.object(SessionCachingContext, 'load_verify_locations') as load_verify_locations, \
+            patch.object(SessionCachingContext, 'load_default_certs') as load_default_certs:
+        create_ssl_context(cafile='ca.pem')
+
+    load_verify_locations.assert_called_once_with('ca.pem', None, None)
+    assert not load_default_certs.called
+
+
+def test_create_client_certificate():
+    with patch.object(SessionCachingContext, 'load_cert_chain') as load_cert_chain:
+        create_ssl_context(certfile='client.pem', keyfile='client.key')
+
+    load_cert_chain.assert_called_once_with('client.pem', 'client.key', None)
+
+
+def test_save_session():
+    context = create_ssl_context()
+    context.save_session('spamd1', '192.0.2.1', 783, Mock(session='first', session_reused=False))
+    context.save_session('spamd1', '192.0.2.1', 783, Mock(session='second', session_reused=True))
+
+    assert context.sessions == {('spamd1', '192.0.2.1', 783): 'second'}
+    assert context.handshakes == 2
+    assert context.resumed == 1
+
+
+def test_save_session_without_tls():
+    context = create_ssl_context()
+    context.save_session('spamd1', '192.0.2.1', 783, None)
+
+    assert context.sessions == {}
+    assert context.handshakes == 0
+
+
+def test_sessions_per_address():
+    context = create_ssl_context()
+    context.save_session('spamd', '192.0.2.1', 783, Mock(session='first', session_reused=False))
+    context.save_session('spamd', '192.0.2.2', 783, Mock(session='second', session_reused=False))
+
+    with patch.object(ssl.SSLContext, 'wrap_bio') as wrap_bio:
+        context.server('192.0.2.1', 783).wrap_bio(ssl.MemoryBIO(), ssl.MemoryBIO(), server_hostname='spamd')
+        context.server('192.0.2.2', 783).wrap_bio(ssl.MemoryBIO(), ssl.MemoryBIO(), server_hostname='spamd')
+
+    assert [call[1]['session'] for call in wrap_bio.call_args_list] == ['first', 'second']
+
+
+@pytest.mark.parametrize('server_hostname,port,expected', [
+    ('spamd1', 783, 'session'),
+    ('spamd2', 783, None),
+    ('spamd1', 784, None),
+])
+def test_wrap_bio_offers_session(server_hostname, port, expected):
+    context = create_ssl_context()
+    context.sessions[('spamd1', '192.0.2.1', 783)] = 'session'
+
+    with patch.object(ssl.SSLContext, 'wrap_bio') as wrap_bio:
+        context.server('192.0.2.1', port).wrap_bio(ssl.MemoryBIO(), ssl.MemoryBIO(), server_hostname=server_hostname)
+
+    assert wrap_bio.call_args[1].get('session') == expected
+
+
+def test_server_context_delegates():
+    context = create_ssl_context()
+    server = context.server('192.0.2.1', 783)
+
+    assert repr(server) == "ServerContext(host='192.0.2.1', port=783)"
+    assert server.verify_mode == context.verify_mode
+    assert server.sessions is context.sessions
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import asyncio
+
+import pytest
+from asynctest import MagicMock, patch
+
+from aiospamc.connections.tcp_connection import TcpConnection, TcpConnectionManager
+from aiospamc.connections.unix_connection import UnixConnectionManager
+from aiospamc.connections.warm_pool import WarmConnectionManager
+from aiospamc.exceptions import AIOSpamcConnectionFailed
+
+
+def make_streams(*args, **kwargs):
+    reader = MagicMock(spec=asyncio.StreamReader)
+    reader.at_eof.return_value = False
+    reader.exception.return_value = None
+    writer = MagicMock(spec=asyncio.StreamWriter)
+    writer.transport.is_closing.return_value = False
+
+    return reader, writer
+
+
+@pytest.fixture
+def open_connection():
+    with patch('asyncio.open_connection', side_effect=make_streams) as open_connection:
+        yield open_connection
+
+
+@pytest.fixture
+def manager(event_loop):
+    manager = WarmConnectionManager(TcpConnectionManager('127.0.0.1', 783, loop=event_loop),
+                                    size=2,
+                                    retry_delay=0.01)
+    yield manager
+    manager.close()
+    event_loop.run_until_complete(asyncio.sleep(0))
+
+
+def test_repr():
+    manager = WarmConnectionManager(TcpConnectionManager('127.0.0.1', 783), size=3, max_idle_time=5)
+
+    assert repr(manager) == ("WarmConnectionManager(manager=TcpConnectionManager(host='127.0.0.1', port=783, "
+                             "ssl=False), size=3, max_idle_time=5)")
+
+
+def test_size_less_than_one():
+    with pytest.raises(ValueError):
+        WarmConnectionManager(TcpConnectionManager('127.0.0.1', 783), size=0)
+
+
+@pytest.mark.parametrize('inner,expected', [
+    (TcpConnectionManager('127.0.0.1', 783), False),
+    (UnixConnectionManager('/var/run/spamassassin/spamd.sock'), True),
+])
+def test_local(inner, expected):
+    assert WarmConnectionManager(inner).local is expected
+
+
+@pytest.mark.asyncio
+async def test_fills_pool(manager, open_connection):
+    manager.start()
+    await asyncio.sleep(0.01)
+
+    assert len(manager.idle) == 2
+    assert manager.opened == 2
+
+
+@pytest.mark.asyncio
+async def test_uses_idle_connection(manager, open_connection):
+    manager.start()
+    await asyncio.sleep(0.01)
+    idle = manager.idle[0][0]
+
+    async with manager.new_connection() as connection:
+        assert connection is idle
+
+    assert manager.hits == 1
+    assert connection.connected is False
+
+    await asyncio.sleep(0.01)
+
+    assert len(manager.idle) == 2
+
+
+@pytest.mark.asyncio
+async def test_connects_when_empty(manager, open_connection):
+    async with manager.new_connection() as connection:
+        assert isinstance(connection, TcpConnection)
+        assert connection.connected
+
+    assert manager.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_discards_closed_connection(manager, open_connection):
+    manager.start()
+    await asyncio.sleep(0.01)
+    closed = manager.idle[0][0]
+    closed.reader.at_eof.return_value = True
+
+    async with manager.new_connection() as connection:
+        assert connection is not closed
+
+    assert manager.expired == 1
+    assert closed.connected is False
+
+
+@pytest.mark.asyncio
+async def test_discards_aged_connection(event_loop, open_connection):
+    manager = WarmConnectionManager(TcpConnectionManager('127.0.0.1', 783, loop=event_loop),
+                                    size=1,
+                                    max_idle_time=0.02)
+    manager.start()
+    await asyncio.sleep(0.05)
+    manager.close()
+    await asyncio.sleep(0)
+
+    assert manager.expired >= 1
+    assert manager.opened == manager.expired + 1
+
+
+@pytest.mark.asyncio
+async def test_retries_after_failure(manager):
+    with patch('asyncio.open_connection', side_effect=ConnectionRefusedError):
+        manager.start()
+        await asyncio.sleep(0.005)
+
+    assert manager.failures == 1
+    assert not manager.idle
+
+    with patch('asyncio.open_connection', side_effect=make_streams):
+        await asyncio.sleep(0.02)
+
+    assert len(manager.idle) == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_after_unexpected_error(manager, open_connection):
+    with patch.object(manager.manager, 'new_connection', side_effect=RuntimeError):
+        manager.start()
+        await asyncio.sleep(0.005)
+
+    assert manager.failures == 1
+    assert not manager._refill.done()
+
+    await asyncio.sleep(0.02)
+
+    assert len(manager.idle) == 2
+
+
+@pytest.mark.asyncio
+async def test_restarts_stopped_refill(manager, open_connection, event_loop):
+    stopped = event_loop.create_future()
+    stopped.set_exception(RuntimeError())
+    manager._refill = stopped
+
+    async with manager.new_connection():
+        pass
+
+    assert manager._refill is not stopped
+    await asyncio.sleep(0.01)
+    assert len(manager.idle) == 2
+
+
+@pytest.mark.asyncio
+async def test_close(manager, open_connection):
+    manager.start()
+    await asyncio.sleep(0.01)
+    idle = [connection for connection, _ in manager.idle]
+    with patch.object(manager.manager, 'close') as close:
+        manager.close()
+
+    assert not manager.idle
+    assert all(connection.connected is False for connection in idle)
+    close.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_connect_failed(manager):
+    with patch('asyncio.open_connection', side_effect=ConnectionRefusedError):
+        with pytest.raises(AIOSpamcConnectionFailed):
+            async with manager.new_connection():
+                pass
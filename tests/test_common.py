@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
+import os
 import zlib
 
 import pytest
 
-from aiospamc.common import RequestResponseBase
+from aiospamc.common import FileBody, RequestResponseBase
 from aiospamc.headers import Compress, ContentLength
 
 
@@ -35,9 +36,9 @@ def test_common_instantiates_with_headers():
 
 
 @pytest.mark.parametrize('test_input,headers,expected', [
-    (b'Test body\n', [], 'Test body\n'),
+    (b'Test body\n', [], b'Test body\n'),
     (b'', [], None),
-    (zlib.compress('Test body\n'.encode()), [Compress()], 'Test body\n')
+    (zlib.compress('Test body\n'.encode()), [Compress()], b'Test body\n')
 ])
 def test_common_parse_body(test_input, headers, expected):
     body = RequestResponseBase._decode_body(test_input, headers)
@@ -45,6 +46,31 @@ def test_common_parse_body(test_input, headers, expected):
     assert body == expected
 
 
+def test_common_str_body_encoded():
+    req_resp_base = RequestResponseBase(body='Test body\n')
+
+    assert req_resp_base.body == b'Test body\n'
+
+
+def test_common_bytes_body_not_decoded():
+    body = b'\xe9t\xe9\n'
+    req_resp_base = RequestResponseBase(body=body)
+
+    assert req_resp_base.body is body
+
+
+@pytest.mark.parametrize('body,encoding,errors,expected', [
+    (b'Test body\n', 'utf-8', 'strict', 'Test body\n'),
+    (bytearray(b'Test body\n'), 'utf-8', 'strict', 'Test body\n'),
+    (b'\xe9t\xe9\n', 'latin-1', 'strict', '\xe9t\xe9\n'),
+    (b'\xe9t\xe9\n', 'utf-8', 'replace', '\ufffdt\ufffd\n'),
+])
+def test_common_text(body, encoding, errors, expected):
+    req_resp_base = RequestResponseBase(body=body)
+
+    assert req_resp_base.text(encoding, errors) == expected
+
+
 def test_common_content_length_added():
     req_resp_base = RequestResponseBase()
     req_resp_base.body = 'Test body\n'
@@ -100,3 +126,71 @@ def test_common_delete_header():
     req_resp_base.delete_header('Content-length')
 
     assert 'Content-length' not in req_resp_base._headers.keys()
+
+
+def test_file_body_length(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        body = FileBody(file)
+
+        assert len(body) == len(spam.encode())
+        assert body.offset == 0
+
+
+def test_file_body_offset_count(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        body = FileBody(file, offset=8, count=4)
+
+        assert len(body) == 4
+        assert bytes(body) == spam.encode()[8:12]
+
+
+def test_file_body_fd(spam_file, spam):
+    fd = os.open(spam_file, os.O_RDONLY)
+    try:
+        body = FileBody(fd)
+
+        assert bytes(body) == spam.encode()
+    finally:
+        os.close(fd)
+
+
+def test_file_body_chunks(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        body = FileBody(file)
+        body.chunk_size = 100
+
+        chunks = list(body.chunks())
+
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert b''.join(chunks) == spam.encode()
+        assert b''.join(body.chunks()) == spam.encode()
+
+
+def test_file_body_chunks_file_too_short(spam_file):
+    with open(spam_file, 'rb') as file:
+        body = FileBody(file, count=os.fstat(file.fileno()).st_size + 1)
+
+        with pytest.raises(EOFError):
+            bytes(body)
+
+
+def test_file_body_repr(spam_file):
+    with open(spam_file, 'rb') as file:
+        body = FileBody(file, offset=1, count=2)
+
+        assert repr(body) == 'FileBody(file={}, offset=1, length=2)'.format(repr(file))
+
+
+def test_common_file_body_content_length(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        req_resp_base = RequestResponseBase(body=FileBody(file))
+
+        assert req_resp_base.get_header('Content-length').length == len(spam.encode())
+
+
+def test_common_file_body_compressed(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        req_resp_base = RequestResponseBase(body=FileBody(file), headers=(Compress(),))
+
+        assert zlib.decompress(req_resp_base._compressed_body) == spam.encode()
+        assert req_resp_base.get_header('Content-length').length == len(req_resp_base._compressed_body)
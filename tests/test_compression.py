@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+import os
+import zlib
+
+import pytest
+from asynctest import Mock
+
+from aiospamc.common import FileBody, RequestResponseBase
+from aiospamc.compression import body_size, CompressionExecutor, CompressionPolicy, Compressor
+from aiospamc.connections.pooled_connection import PooledConnectionManager
+from aiospamc.connections.tcp_connection import TcpConnectionManager
+from aiospamc.connections.unix_connection import UnixConnectionManager
+
+
+def test_compressor_repr():
+    assert repr(Compressor(level=9, wbits=12)) == 'Compressor(level=9, wbits=12)'
+
+
+@pytest.mark.parametrize('level,wbits', [
+    (-2, 15),
+    (10, 15),
+    (6, 8),
+    (6, 16),
+    (6, -15),
+])
+def test_compressor_out_of_range(level, wbits):
+    with pytest.raises(ValueError):
+        Compressor(level=level, wbits=wbits)
+
+
+@pytest.mark.parametrize('level,wbits', [
+    (0, 15),
+    (1, 9),
+    (9, 12),
+])
+def test_compressor_compress(level, wbits):
+    body = b'Test body\n' * 1000
+    compressor = Compressor(level=level, wbits=wbits, chunk_size=100)
+
+    assert zlib.decompress(compressor.compress(body)) == body
+
+
+def test_compressor_chunks():
+    compressor = Compressor(chunk_size=4)
+
+    assert [bytes(chunk) for chunk in compressor.chunks(b'Test body\n')] == [b'Test', b' bod', b'y\n']
+
+
+def test_compressor_chunks_file_body(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        chunks = Compressor().chunks(FileBody(file))
+
+        assert b''.join(chunks) == spam.encode()
+
+
+@pytest.mark.asyncio
+async def test_compressor_compress_chunks():
+    chunks = [b'Test ', b'body\n']
+
+    assert zlib.decompress(await Compressor().compress_chunks(chunks)) == b'Test body\n'
+
+
+@pytest.mark.asyncio
+async def test_compressor_compress_async_chunks():
+    class Chunks:
+        def __init__(self, chunks):
+            self.chunks = iter(chunks)
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(self.chunks)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    compressed = await Compressor().compress_chunks(Chunks([b'Test ', b'body\n']))
+
+    assert zlib.decompress(compressed) == b'Test body\n'
+
+
+@pytest.mark.asyncio
+async def test_common_compress(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        req_resp_base = RequestResponseBase(body=FileBody(file))
+        await req_resp_base.compress(Compressor(level=9))
+
+        assert 'Compress' in req_resp_base._headers
+        assert zlib.decompress(req_resp_base._compressed_body) == spam.encode()
+        assert req_resp_base.get_header('Content-length').length == len(req_resp_base._compressed_body)
+
+
+@pytest.mark.asyncio
+async def test_common_compress_new_body():
+    req_resp_base = RequestResponseBase(body='First\n')
+    await req_resp_base.compress()
+    req_resp_base.body = 'Second\n'
+
+    assert zlib.decompress(req_resp_base._compressed_body) == b'Second\n'
+
+
+def test_body_size(spam_file, spam):
+    assert body_size(memoryview(b'abcd').cast('I')) == 4
+    with open(spam_file, 'rb') as file:
+        assert body_size(FileBody(file)) == len(spam.encode())
+
+
+def test_executor_default_workers(monkeypatch):
+    monkeypatch.setattr('os.cpu_count', lambda: 3)
+
+    assert CompressionExecutor().max_workers == 3
+
+
+def test_executor_repr():
+    assert repr(CompressionExecutor(threshold=10, max_workers=2)) == \
+        'CompressionExecutor(threshold=10, max_workers=2)'
+
+
+@pytest.mark.asyncio
+async def test_executor_inline_below_threshold():
+    executor = CompressionExecutor(threshold=100)
+
+    compressed = await executor.compress(b'Test body\n')
+
+    assert zlib.decompress(compressed) == b'Test body\n'
+    assert executor.inline == 1
+    assert executor.offloaded == 0
+
+
+@pytest.mark.asyncio
+async def test_executor_offloads_above_threshold():
+    body = b'Test body\n' * 10
+    executor = CompressionExecutor(threshold=1, max_workers=1)
+
+    compressed = await executor.compress(body, Compressor(level=9))
+    decompressed = await executor.decompress(compressed)
+
+    assert decompressed == body
+    assert executor.offloaded == 2
+    assert executor.pending == 0
+    assert executor.queue_time_max >= executor.mean_queue_time >= 0
+
+
+@pytest.mark.asyncio
+async def test_executor_decompress_error():
+    executor = CompressionExecutor(threshold=0, max_workers=1)
+
+    with pytest.raises(zlib.error):
+        await executor.decompress(b'not zlib')
+    assert executor.pending == 0
+
+
+def test_executor_mean_queue_time_empty():
+    assert CompressionExecutor().mean_queue_time == 0.0
+
+
+@pytest.mark.asyncio
+async def test_common_compress_with_executor():
+    executor = CompressionExecutor(threshold=0, max_workers=1)
+    req_resp_base = RequestResponseBase(body='Test body\n')
+
+    await req_resp_base.compress(executor=executor)
+
+    assert zlib.decompress(req_resp_base._compressed_body) == b'Test body\n'
+    assert executor.offloaded == 1
+
+
+def test_policy_repr():
+    assert repr(CompressionPolicy(min_size=10)) == \
+        'CompressionPolicy(compressor=Compressor(level=-1, wbits=15), min_size=10, link_throughput=None)'
+
+
+def test_policy_local_manager():
+    policy = CompressionPolicy(min_size=0, link_throughput=1)
+
+    assert policy.should_compress(b'Test body\n' * 1000, UnixConnectionManager('/path')) is False
+
+
+def test_policy_small_body():
+    policy = CompressionPolicy(min_size=100, link_throughput=1)
+
+    assert policy.should_compress(b'Test body\n', TcpConnectionManager('localhost', 783)) is False
+
+
+def test_policy_unknown_link():
+    policy = CompressionPolicy(min_size=0)
+
+    assert policy.should_compress(b'Test body\n' * 1000, TcpConnectionManager('localhost', 783)) is False
+    assert policy.compress_throughput is None
+
+
+@pytest.mark.parametrize('link_throughput,expected', [
+    (1, True),
+    (1e15, False),
+])
+def test_policy_link_throughput(link_throughput, expected):
+    policy = CompressionPolicy(min_size=0, link_throughput=link_throughput)
+
+    assert policy.should_compress(b'Test body\n' * 1000, TcpConnectionManager('localhost', 783)) is expected
+
+
+def test_policy_incompressible_body():
+    policy = CompressionPolicy(min_size=0, link_throughput=1)
+
+    assert policy.should_compress(os.urandom(2 ** 14), TcpConnectionManager('localhost', 783)) is False
+
+
+def test_policy_sample():
+    policy = CompressionPolicy(sample_size=100)
+    policy.sample(b'a' * 1000)
+
+    assert policy.ratio < 0.5
+    assert policy.compress_throughput > 0
+
+
+def test_policy_sample_interval():
+    policy = CompressionPolicy(min_size=0, link_throughput=1, sample_interval=2)
+    policy.sample = Mock(wraps=policy.sample)
+    manager = TcpConnectionManager('localhost', 783)
+
+    for _ in range(5):
+        policy.should_compress(b'Test body\n' * 1000, manager)
+
+    assert policy.sample.call_count == 3
+
+
+def test_policy_sample_file_body(spam_file):
+    policy = CompressionPolicy()
+    with open(spam_file, 'rb') as file:
+        policy.sample(FileBody(file))
+
+    assert policy.compress_throughput > 0
+
+
+def test_policy_record_transfer():
+    policy = CompressionPolicy(min_transfer_size=10, smoothing=0.5)
+    manager = TcpConnectionManager('localhost', 783)
+
+    policy.record_transfer(manager, 1000, 1.5)
+
+    assert manager not in policy.link_throughputs
+
+    policy.record_transfer(manager, 5, 0.5)
+    policy.record_transfer(manager, 1000, 1.5)
+    policy.record_transfer(manager, 3000, 1.5)
+
+    assert policy.response_times[manager] == 0.5
+    assert policy.link_throughputs[manager] == 2000
+
+
+def test_policy_record_transfer_faster_than_response_time():
+    policy = CompressionPolicy(min_transfer_size=10)
+    manager = TcpConnectionManager('localhost', 783)
+    policy.record_transfer(manager, 5, 0.5)
+    policy.record_transfer(manager, 1000, 0.4)
+
+    assert manager not in policy.link_throughputs
+
+
+def test_policy_pool_uses_median_backend():
+    policy = CompressionPolicy(min_size=0, link_throughput=1e15)
+    policy.compress_throughput, policy.ratio = 100, 0.5
+    pool = PooledConnectionManager([TcpConnectionManager('127.0.0.{}'.format(index), 783) for index in (1, 2, 3)],
+                                   health_check_interval=None)
+    for backend, throughput in zip(pool.backends, (10, 40, 1000)):
+        policy.link_throughputs[backend] = throughput
+
+    assert policy._link_throughput(pool) == 40
+    assert policy.should_compress(b'Test body\n' * 1000, pool) is True
+
+
+def test_policy_measured_link_overrides_default():
+    policy = CompressionPolicy(min_size=0, link_throughput=1, min_transfer_size=0)
+    manager = TcpConnectionManager('localhost', 783)
+    policy.link_throughputs[manager] = 1e15
+
+    assert policy.should_compress(b'Test body\n' * 1000, manager) is False
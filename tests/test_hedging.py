@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from aiospamc.common import FileBody
+from aiospamc.hedging import HedgePolicy
+from aiospamc.requests import Request
+
+
+def test_repr():
+    assert repr(HedgePolicy(verbs=('CHECK',))) == "HedgePolicy(quantile=0.95, max_rate=0.05, verbs=['CHECK'])"
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'quantile': 1},
+    {'max_rate': 2},
+])
+def test_invalid(kwargs):
+    with pytest.raises(ValueError):
+        HedgePolicy(**kwargs)
+
+
+@pytest.mark.parametrize('verb,expected', [
+    ('CHECK', True),
+    ('SYMBOLS', True),
+    ('REPORT', True),
+    ('HEADERS', True),
+    ('PROCESS', False),
+    ('REPORT_IFSPAM', False),
+    ('TELL', False),
+    ('PING', False),
+])
+def test_applies(verb, expected):
+    assert HedgePolicy().applies(Request(verb)) is expected
+
+
+def test_file_body_not_hedged(tmpdir):
+    path = tmpdir.join('message')
+    path.write_binary(b'Test body\n')
+
+    with open(str(path), 'rb') as file:
+        request = Request('CHECK', body=FileBody(file))
+
+        assert HedgePolicy().applies(request) is False
+        assert HedgePolicy().applies(request.prepare()) is False
+
+
+def test_default_delay_before_min_samples():
+    policy = HedgePolicy(min_samples=2, default_delay=0.5)
+    policy.record('CHECK', 1.0)
+
+    assert policy.delay('CHECK') == 0.5
+    assert policy.delay('SYMBOLS') == 0.5
+
+
+def test_delay_from_quantile():
+    policy = HedgePolicy(quantile=0.9, min_samples=10)
+    for index in range(1, 101):
+        policy.record('CHECK', index / 100)
+
+    assert policy.delay('CHECK') == pytest.approx(0.9, rel=0.1)
+
+
+def test_delay_at_least_min_delay():
+    policy = HedgePolicy(min_samples=1, min_delay=0.5)
+    policy.record('CHECK', 0.001)
+
+    assert policy.delay('CHECK') == 0.5
+
+
+def test_rate_capped():
+    policy = HedgePolicy(max_rate=0.1)
+    hedged = 0
+    for _ in range(1000):
+        policy.record_request()
+        hedged += policy.acquire()
+
+    assert hedged == policy.hedged
+    assert policy.hedge_rate == pytest.approx(0.1, abs=0.01)
+    assert policy.suppressed == 1000 - hedged
+
+
+def test_hedge_rate_no_requests():
+    assert HedgePolicy().hedge_rate == 0.0
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from aiospamc.latency import AdaptiveTimeouts, LatencyHistogram
+
+
+def test_histogram_empty():
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram()
+    for index in range(1, 1001):
+        histogram.record(index / 1000)
+
+    assert histogram.quantile(0.5) == pytest.approx(0.5, rel=0.1)
+    assert histogram.quantile(0.99) == pytest.approx(0.99, rel=0.1)
+
+
+def test_histogram_above_maximum():
+    histogram = LatencyHistogram(maximum=10.0)
+    histogram.record(100.0)
+
+    assert histogram.quantile(0.5) == 10.0
+
+
+def test_histogram_halves_counts():
+    histogram = LatencyHistogram(window=4)
+    for _ in range(4):
+        histogram.record(1.0)
+
+    assert histogram.count == 2
+    assert sum(histogram.counts) == 2
+
+
+def test_histogram_follows_recent_latencies():
+    histogram = LatencyHistogram(window=100)
+    for _ in range(1000):
+        histogram.record(0.01)
+    for _ in range(1000):
+        histogram.record(1.0)
+
+    assert histogram.quantile(0.5) == pytest.approx(1.0, rel=0.1)
+
+
+def test_repr():
+    assert repr(AdaptiveTimeouts()) == 'AdaptiveTimeouts(quantile=0.999, factor=3.0, minimum=1.0, maximum=300.0)'
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'quantile': 0},
+    {'quantile': 1},
+    {'minimum': 10, 'maximum': 1},
+])
+def test_invalid(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveTimeouts(**kwargs)
+
+
+def test_size_bucket():
+    timeouts = AdaptiveTimeouts(size_buckets=(10, 100))
+
+    assert timeouts.size_bucket(5) == 0
+    assert timeouts.size_bucket(50) == 1
+    assert timeouts.size_bucket(500) == 2
+
+
+def test_no_timeout_before_min_samples():
+    timeouts = AdaptiveTimeouts(min_samples=10)
+    for _ in range(9):
+        timeouts.record('CHECK', 100, 2.0)
+
+    assert timeouts.timeout('CHECK', 100) is None
+    assert timeouts.timeout('PING', 0) is None
+
+
+def test_timeout_from_quantile():
+    timeouts = AdaptiveTimeouts(quantile=0.99, factor=2.0, minimum=0.1, min_samples=10)
+    for _ in range(100):
+        timeouts.record('CHECK', 100, 2.0)
+
+    assert timeouts.timeout('CHECK', 100) == pytest.approx(4.0, rel=0.1)
+
+
+@pytest.mark.parametrize('latency,expected', [
+    (0.001, 1.0),
+    (1000.0, 300.0),
+])
+def test_timeout_clamped(latency, expected):
+    timeouts = AdaptiveTimeouts(min_samples=1)
+    timeouts.record('CHECK', 100, latency)
+
+    assert timeouts.timeout('CHECK', 100) == expected
+
+
+def test_tracked_per_verb_and_size():
+    timeouts = AdaptiveTimeouts(min_samples=1, size_buckets=(1000,))
+    timeouts.record('CHECK', 100, 1.0)
+    timeouts.record('CHECK', 10000, 10.0)
+    timeouts.record('PING', 0, 0.01)
+
+    assert timeouts.timeout('CHECK', 100) < timeouts.timeout('CHECK', 10000)
+    assert timeouts.timeout('PING', 0) == 1.0
+
+
+def test_snapshot():
+    timeouts = AdaptiveTimeouts(min_samples=2)
+    timeouts.record('CHECK', 100, 1.0)
+    timeouts.record('PING', 0, 0.01)
+    timeouts.record('PING', 0, 0.01)
+    snapshot = timeouts.snapshot()
+
+    assert snapshot[('CHECK', 0)]['count'] == 1
+    assert snapshot[('CHECK', 0)]['p50'] == pytest.approx(1.0, rel=0.1)
+    assert snapshot[('CHECK', 0)]['timeout'] is None
+    assert snapshot[('PING', 0)]['timeout'] == 1.0
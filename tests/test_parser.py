@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import zlib
+
 import pytest
 
 from unittest.mock import Mock
@@ -9,7 +11,7 @@ from aiospamc.requests import Request
 from aiospamc.responses import Response, Status
 from aiospamc.options import ActionOption, MessageClassOption
 
-from aiospamc.parser import parse, Parser, ParseError
+from aiospamc.parser import parse, parse_request, parse_response, Parser, ParseError, ParserState, ResponseParser
 
 
 def test_parseerror_is_exception():
@@ -93,17 +95,32 @@ def test_parser_consume_fail():
         p.consume(rb'invalid')
 
 
-@pytest.mark.parametrize('func', [
-    Mock(),
-    Mock(side_effect=ParseError(index=0, message='Raised'))
-])
-def test_parser_skip(func):
+def test_parser_optional_success():
     p = Parser(b'data')
+    result = p.optional(rb'da')
+
+    assert result.group() == b'da'
+    assert p.index == 2
 
-    p.test = func
-    p.skip(p.test)
 
-    assert p.test.called
+def test_parser_optional_fail():
+    p = Parser(b'data')
+    result = p.optional(rb'invalid')
+
+    assert result is None
+    assert p.index == 0
+
+
+@pytest.mark.parametrize('data,index', [
+    (b'', 0),
+    (b'data', 0),
+    (b' \tdata', 2)
+])
+def test_parser_skip_whitespace(data, index):
+    p = Parser(data)
+    p.skip_whitespace()
+
+    assert p.index == index
 
 
 @pytest.mark.parametrize('data,index', [
@@ -142,6 +159,7 @@ def test_parser_body():
     result = p.body()
 
     assert result == b'12345'
+    assert p.end()
 
 
 @pytest.mark.parametrize('data', [
@@ -267,14 +285,31 @@ def test_parser_header(data, expected):
     assert isinstance(result, expected)
 
 
+def test_parser_header_xheader_value():
+    p = Parser(b'CustomHeader : some value\r\n')
+    result = p.header()
+
+    assert result.name == 'CustomHeader'
+    assert result.value == 'some value'
+
+
 def test_parser_headers():
-    p = Parser(b'Content-length : 42\r\nUser : username\r\nCustom : header\r\nInvalidHeader\r\n')
+    p = Parser(b'Content-length : 42\r\nUser : username\r\nCustom : header\r\n\r\nBody')
 
     result = p.headers()
     expected = (ContentLength, User, XHeader)
 
+    assert len(result) == len(expected)
     for parsed_header, expected_header in zip(result, expected):
         assert isinstance(parsed_header, expected_header)
+    assert p.current() == b'\r\nBody'
+
+
+def test_parser_headers_invalid():
+    p = Parser(b'Content-length : 42\r\nInvalidHeader\r\n')
+
+    with pytest.raises(ParseError):
+        p.headers()
 
 
 def test_parser_spamc_protocol():
@@ -371,3 +406,240 @@ def test_parser_parse_success(data, expected):
 def test_parser_parse_fail():
     with pytest.raises(ParseError):
         parse(b'invalid')
+
+
+def test_parse_request():
+    result = parse_request(b'CHECK SPAMC/1.5\r\nContent-length: 6\r\n\r\nA body')
+
+    assert isinstance(result, Request)
+    assert result.verb == 'CHECK'
+    assert result.body == b'A body'
+
+
+def test_parse_request_fail():
+    with pytest.raises(ParseError):
+        parse_request(b'SPAMD/1.5 0 PONG\r\n')
+
+
+def test_parse_response(response_with_body):
+    result = parse_response(response_with_body)
+
+    assert isinstance(result, Response)
+    assert result.get_header('Content-length').length == 10
+    assert result.body == b'Test body\n'
+
+
+def test_parse_response_fail():
+    with pytest.raises(ParseError):
+        parse_response(b'PING SPAMC/1.5\r\n')
+
+
+def test_parse_response_bytearray(response_with_body):
+    result = parse_response(bytearray(response_with_body))
+
+    assert result.body == b'Test body\n'
+
+
+def test_response_parser_instantiates():
+    p = ResponseParser()
+
+    assert p.state is ParserState.status_line
+    assert p.headers == []
+    assert p.complete is False
+
+
+def test_response_parser_status_line():
+    on_status_line = Mock()
+    p = ResponseParser(on_status_line=on_status_line)
+    p.feed(b'SPAMD/1.5 0 EX')
+
+    assert p.state is ParserState.status_line
+    assert not on_status_line.called
+
+    p.feed(b'_OK\r\n')
+
+    assert p.state is ParserState.headers
+    assert p.version == '1.5'
+    assert p.status_code is Status.EX_OK
+    assert p.message == 'EX_OK'
+    on_status_line.assert_called_once_with(p)
+
+
+def test_response_parser_headers_before_body():
+    on_headers = Mock()
+    p = ResponseParser(on_headers=on_headers)
+    p.feed(b'SPAMD/1.5 0 EX_OK\r\nSpam: True ; 1000.0 / 1.0\r\nContent-length: 10\r\n\r\nTest')
+
+    assert p.state is ParserState.body
+    assert p.get_header('Spam').value is True
+    assert p.content_length == 10
+    assert p.body_received == 4
+    on_headers.assert_called_once_with(p)
+
+
+def test_response_parser_body_chunks(response_with_body):
+    on_body = Mock()
+    p = ResponseParser(on_body=on_body)
+    for index in range(len(response_with_body)):
+        p.feed(response_with_body[index:index + 1])
+
+    assert p.complete
+    assert on_body.call_count == 10
+    assert p.result().body == b'Test body\n'
+
+
+def test_response_parser_no_body(response_spam_header):
+    p = ResponseParser()
+    p.feed(response_spam_header)
+
+    assert p.complete
+    assert isinstance(p.result(), Response)
+
+
+def test_response_parser_eof_without_headers():
+    p = ResponseParser()
+    p.feed(b'SPAMD/1.5 0 PONG\r\n')
+    p.feed_eof()
+
+    assert p.complete
+    assert p.result().message == 'PONG'
+
+
+def test_response_parser_get_header_missing():
+    p = ResponseParser()
+
+    with pytest.raises(KeyError):
+        p.get_header('Spam')
+
+
+@pytest.mark.parametrize('data', [
+    b'Invalid response',
+    b'SPAMD/1.5 0 EX_OK\r\nInvalidHeader\r\n',
+    b'SPAMD/1.5 0 EX_OK\r\nContent-length: 2\r\n\r\nToo long',
+    b'SPAMD/1.5 0 EX_OK\r\n\r\nNo Content-length',
+])
+def test_response_parser_invalid(data):
+    p = ResponseParser()
+
+    with pytest.raises(ParseError):
+        p.feed(data)
+
+
+@pytest.mark.parametrize('length,valid', [
+    (10, True),
+    (11, False),
+    (99999999999, False),
+])
+def test_response_parser_max_body_size(length, valid):
+    p = ResponseParser(max_body_size=10)
+    data = 'SPAMD/1.5 0 EX_OK\r\nContent-length: {}\r\n\r\n'.format(length).encode()
+
+    if valid:
+        p.feed(data)
+        assert p.bytes_needed == 10
+    else:
+        with pytest.raises(ParseError):
+            p.feed(data)
+
+
+def test_response_parser_default_max_body_size():
+    with pytest.raises(ParseError):
+        ResponseParser().feed(b'SPAMD/1.5 0 EX_OK\r\nContent-length: 99999999999\r\n\r\n')
+
+
+def test_response_parser_data_after_done(response_ok):
+    p = ResponseParser()
+    p.feed(response_ok)
+
+    with pytest.raises(ParseError):
+        p.feed(b'More')
+
+
+@pytest.mark.parametrize('data', [
+    b'SPAMD/1.5 0 EX',
+    b'SPAMD/1.5 0 EX_OK\r\nSpam: True',
+])
+def test_response_parser_eof_incomplete(data):
+    p = ResponseParser()
+    p.feed(data)
+
+    with pytest.raises(ParseError):
+        p.feed_eof()
+
+
+def test_response_parser_result_incomplete():
+    p = ResponseParser()
+
+    with pytest.raises(ParseError):
+        p.result()
+
+
+def test_response_parser_repr():
+    p = ResponseParser()
+
+    assert repr(p) == 'ResponseParser(state=ParserState.status_line, body_received=0, content_length=None)'
+
+
+def test_response_parser_bytes_needed(response_with_body):
+    p = ResponseParser()
+
+    assert p.bytes_needed is None
+
+    p.feed(response_with_body[:-4])
+
+    assert p.bytes_needed == 4
+
+    p.feed(response_with_body[-4:])
+
+    assert p.bytes_needed == 0
+
+
+@pytest.mark.parametrize('data', [
+    b'SPAMD/1.5 0 EX_OK\r\nContent-length: 10\r\n\r\nTest',
+    b'SPAMD/1.5 0 EX_OK\r\nContent-length: 10\r\n',
+])
+def test_response_parser_eof_truncated_body(data):
+    p = ResponseParser()
+    p.feed(data)
+
+    with pytest.raises(ParseError):
+        p.feed_eof()
+
+
+def test_response_parser_non_utf8_body():
+    p = ResponseParser()
+    p.feed(b'SPAMD/1.5 0 EX_OK\r\nContent-length: 4\r\n\r\n\xe9t\xe9\n')
+
+    assert p.result().body == b'\xe9t\xe9\n'
+
+
+@pytest.mark.parametrize('headers,body', [
+    (b'', b'Test body\n'),
+    (b'Compress: zlib\r\n', zlib.compress(b'Test body\n')),
+])
+def test_response_parser_body_is_bytes(headers, body):
+    p = ResponseParser()
+    p.feed(b'SPAMD/1.5 0 EX_OK\r\n%bContent-length: %d\r\n\r\n%b' % (headers, len(body), body))
+    response = p.result()
+
+    assert type(response.body) is bytes
+    assert response.body == b'Test body\n'
+
+
+def test_response_parser_compressed_body():
+    body = zlib.compress(b'Test body\n')
+    p = ResponseParser()
+    p.feed(b'SPAMD/1.5 0 EX_OK\r\nCompress: zlib\r\nContent-length: %d\r\n\r\n%b' % (len(body), body))
+
+    assert p.result().body == b'Test body\n'
+    assert p.compressed
+    assert p.body == body
+    assert bytes(p.result()).endswith(body)
+
+
+def test_response_parser_result_decoded_body():
+    body = zlib.compress(b'Test body\n')
+    p = ResponseParser()
+    p.feed(b'SPAMD/1.5 0 EX_OK\r\nCompress: zlib\r\nContent-length: %d\r\n\r\n%b' % (len(body), body))
+
+    assert p.result(b'Decoded\n').body == b'Decoded\n'
@@ -5,8 +5,9 @@ import zlib
 
 import pytest
 
-from aiospamc.headers import Compress, ContentLength, XHeader
-from aiospamc.requests import Request
+from aiospamc.headers import Compress, ContentLength, User, XHeader
+from aiospamc.common import FileBody
+from aiospamc.requests import PreparedRequest, Request
 
 
 def test_request_instantiates():
@@ -19,7 +20,7 @@ def test_request_instantiates():
     ('TEST', None, []),
     ('TEST', None, [XHeader('X-Tests-Head', 'Tests value')]),
     ('TEST', 'Test body\n', [ContentLength(length=10)]),
-    ('TEST', 'Test body\n', [ContentLength(length=10), Compress()])
+    ('TEST', 'Test body\n', [Compress()])
 ])
 def test_request_bytes(verb, body, headers):
     request = Request(verb=verb, body=body, headers=headers)
@@ -30,5 +31,121 @@ def test_request_bytes(verb, body, headers):
     if body:
         if any(isinstance(header, Compress) for header in headers):
             assert bytes(request).endswith(zlib.compress(body.encode()))
+            assert request.get_header('Content-length').length == len(zlib.compress(body.encode()))
         else:
             assert bytes(request).endswith(body.encode())
+
+
+def test_request_buffers():
+    request = Request(verb='CHECK', body='Test body\n')
+    buffers = request.buffers()
+
+    assert buffers[0] == b'CHECK SPAMC/1.5\r\n'
+    assert buffers[1] == b'Content-length: 10\r\n\r\n'
+    assert isinstance(buffers[2], memoryview)
+    assert buffers[2] == b'Test body\n'
+    assert b''.join(buffers) == bytes(request)
+
+
+def test_request_buffers_without_body():
+    request = Request(verb='PING')
+
+    assert request.buffers() == [b'PING SPAMC/1.5\r\n', b'\r\n']
+
+
+def test_request_buffers_compressed():
+    request = Request(verb='CHECK', body='Test body\n', headers=[Compress()])
+
+    assert zlib.decompress(request.buffers()[-1]) == b'Test body\n'
+
+
+def test_request_status_line_cached():
+    first = Request(verb='CHECK').buffers()[0]
+    second = Request(verb='CHECK').buffers()[0]
+
+    assert first is second
+
+
+@pytest.mark.parametrize('body', [
+    b'Test body\n',
+    bytearray(b'Test body\n'),
+    memoryview(b'Test body\n'),
+])
+def test_request_bytes_like_body(body):
+    request = Request(verb='CHECK', body=body)
+
+    assert request.body is body
+    assert request.get_header('Content-length').length == 10
+    assert bytes(request).endswith(b'\r\n\r\nTest body\n')
+
+
+def test_request_buffers_file_body(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        body = FileBody(file)
+        request = Request(verb='CHECK', body=body)
+
+        assert request.buffers()[-1] is body
+        assert bytes(request).endswith(b'\r\n\r\n' + spam.encode())
+
+
+def test_prepared_request_bytes():
+    request = Request(verb='CHECK', body='Test body\n', headers=[XHeader('X-Tag', 'value')])
+
+    assert bytes(request.prepare()) == bytes(request)
+
+
+def test_prepared_request_repr():
+    prepared = Request(verb='CHECK', body='Test body\n').prepare()
+
+    assert repr(prepared) == 'PreparedRequest(verb=\'CHECK\', version=\'1.5\', headers=(\'Content-length\',))'
+
+
+def test_prepared_request_shares_compressed_body():
+    request = Request(verb='CHECK', body='Test body\n', headers=[Compress()])
+    prepared = request.prepare()
+
+    assert prepared.buffers()[-1].obj is request._compressed_body
+    assert zlib.decompress(prepared.buffers()[-1]) == b'Test body\n'
+
+
+def test_prepared_request_no_body():
+    prepared = Request(verb='PING').prepare()
+
+    assert prepared.buffers() == [b'PING SPAMC/1.5\r\n', b'\r\n']
+
+
+def test_prepared_request_immutable():
+    prepared = Request(verb='PING').prepare()
+
+    with pytest.raises(AttributeError):
+        prepared.verb = 'CHECK'
+    with pytest.raises(AttributeError):
+        prepared.extra = True
+
+
+def test_prepared_request_with_headers():
+    prepared = Request(verb='CHECK', body='Test body\n').prepare()
+
+    first = prepared.with_headers(User('first'))
+    second = first.with_headers(User('second'))
+
+    assert bytes(prepared) == b'CHECK SPAMC/1.5\r\nContent-length: 10\r\n\r\nTest body\n'
+    assert bytes(second) == b'CHECK SPAMC/1.5\r\nContent-length: 10\r\nUser: second\r\n\r\nTest body\n'
+    assert second.buffers()[-1] is prepared.buffers()[-1]
+
+
+def test_prepared_request_encoded_header():
+    prepared = Request(verb='CHECK', headers=[User('alice')]).prepare()
+
+    assert prepared.encoded_header('User') == b'User: alice\r\n'
+    with pytest.raises(KeyError):
+        prepared.encoded_header('Compress')
+
+
+def test_prepared_request_file_body(spam_file, spam):
+    with open(spam_file, 'rb') as file:
+        body = FileBody(file)
+        prepared = Request(verb='CHECK', body=body).prepare()
+
+        assert prepared.buffers()[-1] is body
+        assert isinstance(prepared, PreparedRequest)
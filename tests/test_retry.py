@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import random
+
+import pytest
+
+from aiospamc.exceptions import AIOSpamcConnectionFailed, BadResponse, TemporaryFailureException
+from aiospamc.requests import Request
+from aiospamc.retry import RetryPolicy
+
+
+def test_repr():
+    assert repr(RetryPolicy()) == 'RetryPolicy(max_attempts=3, backoff=0.1, max_backoff=2.0, budget=0.1)'
+
+
+def test_max_attempts_less_than_one():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+@pytest.mark.parametrize('error', [
+    TemporaryFailureException(None),
+    AIOSpamcConnectionFailed(),
+])
+def test_retries_transient_errors(error):
+    policy = RetryPolicy()
+
+    assert policy.should_retry(Request('CHECK'), error, 1)
+    assert policy.retries == 1
+    assert policy.tokens == policy.min_tokens - 1
+
+
+def test_does_not_retry_other_errors():
+    assert not RetryPolicy().should_retry(Request('CHECK'), BadResponse(), 1)
+
+
+def test_stops_at_max_attempts():
+    policy = RetryPolicy(max_attempts=2)
+
+    assert policy.should_retry(Request('CHECK'), AIOSpamcConnectionFailed(), 1)
+    assert not policy.should_retry(Request('CHECK'), AIOSpamcConnectionFailed(), 2)
+
+
+@pytest.mark.parametrize('retry_tell,expected', [
+    (False, False),
+    (True, True),
+])
+def test_tell_opt_in(retry_tell, expected):
+    policy = RetryPolicy(retry_tell=retry_tell)
+
+    assert policy.should_retry(Request('TELL'), AIOSpamcConnectionFailed(), 1) is expected
+
+
+def test_budget_exhausted():
+    policy = RetryPolicy(min_tokens=1, budget=0.5)
+
+    assert policy.should_retry(Request('CHECK'), AIOSpamcConnectionFailed(), 1)
+    assert not policy.should_retry(Request('CHECK'), AIOSpamcConnectionFailed(), 1)
+    assert policy.exhausted == 1
+
+    policy.record_request()
+    policy.record_request()
+
+    assert policy.should_retry(Request('CHECK'), AIOSpamcConnectionFailed(), 1)
+
+
+def test_budget_capped():
+    policy = RetryPolicy(min_tokens=0, max_tokens=1, budget=0.6)
+    policy.record_request()
+    policy.record_request()
+
+    assert policy.tokens == 1
+
+
+def test_delay_grows_and_is_capped():
+    policy = RetryPolicy(backoff=1, multiplier=2, max_backoff=3, random_=random.Random(0))
+    delays = [[policy.delay(attempt) for _ in range(100)] for attempt in (1, 2, 3)]
+
+    assert all(0 <= delay <= 1 for delay in delays[0])
+    assert all(0 <= delay <= 2 for delay in delays[1])
+    assert max(delays[1]) > 1
+    assert all(0 <= delay <= 3 for delay in delays[2])